@@ -8,9 +8,19 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
 
 import os
+import time
 
 from django.core.asgi import get_asgi_application
 
+# Start of this worker's boot, for its time-to-first-response
+started = time.perf_counter()
+
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'pawhaven_project.settings')
+# Serve the async versions of the catalogue views (see shelter/async_views.py)
+os.environ.setdefault('SHELTER_ASYNC_VIEWS', '1')
 
 application = get_asgi_application()
+
+from shelter.warmup import warm_up_worker  # noqa: E402  (needs the app registry)
+
+warm_up_worker(started)
@@ -4,15 +4,24 @@ Django settings for pawhaven_project project.
 Generated by 'django-admin startproject' using Django 5.2.6.
 """
 
+import os
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 # Quick-start development settings - unsuitable for production
-SECRET_KEY = 'django-insecure-!+jbrjl6knr&%c)s(lo2w!jdr2=mp)1*)^5e%fwjoj5!&qb12x'
-DEBUG = True
-ALLOWED_HOSTS = []
+# Production mode: DJANGO_DEBUG=0 with DJANGO_SECRET_KEY and DJANGO_ALLOWED_HOSTS set
+DEBUG = os.environ.get('DJANGO_DEBUG', '1') == '1'
+SECRET_KEY = os.environ.get('DJANGO_SECRET_KEY')
+if not SECRET_KEY:
+    if not DEBUG:
+        # The development key below is public; production must not sign with it
+        raise ImproperlyConfigured('DJANGO_SECRET_KEY must be set when DJANGO_DEBUG=0')
+    SECRET_KEY = 'django-insecure-!+jbrjl6knr&%c)s(lo2w!jdr2=mp)1*)^5e%fwjoj5!&qb12x'
+ALLOWED_HOSTS = [host for host in os.environ.get('DJANGO_ALLOWED_HOSTS', '').split(',') if host]
 
 # Application definition
 INSTALLED_APPS = [
@@ -27,11 +36,13 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'shelter.performance.PerformanceMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'shelter.middleware.SessionlessAnonymousAuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -57,15 +68,109 @@ TEMPLATES = [
     },
 ]
 
+# In production templates are parsed once per worker and kept in memory
+if not DEBUG:
+    TEMPLATES[0]['APP_DIRS'] = False
+    TEMPLATES[0]['OPTIONS']['loaders'] = [
+        ('django.template.loaders.cached.Loader', [
+            'django.template.loaders.filesystem.Loader',
+            'django.template.loaders.app_directories.Loader',
+        ]),
+    ]
+
+# Pre-parse every shelter template when a worker boots (see shelter/warmup.py)
+SHELTER_WARM_TEMPLATES = os.environ.get('SHELTER_WARM_TEMPLATES', '0' if DEBUG else '1') == '1'
+
 WSGI_APPLICATION = 'pawhaven_project.wsgi.application'
 
 # Database
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# SHELTER_DB_PROFILE selects the database setup:
+#   sqlite          - single local file (default)
+#   sqlite-replica  - two local files standing in for a primary and a read
+#                     replica; copy data across with `manage.py sync_replica`
+#   postgres        - Postgres with a connection pool, plus a read replica
+#                     when POSTGRES_REPLICA_HOST is set
+SHELTER_DB_PROFILE = os.environ.get('SHELTER_DB_PROFILE', 'sqlite')
+
+if SHELTER_DB_PROFILE == 'postgres':
+    _postgres = {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': os.environ.get('POSTGRES_DB', 'pawhaven'),
+        'USER': os.environ.get('POSTGRES_USER', 'pawhaven'),
+        'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
+        'HOST': os.environ.get('POSTGRES_HOST', 'localhost'),
+        'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+        # The pool keeps connections open, so CONN_MAX_AGE must stay 0
+        'CONN_MAX_AGE': 0,
+        'OPTIONS': {
+            'pool': {
+                'min_size': int(os.environ.get('POSTGRES_POOL_MIN_SIZE', 2)),
+                'max_size': int(os.environ.get('POSTGRES_POOL_MAX_SIZE', 10)),
+                'timeout': 10,
+            },
+        },
+    }
+    DATABASES = {'default': _postgres}
+    if os.environ.get('POSTGRES_REPLICA_HOST'):
+        DATABASES['replica'] = {
+            **_postgres,
+            'HOST': os.environ['POSTGRES_REPLICA_HOST'],
+            'TEST': {'MIRROR': 'default'},
+        }
+elif SHELTER_DB_PROFILE == 'sqlite-replica':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+            'CONN_MAX_AGE': 60,
+            'CONN_HEALTH_CHECKS': True,
+        },
+        'replica': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db_replica.sqlite3',
+            'CONN_MAX_AGE': 60,
+            'CONN_HEALTH_CHECKS': True,
+            'TEST': {'MIRROR': 'default'},
+        },
     }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+        }
+    }
+
+# Opt-in SQLite tuning for several gunicorn workers writing to one file:
+# WAL lets readers run alongside a writer, write transactions take the lock
+# up front (BEGIN IMMEDIATE) and wait for it instead of failing with
+# "database is locked". Compare with `manage.py stress_sqlite`.
+SHELTER_SQLITE_TUNED = os.environ.get('SHELTER_SQLITE_TUNED') == '1'
+SHELTER_SQLITE_TUNED_OPTIONS = {
+    'init_command': (
+        'PRAGMA journal_mode=WAL;'
+        'PRAGMA synchronous=NORMAL;'
+        'PRAGMA mmap_size=134217728;'   # 128 MiB
+        'PRAGMA cache_size=-20000;'     # ~20 MiB
+        'PRAGMA temp_store=MEMORY;'
+    ),
+    'transaction_mode': 'IMMEDIATE',
+    'timeout': 20,                      # Busy timeout, in seconds
 }
+if SHELTER_SQLITE_TUNED:
+    for _database in DATABASES.values():
+        if _database['ENGINE'] == 'django.db.backends.sqlite3':
+            _database['OPTIONS'] = {**SHELTER_SQLITE_TUNED_OPTIONS, **_database.get('OPTIONS', {})}
+
+# Read-only catalogue views read from this alias when it is configured
+SHELTER_REPLICA_DATABASE = 'replica' if 'replica' in DATABASES else None
+DATABASE_ROUTERS = ['shelter.routers.ReplicaRouter']
+
+# Sessions live in the database. 'cached_db' is only safe on a cache shared
+# by every worker: on the per-process LocMemCache a logout doesn't reach the
+# other workers, which keep honouring the session from their own copy.
+# Anonymous visitors never load a session anyway (see shelter/middleware.py)
+SESSION_ENGINE = 'django.contrib.sessions.backends.db'
 
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
@@ -93,8 +198,70 @@ STATICFILES_DIRS = [
     BASE_DIR / 'shelter' / 'static',
 ]
 
+# collectstatic minifies CSS/JS, fingerprints every file and writes gzip and
+# brotli copies; WhiteNoise serves the fingerprinted names as immutable
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'shelter.storage.ShelterStaticFilesStorage',
+    },
+}
+
 # Media files
 MEDIA_URL = 'media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Cache: shared by every worker when DJANGO_REDIS_URL is set (needs the redis
+# package). The default LocMemCache belongs to one process, so with several
+# workers a save only clears the cached counters of the worker that handled it
+if os.environ.get('DJANGO_REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['DJANGO_REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Seconds the homepage/dashboard counters are cached (invalidated on save/delete;
+# on the per-process LocMemCache this is how stale other workers' counters get)
+SHELTER_STATS_CACHE_TIMEOUT = 30
+
+# Seconds the live dashboard feed (served under ASGI only) waits for a burst of changes to settle
+# before recomputing the counters once, and the longest a feed connection
+# is held before the browser is made to reconnect
+SHELTER_LIVE_STATS_DELAY = 0.5
+SHELTER_LIVE_MAX_SECONDS = 300
+
+# Request samples kept per view for the admin performance report
+SHELTER_PERFORMANCE_SAMPLES = 1000
+
+# Send per-request timings in a Server-Timing header
+SHELTER_SERVER_TIMING = DEBUG
+
+# Seconds a rendered pet card stays cached (keys are versioned by updated_at and date)
+SHELTER_PET_CARD_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Route the catalogue views to their async versions (set by asgi.py)
+SHELTER_ASYNC_VIEWS = os.environ.get('SHELTER_ASYNC_VIEWS') == '1'
+
+# Worker startup (template warm-up, time-to-first-response) is logged here
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'shelter': {'handlers': ['console'], 'level': 'INFO'},
+    },
+}
@@ -8,9 +8,17 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/wsgi/
 """
 
 import os
+import time
 
 from django.core.wsgi import get_wsgi_application
 
+# Start of this worker's boot, for its time-to-first-response
+started = time.perf_counter()
+
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'pawhaven_project.settings')
 
 application = get_wsgi_application()
+
+from shelter.warmup import warm_up_worker  # noqa: E402  (needs the app registry)
+
+warm_up_worker(started)
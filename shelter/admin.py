@@ -1,15 +1,39 @@
-from django.contrib import admin
-from .models import Pet, AdoptionApplication, ContactMessage, SuccessStory
+from django.contrib import admin, messages
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError
+
+from .models import Pet, AdoptionApplication, ContactMessage, SuccessStory, ImageJob
+from .triage import set_application_status
 
 
 @admin.register(Pet)
 class PetAdmin(admin.ModelAdmin):
-    list_display = ('name', 'type', 'breed', 'age', 'gender', 'status', 'featured', 'arrival_date')
+    list_display = ('name', 'type', 'breed', 'age', 'gender', 'status', 'featured', 'arrival_date',
+                    'application_count', 'pending_application_count')
     list_filter = ('type', 'size', 'gender', 'status', 'featured', 'special_needs')
     search_fields = ('name', 'breed', 'description')
     prepopulated_fields = {'slug': ('name',)}
     date_hierarchy = 'arrival_date'
     ordering = ('-arrival_date',)
+    readonly_fields = ('image_processing',)
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_application_stats()
+    
+    def application_count(self, obj):
+        return obj.application_count
+    application_count.short_description = 'Applications'
+    application_count.admin_order_field = 'application_count'
+    
+    def pending_application_count(self, obj):
+        return obj.pending_application_count
+    pending_application_count.short_description = 'Pending'
+    pending_application_count.admin_order_field = 'pending_application_count'
+    
+    def image_processing(self, obj):
+        job = ImageJob.objects.filter(model_label='shelter.pet', object_id=obj.pk).first()
+        return job.get_status_display() if job else '-'
+    image_processing.short_description = 'Image variants'
     
     fieldsets = (
         ('Basic Information', {
@@ -23,7 +47,7 @@ class PetAdmin(admin.ModelAdmin):
                       'special_needs', 'special_needs_description')
         }),
         ('Images', {
-            'fields': ('main_image', 'image_2', 'image_3')
+            'fields': ('main_image', 'image_2', 'image_3', 'image_processing')
         }),
         ('Status & Fees', {
             'fields': ('status', 'arrival_date', 'adoption_fee', 'featured')
@@ -38,12 +62,36 @@ class AdoptionApplicationAdmin(admin.ModelAdmin):
     search_fields = ('first_name', 'last_name', 'email', 'pet__name')
     date_hierarchy = 'submitted_at'
     ordering = ('-submitted_at',)
-    readonly_fields = ('submitted_at',)
+    readonly_fields = ('submitted_at', 'approved_at', 'completed_at')
+    actions = ('mark_approved', 'mark_rejected', 'mark_completed')
     
     def applicant_name(self, obj):
         return f"{obj.first_name} {obj.last_name}"
     applicant_name.short_description = 'Applicant'
     
+    def _set_status(self, request, queryset, status):
+        try:
+            updated, auto_rejected = set_application_status(queryset, status)
+        except IntegrityError:
+            self.message_user(request, 'An applicant can only have one open application per pet.', messages.ERROR)
+            return
+        except ValidationError as error:
+            self.message_user(request, f'{error.messages[0]}.', messages.ERROR)
+            return
+        self.message_user(request, f'{updated} application(s) marked {status}, {auto_rejected} competing application(s) rejected.')
+    
+    def mark_approved(self, request, queryset):
+        self._set_status(request, queryset, 'approved')
+    mark_approved.short_description = 'Approve selected applications'
+    
+    def mark_rejected(self, request, queryset):
+        self._set_status(request, queryset, 'rejected')
+    mark_rejected.short_description = 'Reject selected applications'
+    
+    def mark_completed(self, request, queryset):
+        self._set_status(request, queryset, 'completed')
+    mark_completed.short_description = 'Complete selected adoptions'
+    
     fieldsets = (
         ('Applicant Information', {
             'fields': ('first_name', 'last_name', 'email', 'phone', 'address')
@@ -62,7 +110,7 @@ class AdoptionApplicationAdmin(admin.ModelAdmin):
             'fields': ('previous_pet_experience', 'reason_for_adoption')
         }),
         ('Application Status', {
-            'fields': ('status', 'submitted_at', 'reviewed_at', 'notes')
+            'fields': ('status', 'submitted_at', 'reviewed_at', 'approved_at', 'completed_at', 'notes')
         }),
     )
 
@@ -85,3 +133,20 @@ class SuccessStoryAdmin(admin.ModelAdmin):
     date_hierarchy = 'adoption_date'
     ordering = ('-adoption_date',)
 
+
+@admin.register(ImageJob)
+class ImageJobAdmin(admin.ModelAdmin):
+    list_display = ('model_label', 'object_id', 'status', 'attempts', 'variants_written', 'created_at', 'finished_at')
+    list_filter = ('status', 'model_label')
+    ordering = ('-created_at',)
+    readonly_fields = ('model_label', 'object_id', 'status', 'attempts', 'variants_written',
+                       'error', 'created_at', 'claimed_at', 'finished_at')
+    actions = ('requeue_jobs',)
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def requeue_jobs(self, request, queryset):
+        updated = queryset.exclude(status='running').update(status='pending', error='')
+        self.message_user(request, f'{updated} job(s) requeued.')
+    requeue_jobs.short_description = 'Requeue selected jobs'
@@ -0,0 +1,138 @@
+"""
+ASGI-native versions of the public catalogue views and the stats API.
+
+They use Django's async ORM and are routed instead of their sync
+counterparts when ``SHELTER_ASYNC_VIEWS`` is enabled (the default under
+``pawhaven_project.asgi``). Independent queries are awaited concurrently.
+"""
+import asyncio
+
+from django.conf import settings
+from django.contrib.auth.decorators import login_required, user_passes_test
+from django.core.paginator import InvalidPage, Paginator
+from django.http import Http404, JsonResponse
+from django.shortcuts import aget_object_or_404, render
+
+from .conditional import conditional_view
+from .models import Pet, SuccessStory
+from .routers import use_replica
+from .stats import aget_stats
+from .views import (
+    PetListView, filter_available_pets, is_admin_user, pet_detail_version, pet_list_version,
+)
+
+
+async def _alist(queryset):
+    return [obj async for obj in queryset]
+
+
+async def _resolve_request_state(request):
+    """
+    Load the session and user before rendering.
+
+    Templates read ``user`` and ``messages``; resolving both here keeps the
+    (sync) template render from touching the database.
+    """
+    if request.COOKIES.get(settings.SESSION_COOKIE_NAME):
+        await request.session.ahas_key('_auth_user_id')
+    request.user = await request.auser()
+
+
+@use_replica
+async def home(request):
+    """Async homepage view with featured pets and stats"""
+    featured_pets, stats, _ = await asyncio.gather(
+        _alist(Pet.objects.filter(featured=True, status='available')[:3]),
+        aget_stats(),
+        _resolve_request_state(request),
+    )
+
+    context = {
+        'featured_pets': featured_pets,
+        'stats': {
+            'total_adopted': stats['total_adopted'] or 1247,  # Use actual or fallback
+            'available_now': stats['available_pets'] or 15,
+            'happy_families': stats['completed_applications'] or 156,
+            'years_of_service': 8,
+        }
+    }
+    return render(request, 'shelter/index.html', context)
+
+
+@use_replica
+@conditional_view(pet_list_version)
+async def pet_list(request):
+    """Async version of PetListView"""
+    queryset = filter_available_pets(request.GET)
+    per_page = PetListView.paginate_by
+
+    total_pets, _ = await asyncio.gather(queryset.acount(), _resolve_request_state(request))
+
+    # Paginate over the known count so Paginator never queries
+    paginator = Paginator(range(total_pets), per_page)
+    try:
+        page_obj = paginator.page(request.GET.get('page') or 1)
+    except InvalidPage:
+        raise Http404('Invalid page')
+
+    page_obj.object_list = await _alist(queryset[page_obj.start_index() - 1:page_obj.end_index()]) if total_pets else []
+
+    context = {
+        'pets': page_obj.object_list,
+        'page_obj': page_obj,
+        'paginator': paginator,
+        'is_paginated': page_obj.has_other_pages(),
+        'total_pets': total_pets,
+    }
+    return render(request, 'shelter/pets.html', context)
+
+
+@use_replica
+@conditional_view(pet_detail_version)
+async def pet_detail(request, pk, slug):
+    """Async version of PetDetailView"""
+    pet, _ = await asyncio.gather(
+        aget_object_or_404(Pet, pk=pk),
+        _resolve_request_state(request),
+    )
+    related_pets = await _alist(
+        Pet.objects.filter(type=pet.type, status='available').exclude(pk=pet.pk)[:3]
+    )
+
+    context = {
+        'pet': pet,
+        'object': pet,
+        'related_pets': related_pets,
+    }
+    return render(request, 'shelter/pet_detail.html', context)
+
+
+@use_replica
+async def success_stories(request):
+    """Async success stories page"""
+    stories = SuccessStory.objects.select_related('pet')
+    stories, featured_stories, _ = await asyncio.gather(
+        _alist(stories),
+        _alist(stories.filter(featured=True)[:3]),
+        _resolve_request_state(request),
+    )
+
+    context = {
+        'stories': stories,
+        'featured_stories': featured_stories,
+    }
+    return render(request, 'shelter/success.html', context)
+
+
+@login_required
+@user_passes_test(is_admin_user)
+async def admin_stats_api(request):
+    """Async API endpoint for dashboard stats"""
+    stats = await aget_stats()
+    return JsonResponse({
+        'pending_applications': stats['pending_applications'],
+        'available_pets': stats['available_pets'],
+        'total_adopted': stats['total_adopted'],
+        'unread_messages': stats['unread_messages'],
+        'applications_this_week': stats['applications_this_week'],
+    })
@@ -0,0 +1,67 @@
+"""
+Conditional GET support for the catalogue pages.
+
+A view decorated with ``conditional_view(validators)`` answers
+``If-None-Match`` / ``If-Modified-Since`` with ``304 Not Modified``
+before any template is rendered. ``validators(request, *args, **kwargs)``
+returns the page's version as ``(parts, last_modified)``: ``parts`` is a
+tuple of the values the page depends on and is hashed into the ETag.
+
+Pages also depend on who is looking at them (the navigation) and on the
+date (arrival ages on pet cards), so both are always part of the ETag.
+"""
+import hashlib
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.utils import timezone
+from django.views.decorators.http import condition
+
+
+def _page_version(validators, request, *args, **kwargs):
+    # Pending flash messages are shown once, so such a response is never reused
+    if request.method not in ('GET', 'HEAD') or CookieStorage.cookie_name in request.COOKIES:
+        return None, None
+    version = validators(request, *args, **kwargs)
+    if version is None:
+        return None, None
+    parts, last_modified = version
+
+    user = request.user
+    viewer = (user.pk, user.username, user.is_staff, user.is_superuser) if user.is_authenticated else 'anonymous'
+    today = timezone.localdate()
+    etag = hashlib.md5(repr((parts, viewer, today, request.GET.urlencode())).encode()).hexdigest()
+
+    # Last-Modified can't express who is viewing, so only anonymous pages get it
+    if user.is_authenticated or last_modified is None:
+        last_modified = None
+    else:
+        start_of_today = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+        last_modified = max(last_modified, start_of_today)
+    return f'"{etag}"', last_modified
+
+
+def conditional_view(validators):
+    """Decorator adding ETag/Last-Modified handling to a sync or async view"""
+    def decorator(view):
+        def conditional(etag, last_modified):
+            return condition(
+                etag_func=lambda *args, **kwargs: etag,
+                last_modified_func=lambda *args, **kwargs: last_modified,
+            )(view)
+
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def wrapper(request, *args, **kwargs):
+                # Resolve the user once, for both the ETag and the view
+                request.user = await request.auser()
+                etag, last_modified = await sync_to_async(_page_version)(validators, request, *args, **kwargs)
+                return await conditional(etag, last_modified)(request, *args, **kwargs)
+        else:
+            @wraps(view)
+            def wrapper(request, *args, **kwargs):
+                etag, last_modified = _page_version(validators, request, *args, **kwargs)
+                return conditional(etag, last_modified)(request, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,104 @@
+"""
+Bulk data exports for staff reports.
+
+Each dataset is a fixed list of columns read with ``values()`` and
+``.iterator(chunk_size=...)``, so rows are fetched from the database a
+chunk at a time and written out as plain dicts; no model instances are
+built and memory use doesn't grow with the table. ``export_lines()``
+yields the encoded output line by line for both the dashboard's
+``StreamingHttpResponse`` and ``manage.py export_shelter_data``;
+``aexport_lines()`` is the same over ``aiterator()`` for responses served
+under ASGI, which would otherwise read a synchronous iterator to the end
+before sending.
+
+CSV exports are opened in spreadsheets, so text cells a spreadsheet would
+run as a formula (visitor-supplied names, subjects and messages) are
+prefixed with a quote.
+"""
+import csv
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import AdoptionApplication, ContactMessage, Pet
+
+
+CHUNK_SIZE = 2000
+
+FORMATS = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
+
+# Dataset name -> (model, exported columns); related columns use the ORM's __ syntax
+DATASETS = {
+    'applications': (AdoptionApplication, (
+        'id', 'submitted_at', 'status', 'reviewed_at', 'approved_at', 'completed_at',
+        'first_name', 'last_name', 'email', 'phone', 'pet_id', 'pet__name',
+        'housing_type', 'own_or_rent', 'landlord_approval',
+        'household_adults', 'household_children', 'has_other_pets', 'user_id',
+    )),
+    'contacts': (ContactMessage, (
+        'id', 'created_at', 'name', 'email', 'phone', 'subject', 'message', 'is_read', 'is_responded',
+    )),
+    'pets': (Pet, (
+        'id', 'name', 'slug', 'type', 'breed', 'age', 'gender', 'size', 'color', 'status',
+        'arrival_date', 'adoption_fee', 'featured', 'special_needs', 'vaccinated',
+        'spayed_neutered', 'microchipped', 'created_at', 'updated_at',
+    )),
+}
+
+
+# Leading characters that make a spreadsheet read a cell as a formula
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+class _LineBuffer:
+    """File-like object whose write() hands back what csv.writer wrote"""
+
+    def write(self, value):
+        return value
+
+
+def _spreadsheet_safe(row):
+    """The row with formula-like text cells quoted so spreadsheets show them as text"""
+    return [
+        f"'{value}" if isinstance(value, str) and value.startswith(FORMULA_PREFIXES) else value
+        for value in row
+    ]
+
+
+def _queryset(dataset):
+    model, columns = DATASETS[dataset]
+    # values() rather than values_list(): only its iterable defers the query
+    # into aiterator()'s worker thread instead of running it in the event loop
+    return columns, model.objects.order_by('pk').values(*columns)
+
+
+def _encoding(columns, export_format):
+    """The header lines and the row encoder for an export format"""
+    if export_format == 'csv':
+        writer = csv.writer(_LineBuffer())
+        return [writer.writerow(columns)], lambda row: writer.writerow(_spreadsheet_safe(row[column] for column in columns))
+    if export_format == 'jsonl':
+        encoder = DjangoJSONEncoder()
+        return [], lambda row: encoder.encode(row) + '\n'
+    raise ValueError(f'Unknown export format {export_format!r}')
+
+
+def export_lines(dataset, export_format, chunk_size=CHUNK_SIZE):
+    """Yield the dataset, in primary key order, as CSV (with a header line) or JSON Lines"""
+    columns, queryset = _queryset(dataset)
+    header, encode_row = _encoding(columns, export_format)
+    yield from header
+    for row in queryset.iterator(chunk_size=chunk_size):
+        yield encode_row(row)
+
+
+async def aexport_lines(dataset, export_format, chunk_size=CHUNK_SIZE):
+    """Async export_lines(), for streaming under ASGI without buffering the whole export"""
+    columns, queryset = _queryset(dataset)
+    header, encode_row = _encoding(columns, export_format)
+    for line in header:
+        yield line
+    async for row in queryset.aiterator(chunk_size=chunk_size):
+        yield encode_row(row)
@@ -2,6 +2,8 @@ from django import forms
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
 
+from .models import AdoptionApplication, Pet
+
 
 class CustomUserCreationForm(UserCreationForm):
     """Extended user registration form with email and name fields"""
@@ -79,3 +81,45 @@ class UserUpdateForm(forms.ModelForm):
         if email and User.objects.filter(email=email).exclude(username=username).exists():
             raise forms.ValidationError('This email address is already in use.')
         return email
+
+
+YES_NO_CHOICES = [('no', 'No'), ('yes', 'Yes')]
+
+
+def _yes_no_field():
+    return forms.TypedChoiceField(
+        choices=YES_NO_CHOICES,
+        coerce=lambda value: value == 'yes',
+        required=False,
+        empty_value=False,
+    )
+
+
+class AdoptionApplicationForm(forms.ModelForm):
+    """Adoption application as posted by the adoption_application.html form"""
+    pet_id = forms.ModelChoiceField(queryset=Pet.objects.filter(status='available'))
+    landlord_approval = _yes_no_field()
+    household_adults = forms.IntegerField(min_value=1)
+    household_children = forms.IntegerField(min_value=0, required=False)
+    has_other_pets = _yes_no_field()
+    submission_token = forms.UUIDField(required=False, widget=forms.HiddenInput)
+
+    class Meta:
+        model = AdoptionApplication
+        fields = (
+            'first_name', 'last_name', 'email', 'phone', 'address',
+            'housing_type', 'own_or_rent', 'landlord_approval',
+            'household_adults', 'household_children', 'has_other_pets',
+            'other_pets_description', 'previous_pet_experience', 'reason_for_adoption',
+        )
+
+    def clean_household_children(self):
+        return self.cleaned_data.get('household_children') or 0
+
+    def save(self, commit=True):
+        application = super().save(commit=False)
+        application.pet = self.cleaned_data['pet_id']
+        application.submission_token = self.cleaned_data['submission_token']
+        if commit:
+            application.save()
+        return application
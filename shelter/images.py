@@ -0,0 +1,124 @@
+"""
+Derivative image pipeline for pet and success story uploads.
+
+Every uploaded image gets a set of resized WebP and JPEG variants stored
+next to the original (``pets/bella.jpg`` -> ``pets/variants/bella.jpg-card-400w.webp``).
+Templates use the ``responsive_image`` tag to render them with ``srcset``.
+"""
+import posixpath
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+
+# Variant name -> widths (in pixels) to generate for that variant
+VARIANTS = {
+    'admin_thumb': (160, 320),
+    'card': (400, 800),
+    'detail': (800, 1200),
+}
+
+# Output format -> (file extension, Pillow save options)
+FORMATS = {
+    'webp': ('webp', {'format': 'WEBP', 'quality': 80, 'method': 4}),
+    'jpeg': ('jpg', {'format': 'JPEG', 'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+# EXIF orientation tag, and its values that swap width and height
+ORIENTATION = 0x0112
+ROTATED = (5, 6, 7, 8)
+
+# Image fields that get variants, per model label
+IMAGE_FIELDS = {
+    'shelter.pet': ('main_image', 'image_2', 'image_3'),
+    'shelter.successstory': ('image',),
+}
+
+
+def variant_name(name, variant, width, fmt):
+    """Return the storage name of a single variant of an original image"""
+    directory, filename = posixpath.split(name)
+    extension = FORMATS[fmt][0]
+    # The whole original filename, so bella.jpg and bella.png get variants of their own
+    return posixpath.join(directory, 'variants', f'{filename}-{variant}-{width}w.{extension}')
+
+
+def variant_names(name):
+    """Return every variant storage name for an original image"""
+    return [
+        variant_name(name, variant, width, fmt)
+        for variant, widths in VARIANTS.items()
+        for width in widths
+        for fmt in FORMATS
+    ]
+
+
+def generate_variants(fieldfile, force=False):
+    """
+    Create all missing variants for an image field file.
+
+    EXIF orientation is applied and metadata is dropped. Images are never
+    upscaled: widths wider than the original are skipped, so every stored
+    variant is as wide as its name says. Returns the list of variant names
+    that were written.
+    """
+    if not fieldfile:
+        return []
+
+    storage = fieldfile.storage
+    pending = [
+        (variant, width, fmt)
+        for variant, widths in VARIANTS.items()
+        for width in widths
+        for fmt in FORMATS
+        if force or not storage.exists(variant_name(fieldfile.name, variant, width, fmt))
+    ]
+    if not pending:
+        return []
+
+    with storage.open(fieldfile.name, 'rb') as source:
+        original = Image.open(source)
+        # Only the header has been read so far, which is enough for the size
+        original_width = original.height if original.getexif().get(ORIENTATION) in ROTATED else original.width
+        pending = [(variant, width, fmt) for variant, width, fmt in pending if width <= original_width]
+        if not pending:
+            return []
+        original = ImageOps.exif_transpose(original)
+        original.load()
+
+    if original.mode not in ('RGB', 'RGBA'):
+        original = original.convert('RGBA' if 'transparency' in original.info else 'RGB')
+
+    written = []
+    for variant, width, fmt in pending:
+        image = original.copy()
+        image.thumbnail((width, width * 4), Image.LANCZOS)
+        if fmt == 'jpeg' and image.mode != 'RGB':
+            image = image.convert('RGB')
+
+        buffer = BytesIO()
+        image.save(buffer, **FORMATS[fmt][1])
+
+        name = variant_name(fieldfile.name, variant, width, fmt)
+        if storage.exists(name):
+            storage.delete(name)
+        written.append(storage.save(name, ContentFile(buffer.getvalue())))
+    return written
+
+
+def generate_instance_variants(instance, force=False):
+    """Generate variants for every image field on a Pet or SuccessStory"""
+    written = []
+    for field_name in IMAGE_FIELDS.get(instance._meta.label_lower, ()):
+        written += generate_variants(getattr(instance, field_name), force=force)
+    return written
+
+
+def delete_variants(fieldfile):
+    """Remove all stored variants for an image field file"""
+    if not fieldfile:
+        return
+    for name in variant_names(fieldfile.name):
+        if fieldfile.storage.exists(name):
+            fieldfile.storage.delete(name)
@@ -0,0 +1,173 @@
+"""
+Bulk pet import for onboarding partner shelters.
+
+``read_manifest()`` loads a CSV or JSON manifest and ``validate_rows()``
+checks every row with ``Pet.full_clean()`` before anything is written.
+Each row is identified in ``Pet.import_reference`` as
+``<source>:<reference>`` (its ``reference`` column, or a hash of the
+row), so running an import again skips the pets it already created and
+only fills in images that are still missing. ``ingest_image()`` copies
+one referenced image into media storage and generates its variants; the
+``import_pets`` command runs it in worker processes.
+"""
+import csv
+import hashlib
+import json
+import traceback
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.utils import timezone
+
+from .images import generate_variants
+from .models import Pet, slug_base, unique_slug
+
+
+IMAGE_COLUMNS = ('main_image', 'image_2', 'image_3')
+
+CHOICE_COLUMNS = {
+    'type': Pet.PET_TYPES,
+    'gender': Pet.GENDERS,
+    'size': Pet.SIZES,
+    'status': Pet.STATUS_CHOICES,
+}
+
+BOOLEAN_COLUMNS = ('vaccinated', 'spayed_neutered', 'microchipped', 'special_needs', 'featured')
+
+TRUE_VALUES = {'1', 'true', 'yes', 'y'}
+
+# Manifest columns copied onto the Pet, validated by the model fields themselves
+PET_COLUMNS = (
+    'name', 'type', 'breed', 'age', 'gender', 'size', 'color', 'description', 'personality',
+    'vaccinated', 'spayed_neutered', 'microchipped', 'special_needs', 'special_needs_description',
+    'status', 'arrival_date', 'adoption_fee', 'featured',
+)
+
+
+@dataclass
+class ImportRow:
+    """A validated manifest row: the unsaved pet and the image files it refers to"""
+    line: int
+    reference: str
+    pet: Pet
+    images: dict = field(default_factory=dict)
+
+
+def read_manifest(path):
+    """Rows of a .csv (with a header line) or .json (a list of objects) manifest, as dicts"""
+    path = Path(path)
+    if path.suffix.lower() == '.json':
+        with open(path, encoding='utf-8') as fh:
+            rows = json.load(fh)
+        if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+            raise ValueError('A JSON manifest must be a list of objects')
+        return rows
+    if path.suffix.lower() == '.csv':
+        with open(path, newline='', encoding='utf-8-sig') as fh:
+            return list(csv.DictReader(fh))
+    raise ValueError(f'Unsupported manifest type {path.suffix!r}; use .csv or .json')
+
+
+def row_reference(source, row):
+    """The import_reference of a row: its own reference, or a hash of its content"""
+    reference = str(row.get('reference') or '').strip()
+    if not reference:
+        content = json.dumps(row, sort_keys=True, default=str)
+        reference = hashlib.sha1(content.encode()).hexdigest()[:16]
+    return f'{source}:{reference}'
+
+
+def _pet_values(row):
+    """Manifest values as Pet field values, before model validation"""
+    data = {key: value.strip() if isinstance(value, str) else value for key, value in row.items()}
+
+    # Choices may be given as value or label, in any case ("Dog", "dog")
+    for column, choices in CHOICE_COLUMNS.items():
+        value = str(data.get(column) or '').lower()
+        for choice, label in choices:
+            if value in (choice.lower(), label.lower()):
+                data[column] = choice
+
+    for column in BOOLEAN_COLUMNS:
+        value = data.get(column)
+        data[column] = value if isinstance(value, bool) else str(value or '').lower() in TRUE_VALUES
+
+    # Personality is a list in JSON and "Calm; Playful" in CSV
+    personality = data.get('personality') or []
+    if isinstance(personality, str):
+        personality = [trait.strip() for trait in personality.split(';') if trait.strip()]
+    data['personality'] = personality
+
+    data['status'] = data.get('status') or 'available'
+    data['arrival_date'] = data.get('arrival_date') or timezone.localdate()
+    return {column: data.get(column) for column in PET_COLUMNS}
+
+
+def validate_rows(rows, source, image_dir):
+    """
+    Validate every row; returns (valid ImportRows, [(line, message), ...]).
+
+    Lines are counted from 1 as in a CSV file after its header. Image
+    columns are paths relative to ``image_dir`` and must exist.
+    """
+    image_dir = Path(image_dir)
+    valid, errors = [], []
+    references = set()
+    for line, row in enumerate(rows, start=1):
+        reference = row_reference(source, row)
+        if reference in references:
+            errors.append((line, f'Duplicate reference {reference}'))
+            continue
+        references.add(reference)
+
+        pet = Pet(import_reference=reference, **_pet_values(row))
+        try:
+            # Slugs are assigned at insert time and checked in bulk, not row by row
+            pet.full_clean(exclude=['slug', 'import_reference', *IMAGE_COLUMNS], validate_unique=False)
+        except ValidationError as error:
+            problems = [f'{name}: {" ".join(messages)}' for name, messages in error.message_dict.items()]
+        else:
+            problems = []
+
+        images = {}
+        for column in IMAGE_COLUMNS:
+            if row.get(column):
+                path = image_dir / str(row[column]).strip()
+                if path.is_file():
+                    images[column] = path
+                else:
+                    problems.append(f'{column}: no file at {path}')
+
+        if problems:
+            errors.append((line, '; '.join(problems)))
+        else:
+            valid.append(ImportRow(line, reference, pet, images))
+    return valid, errors
+
+
+def assign_slugs(pets, taken):
+    """Give every pet a slug that is unique among ``taken``, which is updated in place"""
+    for pet in pets:
+        pet.slug = unique_slug(slug_base(pet.name), taken)
+        taken.add(pet.slug)
+
+
+def ingest_image(pet_id, slug, column, source_path):
+    """
+    Copy one image into media storage and generate its variants; executed
+    inside a worker process.
+
+    Returns ``(pet_id, column, stored_name, variants_written, error)``.
+    """
+    try:
+        model_field = Pet._meta.get_field(column)
+        filename = model_field.generate_filename(None, f'{slug}-{column}{Path(source_path).suffix.lower()}')
+        with open(source_path, 'rb') as fh:
+            stored_name = model_field.storage.save(filename, File(fh))
+        pet = Pet(pk=pet_id, slug=slug, **{column: stored_name})
+        written = generate_variants(getattr(pet, column))
+        return pet_id, column, stored_name, len(written), ''
+    except Exception:
+        return pet_id, column, None, 0, traceback.format_exc()
@@ -0,0 +1,113 @@
+"""
+Database-backed queue for post-upload image processing.
+
+Saving a Pet or SuccessStory only records an ImageJob row; the
+``image_worker`` management command claims pending jobs and generates
+the image variants in a process pool, off the request path.
+
+A claimed job holds a lease of ``LEASE_SECONDS``. If its worker crashes or
+is killed the job stays running until the lease runs out; the next claim
+then puts it back in the queue (or fails it once it has used up its
+attempts).
+"""
+import traceback
+from datetime import timedelta
+
+import django
+from django.apps import apps
+from django.db import connections
+from django.db.models import F
+from django.utils import timezone
+
+from .images import generate_instance_variants
+from .models import ImageJob
+
+
+# Failed jobs are retried until they have been attempted this many times
+MAX_ATTEMPTS = 3
+
+# Seconds a worker may hold a claimed job before it is presumed dead
+LEASE_SECONDS = 15 * 60
+
+
+def init_worker_process():
+    """Process pool initializer: each pool process needs its own app registry and DB connections"""
+    django.setup()
+    connections.close_all()
+
+
+def enqueue_image_job(instance):
+    """Queue variant generation for an instance unless a job is already pending"""
+    label = instance._meta.label_lower
+    if ImageJob.objects.filter(model_label=label, object_id=instance.pk, status='pending').exists():
+        return None
+    return ImageJob.objects.create(model_label=label, object_id=instance.pk)
+
+
+def reclaim_expired_jobs():
+    """Release running jobs whose lease has run out; returns (requeued, failed)"""
+    expired = ImageJob.objects.filter(
+        status='running', claimed_at__lt=timezone.now() - timedelta(seconds=LEASE_SECONDS),
+    )
+    requeued = expired.filter(attempts__lt=MAX_ATTEMPTS).update(status='pending')
+    failed = expired.update(
+        status='failed', error='The worker running this job stopped before finishing it',
+        finished_at=timezone.now(),
+    )
+    return requeued, failed
+
+
+def claim_jobs(limit):
+    """
+    Atomically move up to ``limit`` pending jobs to running.
+
+    The conditional update makes it safe to run several workers against
+    the same database: a job is only returned to the worker that flipped it.
+    Jobs abandoned by a dead worker are released first.
+    """
+    reclaim_expired_jobs()
+    candidates = ImageJob.objects.filter(status='pending').order_by('created_at').values_list('pk', flat=True)[:limit]
+    claimed = []
+    for job_id in list(candidates):
+        updated = ImageJob.objects.filter(pk=job_id, status='pending').update(
+            status='running',
+            attempts=F('attempts') + 1,
+            claimed_at=timezone.now(),
+        )
+        if updated:
+            claimed.append(job_id)
+    return list(ImageJob.objects.filter(pk__in=claimed).values_list('pk', 'model_label', 'object_id'))
+
+
+def run_image_job(job_id, model_label, object_id):
+    """
+    Generate variants for one job; executed inside a worker process.
+
+    Returns ``(job_id, variants_written, error)``. A deleted instance is not
+    an error - there is simply nothing left to process.
+    """
+    try:
+        model = apps.get_model(model_label)
+        instance = model.objects.filter(pk=object_id).first()
+        written = generate_instance_variants(instance) if instance else []
+        if written and model_label == 'shelter.pet':
+            # Bump updated_at so cached pet cards pick up the new variants
+            model.objects.filter(pk=object_id).update(updated_at=timezone.now())
+        return job_id, len(written), ''
+    except Exception:
+        return job_id, 0, traceback.format_exc()
+
+
+def finish_job(job_id, variants_written, error):
+    """Record the outcome of a job, unless its lease expired and it was reclaimed meanwhile"""
+    ImageJob.objects.filter(pk=job_id, status='running').update(
+        status='failed' if error else 'done',
+        variants_written=variants_written,
+        error=error,
+        finished_at=timezone.now(),
+    )
+
+
+def retry_failed_jobs():
+    """Move retryable failed jobs back to pending; returns the number requeued"""
+    return ImageJob.objects.filter(status='failed', attempts__lt=MAX_ATTEMPTS).update(status='pending')
@@ -0,0 +1,271 @@
+"""
+Live admin dashboard feed.
+
+Staff dashboards served under ASGI keep one server-sent-events stream
+open (``admin_live``) instead of polling ``admin_stats_api``. The stream
+is an async generator, so an open tab holds no worker thread. Under WSGI
+each open tab would pin a sync worker, so there the dashboard keeps
+polling the stats API instead.
+
+``broker`` is an in-process publish/subscribe hub: signals publish new
+applications and contact messages once their transaction commits, and
+after counted rows change the counters are recomputed once and only the
+ones that moved are pushed. However many tabs are open, a change costs
+one stats recompute (coalesced over ``SHELTER_LIVE_STATS_DELAY``
+seconds) and an idle stream costs nothing.
+
+The hub and the stats cache (``LocMemCache``) are per process. With
+several workers a tab hears about the writes its own worker handled; the
+counters of other workers' and management commands' writes arrive when
+the stream's worker recomputes them from the database, which it does
+once its cached counters are ``SHELTER_STATS_CACHE_TIMEOUT`` seconds old.
+"""
+import asyncio
+import json
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.urls import reverse
+
+from .stats import get_stats, invalidate_stats
+
+
+# Events kept for browsers that reconnect with Last-Event-ID
+HISTORY_SIZE = 200
+
+# Events a stream may fall behind by before it is closed (the browser reconnects)
+QUEUE_SIZE = 100
+
+# Seconds between keep-alive comments on an idle stream
+HEARTBEAT_SECONDS = 15
+
+# Milliseconds the browser waits before reconnecting a closed stream
+RETRY_MILLISECONDS = 5000
+
+
+@dataclass(frozen=True)
+class Event:
+    """One server-sent event; only events with an id are replayed on reconnect"""
+    name: str
+    data: dict
+    id: int = None
+
+    def encode(self):
+        """The event in text/event-stream framing"""
+        lines = [] if self.id is None else [f'id: {self.id}']
+        lines += [f'event: {self.name}', f'data: {json.dumps(self.data, cls=DjangoJSONEncoder)}']
+        return '\n'.join(lines) + '\n\n'
+
+
+class AsyncSubscription:
+    """The event queue of a stream served on an ASGI event loop; delivered to from any thread"""
+
+    def __init__(self):
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(QUEUE_SIZE)
+        self.overflowed = False
+
+    def deliver(self, event):
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            # The loop closed under a stream that is about to unsubscribe
+            pass
+
+    def _put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    async def get(self, timeout):
+        """The next event, or None after ``timeout`` seconds"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class Broker:
+    """Fans events out to the open streams of this process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = set()
+        self._history = deque(maxlen=HISTORY_SIZE)
+        self._last_id = 0
+        self._stats = None
+        self._stats_read_at = 0.0
+        self._stats_timer = None
+
+    def subscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.add(subscription)
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    @property
+    def has_subscribers(self):
+        return bool(self._subscriptions)
+
+    def _broadcast(self, event):
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            subscription.deliver(event)
+
+    def publish(self, name, data):
+        """Send an event to every stream and keep it for reconnecting browsers"""
+        with self._lock:
+            self._last_id += 1
+            event = Event(name, data, self._last_id)
+            self._history.append(event)
+        self._broadcast(event)
+        return event
+
+    def missed(self, last_id):
+        """Events published after ``last_id``, or None when some of them are no longer kept"""
+        with self._lock:
+            if last_id > self._last_id:
+                # An id from before a restart, or from another worker
+                return None
+            if self._history and last_id < self._history[0].id - 1:
+                return None
+            return [event for event in self._history if event.id > last_id]
+
+    def snapshot(self):
+        """All counters, for a stream that just opened"""
+        with self._lock:
+            stats = self._stats
+        if stats is None:
+            stats = self._store_stats(get_stats())
+        return stats
+
+    def _store_stats(self, stats):
+        """Keep the counters just read; returns them"""
+        with self._lock:
+            self._stats, self._stats_read_at = stats, time.monotonic()
+        return stats
+
+    def _push_stats(self, stats):
+        """Store the counters and send the ones that moved since the last push"""
+        with self._lock:
+            previous = self._stats or {}
+        self._store_stats(stats)
+        changed = {name: value for name, value in stats.items() if previous.get(name) != value}
+        if changed:
+            self._broadcast(Event('stats', changed))
+
+    def refresh_stats(self):
+        """Re-read the counters once they are older than the stats cache timeout, picking up other workers' writes"""
+        max_age = getattr(settings, 'SHELTER_STATS_CACHE_TIMEOUT', 30)
+        with self._lock:
+            if self._stats is not None and time.monotonic() - self._stats_read_at < max_age:
+                return
+        self._push_stats(get_stats())
+
+    def stats_changed(self):
+        """Counted rows changed (after commit): push the new counters once the changes settle"""
+        if not self.has_subscribers:
+            # Nobody is watching; the next stream to open reads fresh counters
+            with self._lock:
+                self._stats = None
+            return
+        delay = getattr(settings, 'SHELTER_LIVE_STATS_DELAY', 0.5)
+        if delay <= 0:
+            self._recompute_stats()
+            return
+        with self._lock:
+            if self._stats_timer is not None:
+                return
+            timer = self._stats_timer = threading.Timer(delay, self._flush_stats)
+        timer.daemon = True
+        timer.start()
+
+    def _recompute_stats(self):
+        # A read racing the committing transaction may have cached the old counters
+        invalidate_stats()
+        self._push_stats(get_stats())
+
+    def _flush_stats(self):
+        with self._lock:
+            self._stats_timer = None
+        try:
+            self._recompute_stats()
+        finally:
+            connections.close_all()
+
+
+broker = Broker()
+
+
+def application_event(application):
+    """The 'application' event data of a newly submitted application"""
+    return {
+        'id': application.pk,
+        'name': f'{application.first_name} {application.last_name}',
+        'email': application.email,
+        'pet_name': application.pet.name,
+        'pet_summary': f'{application.pet.breed} • {application.pet.age}',
+        'status': application.status,
+        'status_display': application.get_status_display(),
+        'submitted_at': application.submitted_at,
+        'url': reverse('admin_application_detail', args=[application.pk]),
+    }
+
+
+def message_event(contact):
+    """The 'message' event data of a new contact message"""
+    return {
+        'id': contact.pk,
+        'name': contact.name,
+        'subject': contact.subject,
+        'created_at': contact.created_at,
+        'url': reverse('admin_contact_detail', args=[contact.pk]),
+    }
+
+
+def _opening(last_event_id):
+    """The start of a stream: the reconnect delay, any missed events and all counters"""
+    chunks = [f'retry: {RETRY_MILLISECONDS}\n\n']
+    if last_event_id is not None:
+        missed = broker.missed(last_event_id)
+        if missed is None:
+            # Too much was missed to replay; the dashboard reloads itself
+            chunks.append(Event('resync', {}).encode())
+        else:
+            chunks += [event.encode() for event in missed]
+    chunks.append(Event('stats', broker.snapshot()).encode())
+    return chunks
+
+
+def _max_seconds():
+    # Streams are closed now and then so browsers reconnect (and resync if needed)
+    return getattr(settings, 'SHELTER_LIVE_MAX_SECONDS', 300)
+
+
+async def event_stream(last_event_id=None):
+    """The text/event-stream of the dashboard feed; an idle stream holds no thread"""
+    subscription = AsyncSubscription()
+    broker.subscribe(subscription)
+    try:
+        for chunk in await sync_to_async(_opening)(last_event_id):
+            yield chunk
+        deadline = time.monotonic() + _max_seconds()
+        while not subscription.overflowed and (remaining := deadline - time.monotonic()) > 0:
+            event = await subscription.get(min(HEARTBEAT_SECONDS, remaining))
+            if event is None:
+                await sync_to_async(broker.refresh_stats)()
+                yield ': keep-alive\n\n'
+            else:
+                yield event.encode()
+    finally:
+        broker.unsubscribe(subscription)
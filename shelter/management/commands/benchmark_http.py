@@ -0,0 +1,69 @@
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from shelter.performance import percentile
+
+
+DEFAULT_PATHS = ['/', '/pets/', '/success-stories/']
+
+
+def _fetch(url, headers=None):
+    started = time.perf_counter()
+    etag = None
+    try:
+        request = urllib.request.Request(url, headers=headers or {})
+        with urllib.request.urlopen(request, timeout=30) as response:
+            response.read()
+            ok = response.status == 200
+            etag = response.headers.get('ETag')
+    except urllib.error.HTTPError as error:
+        # A revalidated page comes back as 304 Not Modified
+        ok = error.code == 304
+    except (urllib.error.URLError, OSError):
+        ok = False
+    return ok, time.perf_counter() - started, etag
+
+
+class Command(BaseCommand):
+    help = (
+        'Load-test a running server, e.g. compare '
+        '"gunicorn pawhaven_project.wsgi" with "uvicorn pawhaven_project.asgi:application"'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='*', default=DEFAULT_PATHS, help='URL paths to request')
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000', help='Server to benchmark')
+        parser.add_argument('--requests', type=int, default=500, help='Requests per path')
+        parser.add_argument('--concurrency', type=int, default=20, help='Requests in flight at once')
+        parser.add_argument(
+            '--revalidate', action='store_true',
+            help='Send If-None-Match with the ETag of the first response, like a cache in front of the site',
+        )
+
+    def handle(self, *args, **options):
+        base_url = options['base_url'].rstrip('/')
+
+        self.stdout.write(f'{base_url} - {options["requests"]} requests per path, concurrency {options["concurrency"]}')
+        for path in options['paths']:
+            url = base_url + path
+            ok, duration, etag = _fetch(url)  # Warm up caches and connections
+            headers = {'If-None-Match': etag} if options['revalidate'] and etag else {}
+
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+                results = list(pool.map(_fetch, [url] * options['requests'], [headers] * options['requests']))
+            elapsed = time.perf_counter() - started
+
+            latencies = sorted(result[1] * 1000 for result in results)
+            failures = sum(1 for result in results if not result[0])
+            self.stdout.write(
+                f'{path:<24} {len(results) / elapsed:8.1f} req/s  '
+                f'p50 {percentile(latencies, 50):7.1f} ms  '
+                f'p95 {percentile(latencies, 95):7.1f} ms  '
+                f'p99 {percentile(latencies, 99):7.1f} ms  '
+                f'failed {failures}'
+            )
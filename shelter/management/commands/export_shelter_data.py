@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from shelter.exports import CHUNK_SIZE, DATASETS, FORMATS, export_lines
+
+
+class Command(BaseCommand):
+    help = 'Export applications, contact messages or pets as CSV or JSON Lines, streamed in chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=sorted(DATASETS), help='What to export')
+        parser.add_argument('--format', dest='export_format', choices=sorted(FORMATS), default='csv')
+        parser.add_argument('--output', '-o', help='File to write (default: standard output)')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='Rows fetched per database round trip')
+
+    def handle(self, *args, **options):
+        lines = export_lines(options['dataset'], options['export_format'], options['chunk_size'])
+        started = time.perf_counter()
+        if options['output']:
+            with open(options['output'], 'w', newline='', encoding='utf-8') as fh:
+                written = self.write_lines(lines, fh.write)
+        else:
+            written = self.write_lines(lines, lambda line: self.stdout.write(line, ending=''))
+
+        rows = written - 1 if options['export_format'] == 'csv' else written  # Less the CSV header
+        # The summary goes to stderr so it never ends up in the exported data
+        self.stderr.write(f'Exported {rows} {options["dataset"]} in {time.perf_counter() - started:.2f} s')
+
+    def write_lines(self, lines, write):
+        written = 0
+        for line in lines:
+            write(line)
+            written += 1
+        return written
@@ -0,0 +1,144 @@
+import re
+from collections import Counter, defaultdict
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+
+import shelter
+
+
+APP_DIR = Path(shelter.__file__).resolve().parent
+TEMPLATE_DIR = APP_DIR / 'templates' / 'shelter'
+BUNDLE_DIR = APP_DIR / 'static' / 'shelter' / 'css' / 'pages'
+BUNDLE_URL = 'shelter/css/pages'
+
+# Templates whose inline styles are moved to static bundles
+TEMPLATES = sorted(TEMPLATE_DIR.glob('admin/*.html')) + [TEMPLATE_DIR / 'success.html']
+
+# Rules shared by several admin pages go to one bundle the browser caches once
+COMMON_BUNDLE = 'admin-common'
+
+# Above-the-fold rules (the page hero) that stay inline
+CRITICAL_SELECTOR = re.compile(r'^\.(admin-hero|success-hero|admin-user-info|admin-badge|lead)\b')
+
+STYLE_BLOCK = re.compile(r'\n?<style>\n(.*?)</style>\n?', re.DOTALL)
+TITLE_BLOCK = re.compile(r'({% block title %}.*?{% endblock %}\n)')
+COMMENT = re.compile(r'/\*.*?\*/', re.DOTALL)
+
+
+def split_rules(css):
+    """Split a stylesheet into its top-level rules (an @media block is one rule)"""
+    css = COMMENT.sub('', css)
+    rules, depth, start = [], 0, 0
+    for position, char in enumerate(css):
+        if char == '{':
+            depth += 1
+        elif char == '}':
+            depth -= 1
+            if depth == 0:
+                rules.append(css[start:position + 1].strip())
+                start = position + 1
+    return rules
+
+
+def selector(rule):
+    return ' '.join(rule.split('{', 1)[0].split())
+
+
+def normalized(rule):
+    return ' '.join(rule.split())
+
+
+def is_critical(rule):
+    return all(CRITICAL_SELECTOR.match(part.strip()) for part in selector(rule).split(','))
+
+
+class Command(BaseCommand):
+    help = 'Move inline <style> blocks from the admin and success templates into static CSS bundles'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Report what would change without writing files')
+
+    def handle(self, *args, **options):
+        pages = {}
+        for path in TEMPLATES:
+            source = path.read_text()
+            match = STYLE_BLOCK.search(source)
+            if match:
+                pages[path] = (source, match, split_rules(match.group(1)))
+        if not pages:
+            self.stdout.write('No inline styles left to extract')
+            return
+
+        common = self.common_rules({
+            path: [rule for rule in rules if not is_critical(rule)]
+            for path, (source, match, rules) in pages.items()
+            if path.parent.name == 'admin'
+        })
+        common_css = []
+        for path, (source, match, rules) in pages.items():
+            common_css.extend(rule for rule in rules if normalized(rule) in common and rule not in common_css)
+
+        if not options['dry_run']:
+            BUNDLE_DIR.mkdir(parents=True, exist_ok=True)
+            if common_css:
+                self.write_bundle(COMMON_BUNDLE, common_css)
+
+        for path, (source, match, rules) in pages.items():
+            critical = [rule for rule in rules if is_critical(rule)]
+            shared = [rule for rule in rules if normalized(rule) in common]
+            own = [rule for rule in rules if rule not in critical and rule not in shared]
+
+            links = ([COMMON_BUNDLE] if shared else []) + ([path.stem] if own else [])
+            head = ''.join(
+                f'<link rel="stylesheet" href="{{% static \'{BUNDLE_URL}/{name}.css\' %}}">\n'
+                for name in links
+            )
+            if critical:
+                head += '<style data-critical>\n' + '\n\n'.join(critical) + '\n</style>\n'
+
+            rewritten = source[:match.start()] + '\n' + source[match.end():]
+            rewritten = TITLE_BLOCK.sub(
+                lambda title: f'{title.group(1)}\n{{% block extra_css %}}\n{head}{{% endblock %}}\n',
+                rewritten, count=1,
+            )
+
+            self.stdout.write(
+                f'{path.relative_to(TEMPLATE_DIR)}: {len(source.encode())} -> {len(rewritten.encode())} bytes '
+                f'({len(own)} own, {len(shared)} shared, {len(critical)} inline rules)'
+            )
+            if not options['dry_run']:
+                if own:
+                    self.write_bundle(path.stem, own)
+                path.write_text(rewritten)
+
+    def common_rules(self, page_rules):
+        """
+        Rules found on two or more admin pages.
+
+        A rule only moves to the shared bundle when no other rule on the
+        same pages uses its selector, so reordering it can't change which
+        declaration wins.
+        """
+        seen = Counter()
+        for rules in page_rules.values():
+            seen.update({normalized(rule) for rule in rules})
+        candidates = {rule for rule, count in seen.items() if count > 1}
+
+        selectors = defaultdict(set)
+        for rules in page_rules.values():
+            for rule in rules:
+                selectors[selector(rule)].add(normalized(rule))
+        return {rule for rule in candidates if len(selectors[selector(rule)]) == 1 and self.unique_on_pages(rule, page_rules)}
+
+    def unique_on_pages(self, rule, page_rules):
+        for rules in page_rules.values():
+            normalized_rules = [normalized(other) for other in rules]
+            if rule in normalized_rules and sum(selector(other) == selector(rule) for other in rules) > 1:
+                return False
+        return True
+
+    def write_bundle(self, name, rules):
+        path = BUNDLE_DIR / f'{name}.css'
+        path.write_text('\n\n'.join(rules) + '\n')
+        self.stdout.write(f'  wrote {path.relative_to(APP_DIR)}')
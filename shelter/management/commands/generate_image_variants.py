@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from shelter.images import generate_instance_variants
+from shelter.models import Pet, SuccessStory
+
+
+class Command(BaseCommand):
+    help = 'Generate resized image variants for existing pets and success stories'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Regenerate variants even if they already exist',
+        )
+
+    def handle(self, *args, **options):
+        total = 0
+        for model in (Pet, SuccessStory):
+            for instance in model.objects.iterator():
+                written = generate_instance_variants(instance, force=options['force'])
+                total += len(written)
+                if written:
+                    self.stdout.write(f'{instance}: {len(written)} variants')
+        self.stdout.write(self.style.SUCCESS(f'Generated {total} image variants'))
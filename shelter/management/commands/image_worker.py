@@ -0,0 +1,50 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from shelter.jobs import claim_jobs, finish_job, init_worker_process, retry_failed_jobs, run_image_job
+
+
+def _run_in_worker(job):
+    try:
+        return run_image_job(*job)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Process queued image jobs (variant generation) in a process pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=2, help='Number of worker processes')
+        parser.add_argument('--batch-size', type=int, default=8, help='Jobs claimed per poll')
+        parser.add_argument('--poll-interval', type=float, default=2.0, help='Seconds to sleep when the queue is empty')
+        parser.add_argument('--once', action='store_true', help='Drain the queue once and exit')
+        parser.add_argument('--retry-failed', action='store_true', help='Requeue failed jobs before starting')
+
+    def handle(self, *args, **options):
+        if options['retry_failed']:
+            self.stdout.write(f'Requeued {retry_failed_jobs()} failed jobs')
+
+        # Don't hand the parent's open connection to forked children
+        connections.close_all()
+
+        with ProcessPoolExecutor(max_workers=options['processes'], initializer=init_worker_process) as pool:
+            while True:
+                jobs = claim_jobs(options['batch_size'])
+                if not jobs:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+
+                for job_id, written, error in pool.map(_run_in_worker, jobs):
+                    finish_job(job_id, written, error)
+                    if error:
+                        self.stderr.write(f'Job {job_id} failed:\n{error}')
+                    else:
+                        self.stdout.write(f'Job {job_id}: {written} variants')
+
+        self.stdout.write(self.style.SUCCESS('Image queue drained'))
@@ -0,0 +1,136 @@
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.utils import timezone
+
+from shelter.imports import IMAGE_COLUMNS, assign_slugs, ingest_image, read_manifest, validate_rows
+from shelter.jobs import init_worker_process
+from shelter.metrics import rollup_days
+from shelter.models import Pet
+from shelter.search import get_search_backend
+from shelter.stats import invalidate_stats
+
+
+class Command(BaseCommand):
+    help = (
+        'Import pets from a CSV or JSON manifest. Rows are validated first, inserted in chunks '
+        'and their images processed in worker processes; rerunning skips pets already imported.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('manifest', help='Path to a .csv or .json manifest')
+        parser.add_argument('--source', help='Name of the partner shelter (default: the manifest file name)')
+        parser.add_argument('--image-dir', help='Directory image paths are relative to (default: the manifest\'s)')
+        parser.add_argument('--chunk-size', type=int, default=500, help='Pets inserted per statement')
+        parser.add_argument('--processes', type=int, default=2, help='Image worker processes')
+        parser.add_argument('--skip-invalid', action='store_true', help='Import the valid rows even if some are invalid')
+        parser.add_argument('--dry-run', action='store_true', help='Only validate the manifest')
+
+    def handle(self, *args, **options):
+        manifest = Path(options['manifest'])
+        source = options['source'] or manifest.stem
+        started = time.perf_counter()
+
+        try:
+            rows = read_manifest(manifest)
+        except (OSError, ValueError) as error:
+            raise CommandError(f'Could not read {manifest}: {error}')
+        valid, errors = validate_rows(rows, source, options['image_dir'] or manifest.parent)
+        for line, message in errors:
+            self.stderr.write(f'Row {line}: {message}')
+        if errors and not options['skip_invalid']:
+            raise CommandError(f'{len(errors)} of {len(rows)} rows are invalid; nothing was imported')
+        if options['dry_run']:
+            self.stdout.write(f'{len(valid)} of {len(rows)} rows are valid')
+            return
+
+        # Don't hand the parent's open connection to forked children
+        connections.close_all()
+
+        self.created = self.skipped = self.images = self.variants = self.failed_images = 0
+        self.pending_images = {}
+        with ProcessPoolExecutor(max_workers=options['processes'], initializer=init_worker_process) as pool:
+            futures = []
+            taken = set(Pet.objects.values_list('slug', flat=True))
+            chunk_size = options['chunk_size']
+            for offset in range(0, len(valid), chunk_size):
+                chunk = valid[offset:offset + chunk_size]
+                for pet_id, slug, column, path in self.import_chunk(chunk, taken):
+                    futures.append(pool.submit(ingest_image, pet_id, slug, column, str(path)))
+                elapsed = time.perf_counter() - started
+                done = offset + len(chunk)
+                self.stdout.write(f'{done}/{len(valid)} rows, {done / elapsed:.0f} rows/s')
+
+            for future in as_completed(futures):
+                self.record_image(*future.result())
+                if len(self.pending_images) >= chunk_size:
+                    self.save_image_names()
+        self.save_image_names()
+
+        # bulk_create() and bulk_update() send no post_save, so the cached
+        # counters are cleared and the arrival days re-rolled here
+        invalidate_stats()
+        if valid:
+            arrivals = [row.pet.arrival_date for row in valid]
+            rollup_days(min(arrivals), max(arrivals))
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {self.created} pets ({self.skipped} already imported) from {len(valid)} rows '
+            f'in {elapsed:.1f} s, {len(valid) / elapsed:.0f} rows/s; '
+            f'{self.images} images with {self.variants} variants, {self.failed_images} images failed'
+        ))
+
+    def import_chunk(self, chunk, taken):
+        """Insert the chunk's new pets; returns the image jobs (pet id, slug, column, path) still to run"""
+        existing = {
+            reference: (pk, slug, images)
+            for reference, pk, slug, *images in Pet.objects.filter(
+                import_reference__in=[row.reference for row in chunk],
+            ).values_list('import_reference', 'pk', 'slug', *IMAGE_COLUMNS)
+        }
+        new_rows = [row for row in chunk if row.reference not in existing]
+        assign_slugs([row.pet for row in new_rows], taken)
+        with transaction.atomic():
+            Pet.objects.bulk_create([row.pet for row in new_rows])
+            get_search_backend().index_pets([row.pet for row in new_rows])
+        self.created += len(new_rows)
+        self.skipped += len(chunk) - len(new_rows)
+
+        jobs = []
+        for row in chunk:
+            if row.reference in existing:
+                # Imported before; only images that never made it are redone
+                pet_id, slug, stored_images = existing[row.reference]
+                stored = dict(zip(IMAGE_COLUMNS, stored_images))
+            else:
+                pet_id, slug, stored = row.pet.pk, row.pet.slug, {}
+            jobs += [
+                (pet_id, slug, column, path)
+                for column, path in row.images.items()
+                if not stored.get(column)
+            ]
+        return jobs
+
+    def record_image(self, pet_id, column, stored_name, variants, error):
+        if error:
+            self.failed_images += 1
+            self.stderr.write(f'Pet {pet_id} {column} failed:\n{error}')
+            return
+        self.images += 1
+        self.variants += variants
+        self.pending_images.setdefault(pet_id, {})[column] = stored_name
+
+    def save_image_names(self):
+        """Store the processed image names, one bulk update per image column"""
+        now = timezone.now()
+        for column in IMAGE_COLUMNS:
+            pets = [
+                Pet(pk=pet_id, updated_at=now, **{column: images[column]})
+                for pet_id, images in self.pending_images.items()
+                if column in images
+            ]
+            Pet.objects.bulk_update(pets, [column, 'updated_at'], batch_size=500)
+        self.pending_images = {}
@@ -0,0 +1,32 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from django.db.models.functions import Lower, Trim
+
+from shelter.models import AdoptionApplication
+
+
+class Command(BaseCommand):
+    help = (
+        'Link applications sent without an account to the user with the same email. '
+        'New accounts are linked on registration; this backfills existing data.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report how many would be linked')
+
+    def handle(self, *args, **options):
+        users = User.objects.exclude(email='').annotate(email_normalized=Lower(Trim('email')))
+        owner = users.filter(email_normalized=OuterRef('email_normalized')).values('pk')[:1]
+        orphans = AdoptionApplication.objects.filter(
+            email_normalized__in=users.values('email_normalized'),
+        ).linkable()
+
+        if options['dry_run']:
+            self.stdout.write(f'{orphans.count()} applications would be linked to their users')
+            return
+
+        with transaction.atomic():
+            linked = orphans.update(user=Subquery(owner))
+        self.stdout.write(self.style.SUCCESS(f'Linked {linked} applications to their users'))
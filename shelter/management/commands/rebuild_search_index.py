@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from shelter.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index for pets'
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        count = backend.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'Indexed {count} pets with {backend.__class__.__name__}'
+        ))
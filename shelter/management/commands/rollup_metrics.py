@@ -0,0 +1,63 @@
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Min
+from django.utils import timezone
+
+from shelter.metrics import rollup_days
+from shelter.models import AdoptionApplication, ContactMessage, Pet
+
+
+# Days recomputed per transaction when backfilling
+WINDOW_DAYS = 31
+
+
+def _first_activity_date():
+    """The earliest day anything in the raw tables counts towards"""
+    firsts = [
+        Pet.objects.aggregate(first=Min('arrival_date'))['first'],
+        AdoptionApplication.objects.aggregate(first=Min('submitted_at'))['first'],
+        ContactMessage.objects.aggregate(first=Min('created_at'))['first'],
+    ]
+    days = [timezone.localdate(first) if hasattr(first, 'hour') else first for first in firsts if first]
+    return min(days) if days else None
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute the daily metrics table from the raw tables. By default the last two '
+        'days are re-rolled (run it from cron); use --since or --all to backfill history.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=2, help='Re-roll this many days up to today')
+        parser.add_argument('--since', type=date.fromisoformat, help='Re-roll from this date (YYYY-MM-DD) up to today')
+        parser.add_argument('--all', action='store_true', help='Re-roll everything since the first recorded activity')
+
+    def handle(self, *args, **options):
+        today = timezone.localdate()
+        if options['all']:
+            first = _first_activity_date() or today
+        elif options['since']:
+            first = options['since']
+        else:
+            if options['days'] < 1:
+                raise CommandError('--days must be at least 1')
+            first = today - timedelta(days=options['days'] - 1)
+        if first > today:
+            raise CommandError('Nothing to roll up after today')
+
+        started = time.perf_counter()
+        rows = 0
+        window_start = first
+        while window_start <= today:
+            window_end = min(window_start + timedelta(days=WINDOW_DAYS - 1), today)
+            rows += rollup_days(window_start, window_end)
+            window_start = window_end + timedelta(days=1)
+
+        days = (today - first).days + 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Rolled up {days} days ({first} to {today}) into {rows} rows '
+            f'in {time.perf_counter() - started:.2f} s'
+        ))
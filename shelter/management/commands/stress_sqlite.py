@@ -0,0 +1,102 @@
+import shutil
+import sqlite3
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, connections, transaction
+
+from shelter.models import AdoptionApplication, ContactMessage, Pet
+
+
+def _init_worker(database_name, options):
+    # Point this process at the scratch copy with the options being measured
+    connections.close_all()
+    connection.settings_dict.update(NAME=database_name, OPTIONS=options)
+
+
+def _write_batch(worker, writes, pet_id):
+    """Insert contact messages and applications the way the public forms do"""
+    done = failed = 0
+    started = time.perf_counter()
+    for i in range(writes):
+        try:
+            if i % 2:
+                ContactMessage.objects.create(
+                    name=f'Stress {worker}', email='stress@example.com',
+                    subject=f'Message {i}', message='Is this pet still available?',
+                )
+            else:
+                # A read followed by a write in one transaction: the case that
+                # fails straight away under BEGIN DEFERRED
+                with transaction.atomic():
+                    AdoptionApplication.objects.filter(pet_id=pet_id, status='pending').exists()
+                    AdoptionApplication.objects.create(
+                        first_name='Stress', last_name=str(worker), email='stress@example.com',
+                        phone='000', address='1 Test Street', pet_id=pet_id,
+                        housing_type='House', own_or_rent='own', household_adults=1,
+                        previous_pet_experience='Some', reason_for_adoption='Testing',
+                    )
+            done += 1
+        except OperationalError:
+            failed += 1
+    connections.close_all()
+    return done, failed, time.perf_counter() - started
+
+
+class Command(BaseCommand):
+    help = 'Measure concurrent write throughput on a scratch copy of the SQLite database, default vs tuned settings'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=4, help='Concurrent writer processes')
+        parser.add_argument('--writes', type=int, default=200, help='Writes per process')
+
+    def handle(self, *args, **options):
+        source = settings.DATABASES['default']
+        if source['ENGINE'] != 'django.db.backends.sqlite3':
+            raise CommandError('stress_sqlite only works with SQLite')
+        pet = Pet.objects.only('pk').first()
+        if pet is None:
+            raise CommandError('Add at least one pet before running the stress test')
+
+        modes = [
+            ('default', {}),
+            ('tuned', settings.SHELTER_SQLITE_TUNED_OPTIONS),
+        ]
+        scratch = Path(tempfile.mkdtemp(prefix='pawhaven-stress-'))
+        connections.close_all()
+        try:
+            for mode, mode_options in modes:
+                database_name = str(scratch / f'{mode}.sqlite3')
+                original, copy = sqlite3.connect(source['NAME']), sqlite3.connect(database_name)
+                try:
+                    original.backup(copy)
+                finally:
+                    copy.close()
+                    original.close()
+
+                started = time.perf_counter()
+                with ProcessPoolExecutor(
+                    max_workers=options['processes'],
+                    initializer=_init_worker,
+                    initargs=(database_name, mode_options),
+                ) as pool:
+                    results = list(pool.map(
+                        _write_batch,
+                        range(options['processes']),
+                        [options['writes']] * options['processes'],
+                        [pet.pk] * options['processes'],
+                    ))
+                elapsed = time.perf_counter() - started
+
+                done = sum(result[0] for result in results)
+                failed = sum(result[1] for result in results)
+                self.stdout.write(
+                    f'{mode:<8} {done:6d} writes  {failed:5d} locked  '
+                    f'{done / elapsed:8.1f} writes/s  ({elapsed:.2f}s)'
+                )
+        finally:
+            shutil.rmtree(scratch, ignore_errors=True)
@@ -0,0 +1,28 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = 'Copy the primary SQLite database over the local replica (SHELTER_DB_PROFILE=sqlite-replica)'
+
+    def handle(self, *args, **options):
+        databases = settings.DATABASES
+        replica = settings.SHELTER_REPLICA_DATABASE
+        if not replica:
+            raise CommandError('No replica database is configured')
+        if any('sqlite' not in databases[alias]['ENGINE'] for alias in ('default', replica)):
+            raise CommandError('sync_replica only works with SQLite; use real replication for other databases')
+
+        # The backup API gives a consistent copy even while the primary is in use
+        source = sqlite3.connect(databases['default']['NAME'])
+        target = sqlite3.connect(databases[replica]['NAME'])
+        try:
+            source.backup(target)
+        finally:
+            target.close()
+            source.close()
+        self.stdout.write(self.style.SUCCESS(
+            f'Copied {databases["default"]["NAME"]} to {databases[replica]["NAME"]}'
+        ))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from shelter.warmup import warm_templates
+
+
+class Command(BaseCommand):
+    help = (
+        'Parse every template under shelter/templates and report the time taken. '
+        'Workers do the same at boot when SHELTER_WARM_TEMPLATES is on.'
+    )
+
+    def handle(self, *args, **options):
+        loaded, failures, seconds = warm_templates()
+        for name, error in failures:
+            self.stderr.write(f'{name}: {error}')
+        self.stdout.write(f'Parsed {loaded} templates in {seconds * 1000:.1f} ms')
+        if failures:
+            raise CommandError(f'{len(failures)} templates failed to parse')
@@ -0,0 +1,140 @@
+"""
+Daily adoption metrics.
+
+``DailyMetric`` holds one row per day and pet type with the day's
+activity, so trend charts read a few hundred small rows however large
+the raw tables grow. ``rollup_days(first, last)`` recomputes a range of
+days from the raw tables with one grouped aggregate per source and
+upserts their rows, so it is safe to run any number of times, also
+concurrently.
+
+Signals re-roll the days a save touches once its transaction commits,
+and only when the save changed something the metrics count (see
+``signals.py``). ``manage.py rollup_metrics`` backfills history and
+repairs anything saved without signals or whose rollup failed.
+
+Applications count as approved on the day they were first approved and
+as completed (adopting their pet) on the day their adoption was
+completed, from ``approved_at`` and ``completed_at``. Later reviews, note
+edits or a completion don't move an approval to another day.
+"""
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import AdoptionApplication, ContactMessage, DailyMetric, Pet
+
+
+METRICS = (
+    'applications_submitted', 'applications_approved', 'applications_completed',
+    'arrivals', 'adoptions', 'messages',
+)
+
+
+def _day_bounds(first, last):
+    """Aware datetimes from the start of ``first`` to the start of the day after ``last``"""
+    tz = timezone.get_current_timezone()
+    return (
+        timezone.make_aware(datetime.combine(first, time.min), tz),
+        timezone.make_aware(datetime.combine(last + timedelta(days=1), time.min), tz),
+    )
+
+
+def compute_days(first, last):
+    """The metrics of every day from ``first`` to ``last``, as {(date, pet_type): {metric: count}}"""
+    start, end = _day_bounds(first, last)
+    counts = {}
+
+    def add(day, pet_type, **values):
+        row = counts.setdefault((day, pet_type), dict.fromkeys(METRICS, 0))
+        for metric, value in values.items():
+            row[metric] += value
+
+    submitted = (
+        AdoptionApplication.objects.filter(submitted_at__gte=start, submitted_at__lt=end)
+        .order_by().values(day=TruncDate('submitted_at'), pet_type=F('pet__type'))
+        .annotate(count=Count('pk'))
+    )
+    for row in submitted:
+        add(row['day'], row['pet_type'], applications_submitted=row['count'])
+
+    approved = (
+        AdoptionApplication.objects.filter(approved_at__gte=start, approved_at__lt=end)
+        .order_by().values(day=TruncDate('approved_at'), pet_type=F('pet__type'))
+        .annotate(count=Count('pk'))
+    )
+    for row in approved:
+        add(row['day'], row['pet_type'], applications_approved=row['count'])
+
+    completed = (
+        AdoptionApplication.objects.filter(completed_at__gte=start, completed_at__lt=end)
+        .order_by().values(day=TruncDate('completed_at'), pet_type=F('pet__type'))
+        .annotate(count=Count('pk'), adopted=Count('pet', distinct=True))
+    )
+    for row in completed:
+        add(row['day'], row['pet_type'], applications_completed=row['count'], adoptions=row['adopted'])
+
+    arrivals = (
+        Pet.objects.filter(arrival_date__range=(first, last))
+        .order_by().values('arrival_date', 'type')
+        .annotate(count=Count('pk'))
+    )
+    for row in arrivals:
+        add(row['arrival_date'], row['type'], arrivals=row['count'])
+
+    messages = (
+        ContactMessage.objects.filter(created_at__gte=start, created_at__lt=end)
+        .order_by().values(day=TruncDate('created_at'))
+        .annotate(count=Count('pk'))
+    )
+    for row in messages:
+        add(row['day'], '', messages=row['count'])
+
+    return counts
+
+
+def rollup_days(first, last=None):
+    """Recompute and store the metrics of ``first`` through ``last``; returns the rows stored"""
+    last = last or first
+    counts = {key: values for key, values in compute_days(first, last).items() if any(values.values())}
+    with transaction.atomic():
+        # Upserted rather than deleted and re-inserted, so two rollups of the
+        # same day (concurrent saves, or a save during the cron) can't collide
+        # on the unique (date, pet_type) constraint
+        stored = DailyMetric.objects.bulk_create(
+            [DailyMetric(date=day, pet_type=pet_type, **values) for (day, pet_type), values in sorted(counts.items())],
+            update_conflicts=True,
+            unique_fields=['date', 'pet_type'],
+            update_fields=METRICS,
+        )
+        stale = DailyMetric.objects.filter(date__range=(first, last))
+        for day, pet_type in counts:
+            stale = stale.exclude(date=day, pet_type=pet_type)
+        stale.delete()
+    return len(stored)
+
+
+def rollup_dates(dates):
+    """Re-roll a few scattered days (the ones a save touched)"""
+    for day in sorted(set(dates)):
+        rollup_days(day)
+
+
+def time_series(first, last, pet_type=None):
+    """Daily totals of every metric from ``first`` to ``last`` as {'dates': [...], metric: [...]}"""
+    metrics = DailyMetric.objects.filter(date__range=(first, last))
+    if pet_type:
+        metrics = metrics.filter(pet_type=pet_type)
+    totals = {
+        row['date']: row
+        for row in metrics.order_by().values('date').annotate(**{metric: Sum(metric) for metric in METRICS})
+    }
+
+    days = [first + timedelta(days=offset) for offset in range((last - first).days + 1)]
+    series = {'dates': [day.isoformat() for day in days]}
+    for metric in METRICS:
+        series[metric] = [totals[day][metric] if day in totals else 0 for day in days]
+    return series
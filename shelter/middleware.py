@@ -0,0 +1,35 @@
+"""
+Authentication that leaves the session alone for visitors without one.
+
+Without a session cookie a request can only be anonymous, so the user is
+set to ``AnonymousUser`` directly instead of loading an (empty) session
+to find that out. The session is then never accessed for anonymous
+catalogue browsing.
+
+Such a page still depends on the visitor not having a session cookie (the
+navigation shows "Log in"), so it gets ``Vary: Cookie`` itself: a cache in
+front of the site must never serve it to someone who is logged in.
+"""
+from django.conf import settings
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.auth.models import AnonymousUser
+from django.utils.cache import patch_vary_headers
+
+
+async def _anonymous_user():
+    return AnonymousUser()
+
+
+class SessionlessAnonymousAuthenticationMiddleware(AuthenticationMiddleware):
+    """AuthenticationMiddleware that skips the session when there is no session cookie"""
+
+    def process_request(self, request):
+        if not request.COOKIES.get(settings.SESSION_COOKIE_NAME):
+            request.user = AnonymousUser()
+            request.auser = _anonymous_user
+            return
+        super().process_request(request)
+
+    def process_response(self, request, response):
+        patch_vary_headers(response, ('Cookie',))
+        return response
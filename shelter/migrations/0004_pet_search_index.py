@@ -0,0 +1,40 @@
+from django.db import migrations
+
+from shelter.search import FTS_TABLE, pg_document
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+            f"name, breed, description, "
+            f"tokenize='porter unicode61 remove_diacritics 2', prefix='2 3')"
+        )
+        schema_editor.execute(
+            f"INSERT INTO {FTS_TABLE} (rowid, name, breed, description) "
+            f"SELECT id, name, breed, description FROM shelter_pet"
+        )
+    elif connection.vendor == 'postgresql':
+        schema_editor.execute(
+            f"CREATE INDEX shelter_pet_search_idx ON shelter_pet USING gin ({pg_document()})"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+    elif connection.vendor == 'postgresql':
+        schema_editor.execute("DROP INDEX IF EXISTS shelter_pet_search_idx")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shelter', '0003_imagejob'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.6 on 2026-10-17 04:00
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def reject_duplicate_open_applications(apps, schema_editor):
+    """Leave one open application per user and pet, so the constraint can be added"""
+    AdoptionApplication = apps.get_model('shelter', 'AdoptionApplication')
+    open_applications = AdoptionApplication.objects.filter(
+        user__isnull=False, status__in=['pending', 'approved'],
+    )
+    kept = set()
+    duplicates = []
+    # Approved applications first, then the earliest submitted
+    rows = open_applications.order_by('status', 'submitted_at', 'pk').values_list('pk', 'user_id', 'pet_id')
+    for pk, user_id, pet_id in rows.iterator():
+        if (user_id, pet_id) in kept:
+            duplicates.append(pk)
+        else:
+            kept.add((user_id, pet_id))
+    AdoptionApplication.objects.filter(pk__in=duplicates).update(status='rejected')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shelter', '0006_application_email_normalized'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(reject_duplicate_open_applications, migrations.RunPython.noop),
+        migrations.AddField(
+            model_name='adoptionapplication',
+            name='submission_token',
+            field=models.UUIDField(blank=True, editable=False, null=True, unique=True),
+        ),
+        migrations.AddConstraint(
+            model_name='adoptionapplication',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ['pending', 'approved'])), fields=('user', 'pet'), name='application_one_open_per_user_pet'),
+        ),
+    ]
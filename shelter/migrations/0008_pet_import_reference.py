@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-17 04:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shelter', '0007_application_submission_token'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pet',
+            name='import_reference',
+            field=models.CharField(blank=True, editable=False, max_length=200, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.6 on 2026-10-17 04:12
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shelter', '0008_pet_import_reference'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyMetric',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('pet_type', models.CharField(blank=True, choices=[('dog', 'Dog'), ('cat', 'Cat'), ('rabbit', 'Rabbit'), ('bird', 'Bird')], max_length=20)),
+                ('applications_submitted', models.PositiveIntegerField(default=0)),
+                ('applications_approved', models.PositiveIntegerField(default=0)),
+                ('applications_completed', models.PositiveIntegerField(default=0)),
+                ('arrivals', models.PositiveIntegerField(default=0)),
+                ('adoptions', models.PositiveIntegerField(default=0)),
+                ('messages', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Daily Metric',
+                'verbose_name_plural': 'Daily Metrics',
+                'ordering': ['date', 'pet_type'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='adoptionapplication',
+            index=models.Index(fields=['reviewed_at'], name='application_reviewed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pet',
+            index=models.Index(fields=['arrival_date'], name='pet_arrival_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailymetric',
+            constraint=models.UniqueConstraint(fields=('date', 'pet_type'), name='dailymetric_date_type_unique'),
+        ),
+    ]
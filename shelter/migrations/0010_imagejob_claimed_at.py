@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-17 04:31
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shelter', '0009_daily_metrics'),
+    ]
+
+    operations = [
+        migrations.RenameField(
+            model_name='imagejob',
+            old_name='started_at',
+            new_name='claimed_at',
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.6 on 2026-10-17 04:57
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def stamp_existing_transitions(apps, schema_editor):
+    """Approved and completed applications took that status at their last review, as far as anyone knows"""
+    AdoptionApplication = apps.get_model('shelter', 'AdoptionApplication')
+    AdoptionApplication.objects.filter(status='approved').update(approved_at=models.F('reviewed_at'))
+    AdoptionApplication.objects.filter(status='completed').update(completed_at=models.F('reviewed_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shelter', '0010_imagejob_claimed_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='adoptionapplication',
+            name='application_reviewed_idx',
+        ),
+        migrations.AddField(
+            model_name='adoptionapplication',
+            name='approved_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='adoptionapplication',
+            name='completed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='adoptionapplication',
+            index=models.Index(fields=['approved_at'], name='application_approved_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='adoptionapplication',
+            index=models.Index(fields=['completed_at'], name='application_completed_idx'),
+        ),
+        migrations.RunPython(stamp_existing_transitions, migrations.RunPython.noop),
+    ]
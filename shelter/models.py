@@ -1,8 +1,77 @@
 from django.db import models
+from django.db.models.functions import Lower, Trim
 from django.utils.text import slugify
 from django.urls import reverse
 
 
+def slug_base(name):
+    """Slug of a pet name, leaving room in Pet.slug for a -N suffix"""
+    return slugify(name)[:94].strip('-') or 'pet'
+
+
+def unique_slug(base, taken):
+    """``base``, numbered (bella-2, bella-3) when needed to avoid the slugs in ``taken``"""
+    slug, number = base, 1
+    while slug in taken:
+        number += 1
+        slug = f'{base}-{number}'
+    return slug
+
+
+def normalize_email(email):
+    """Python twin of AdoptionApplication.email_normalized"""
+    return (email or '').strip().lower()
+
+
+class PetQuerySet(models.QuerySet):
+    """Custom queryset for pets"""
+    
+    def with_application_stats(self):
+        """Annotate total and pending application counts in the same query"""
+        return self.annotate(
+            application_count=models.Count('applications', distinct=True),
+            pending_application_count=models.Count(
+                'applications',
+                filter=models.Q(applications__status='pending'),
+                distinct=True,
+            ),
+        )
+
+
+class ApplicationQuerySet(models.QuerySet):
+    """Custom queryset for adoption applications"""
+    
+    def linkable(self):
+        """
+        Applications without an account that can be given to the account with
+        their email. Emails shared by several accounts can't say whose the
+        applications are, so they are never linked; open ones are left alone
+        when the account already has an open application for the pet, or an
+        earlier one is linked with them
+        """
+        open_statuses = AdoptionApplication.OPEN_STATUSES
+        shared_emails = (
+            self.model._meta.get_field('user').related_model.objects
+            .annotate(email_normalized=Lower(Trim('email')))
+            .order_by().values('email_normalized')
+            .annotate(accounts=models.Count('pk')).filter(accounts__gt=1)
+            .values('email_normalized')
+        )
+        account_has_open = self.model.objects.annotate(
+            account_email=Lower(Trim('user__email')),
+        ).filter(account_email=models.OuterRef('email_normalized'), pet=models.OuterRef('pet'), status__in=open_statuses)
+        earlier_open = self.model.objects.filter(
+            user__isnull=True,
+            email_normalized=models.OuterRef('email_normalized'),
+            pet=models.OuterRef('pet'),
+            status__in=open_statuses,
+            pk__lt=models.OuterRef('pk'),
+        )
+        return self.filter(user__isnull=True).exclude(email_normalized__in=shared_emails).exclude(
+            models.Q(status__in=open_statuses) & (models.Exists(account_has_open) | models.Exists(earlier_open))
+        )
+
+
 class Pet(models.Model):
     """Model representing a pet available for adoption"""
     
@@ -66,14 +135,40 @@ class Pet(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    # Source and id of pets created by `manage.py import_pets`, so reruns skip them
+    import_reference = models.CharField(max_length=200, unique=True, null=True, blank=True, editable=False)
+    
+    objects = PetQuerySet.as_manager()
+    
     class Meta:
         ordering = ['-arrival_date', 'name']
+        indexes = [
+            # Public listings: status first, then the optional filters, newest first
+            models.Index(fields=['status', '-arrival_date'], name='pet_status_arrival_idx'),
+            models.Index(fields=['status', 'type', '-arrival_date'], name='pet_status_type_arrival_idx'),
+            models.Index(fields=['status', 'size', '-arrival_date'], name='pet_status_size_arrival_idx'),
+            # Small partial indexes for the homepage and the special needs filter
+            models.Index(
+                fields=['status', '-arrival_date', 'name'],
+                condition=models.Q(featured=True),
+                name='pet_featured_status_idx',
+            ),
+            models.Index(
+                fields=['status', '-arrival_date'],
+                condition=models.Q(special_needs=True),
+                name='pet_special_needs_status_idx',
+            ),
+            # Arrivals per day for the metrics rollup
+            models.Index(fields=['arrival_date'], name='pet_arrival_idx'),
+        ]
         verbose_name = 'Pet'
         verbose_name_plural = 'Pets'
     
     def save(self, *args, **kwargs):
         if not self.slug:
-            self.slug = slugify(self.name)
+            base = slug_base(self.name)
+            taken = set(Pet.objects.filter(slug__startswith=base).values_list('slug', flat=True))
+            self.slug = unique_slug(base, taken)
         super().save(*args, **kwargs)
     
     def __str__(self):
@@ -117,6 +212,8 @@ class AdoptionApplication(models.Model):
         ('rejected', 'Rejected'),
         ('completed', 'Adoption Completed'),
     ]
+    # Statuses in which an application is still being worked on
+    OPEN_STATUSES = ['pending', 'approved']
     
     # User Link (optional - for logged-in users)
     user = models.ForeignKey('auth.User', on_delete=models.SET_NULL, null=True, blank=True, related_name='applications')
@@ -125,6 +222,12 @@ class AdoptionApplication(models.Model):
     first_name = models.CharField(max_length=100)
     last_name = models.CharField(max_length=100)
     email = models.EmailField()
+    # Lower-cased, trimmed email, kept by the database for indexed lookups
+    email_normalized = models.GeneratedField(
+        expression=Lower(Trim('email')),
+        output_field=models.CharField(max_length=254),
+        db_persist=True,
+    )
     phone = models.CharField(max_length=20)
     address = models.TextField()
     
@@ -150,10 +253,33 @@ class AdoptionApplication(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     submitted_at = models.DateTimeField(auto_now_add=True)
     reviewed_at = models.DateTimeField(null=True, blank=True)
+    # When the application was first approved and when its adoption was
+    # completed (cleared if it is reopened); the daily metrics count these
+    approved_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
     notes = models.TextField(blank=True)
+    # Sent with the form so a resubmitted form can't create a second application
+    submission_token = models.UUIDField(null=True, blank=True, unique=True, editable=False)
+    
+    objects = ApplicationQuerySet.as_manager()
     
     class Meta:
         ordering = ['-submitted_at']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'pet'],
+                condition=models.Q(status__in=['pending', 'approved']),
+                name='application_one_open_per_user_pet',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['-submitted_at'], name='application_submitted_idx'),
+            models.Index(fields=['status', '-submitted_at'], name='application_status_sub_idx'),
+            models.Index(fields=['user', '-submitted_at'], name='application_user_sub_idx'),
+            models.Index(fields=['email_normalized'], name='application_email_norm_idx'),
+            models.Index(fields=['approved_at'], name='application_approved_idx'),
+            models.Index(fields=['completed_at'], name='application_completed_idx'),
+        ]
         verbose_name = 'Adoption Application'
         verbose_name_plural = 'Adoption Applications'
     
@@ -178,6 +304,10 @@ class ContactMessage(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at'], name='contact_created_idx'),
+            models.Index(fields=['-created_at'], condition=models.Q(is_read=False), name='contact_unread_created_idx'),
+        ]
         verbose_name = 'Contact Message'
         verbose_name_plural = 'Contact Messages'
     
@@ -208,3 +338,64 @@ class SuccessStory(models.Model):
     
     def __str__(self):
         return self.title
+
+
+class ImageJob(models.Model):
+    """Queued post-upload image processing for a Pet or SuccessStory"""
+    
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+    
+    model_label = models.CharField(max_length=100)  # e.g., "shelter.pet"
+    object_id = models.PositiveBigIntegerField()
+    
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    variants_written = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Set when a worker claims the job; a running job claimed too long ago is reclaimed
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='imagejob_status_created_idx'),
+        ]
+        verbose_name = 'Image Job'
+        verbose_name_plural = 'Image Jobs'
+    
+    def __str__(self):
+        return f"{self.model_label}#{self.object_id} ({self.status})"
+
+
+class DailyMetric(models.Model):
+    """Per-day, per-pet-type activity counts, rolled up from the raw tables (see metrics.py)"""
+    
+    date = models.DateField()
+    # Blank for counts that belong to no pet, such as contact messages
+    pet_type = models.CharField(max_length=20, choices=Pet.PET_TYPES, blank=True)
+    
+    applications_submitted = models.PositiveIntegerField(default=0)
+    applications_approved = models.PositiveIntegerField(default=0)
+    applications_completed = models.PositiveIntegerField(default=0)
+    arrivals = models.PositiveIntegerField(default=0)
+    adoptions = models.PositiveIntegerField(default=0)
+    messages = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        ordering = ['date', 'pet_type']
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'pet_type'], name='dailymetric_date_type_unique'),
+        ]
+        verbose_name = 'Daily Metric'
+        verbose_name_plural = 'Daily Metrics'
+    
+    def __str__(self):
+        return f"{self.date} {self.pet_type or 'all'}"
@@ -0,0 +1,130 @@
+"""
+Keyset (cursor) pagination for the admin dashboard lists.
+
+Pages are addressed by an opaque, signed cursor that holds the sort key of
+the row at the page edge, so fetching page 500 is the same indexed range
+scan as page 1 - no COUNT(*) and no OFFSET.
+"""
+import hashlib
+from datetime import date, datetime
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.db.models import Q
+
+
+CURSOR_SALT = 'shelter.pagination.cursor'
+
+
+class CursorPage:
+    """One page of results, quacking enough like a Paginator page for templates"""
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+def _encode_value(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def _make_cursor(obj, ordering, direction):
+    keys = [_encode_value(getattr(obj, field.lstrip('-'))) for field in ordering]
+    return signing.dumps({'k': keys, 'd': direction}, salt=CURSOR_SALT, compress=True)
+
+
+def _read_cursor(cursor, ordering):
+    if not cursor:
+        return None
+    try:
+        data = signing.loads(cursor, salt=CURSOR_SALT)
+    except signing.BadSignature:
+        return None
+    if len(data.get('k', ())) != len(ordering) or data.get('d') not in ('next', 'prev'):
+        return None
+    return data
+
+
+def _after(ordering, keys):
+    """Q selecting rows strictly after ``keys`` in ``ordering``"""
+    condition = Q()
+    for position, field in enumerate(ordering):
+        name = field.lstrip('-')
+        lookup = 'lt' if field.startswith('-') else 'gt'
+        step = Q(**{f'{name}__{lookup}': keys[position]})
+        for previous_field, previous_key in zip(ordering[:position], keys[:position]):
+            step &= Q(**{previous_field.lstrip('-'): previous_key})
+        condition |= step
+    return condition
+
+
+def _reverse(ordering):
+    return [field[1:] if field.startswith('-') else f'-{field}' for field in ordering]
+
+
+def paginate_by_cursor(queryset, cursor, per_page, ordering):
+    """
+    Return a CursorPage of ``queryset`` sorted by ``ordering``.
+
+    ``ordering`` must end with a unique field (normally ``-id``) so that
+    the sort key identifies exactly one row.
+    """
+    ordering = list(ordering)
+    data = _read_cursor(cursor, ordering)
+
+    if data and data['d'] == 'prev':
+        rows = list(queryset.filter(_after(_reverse(ordering), data['k'])).order_by(*_reverse(ordering))[:per_page + 1])
+        has_more = len(rows) > per_page
+        rows = rows[:per_page][::-1]
+        has_before, has_after = has_more, True
+    else:
+        if data:
+            queryset = queryset.filter(_after(ordering, data['k']))
+        rows = list(queryset.order_by(*ordering)[:per_page + 1])
+        has_more = len(rows) > per_page
+        rows = rows[:per_page]
+        has_before, has_after = data is not None, has_more
+
+    if not rows:
+        return CursorPage([])
+    return CursorPage(
+        rows,
+        next_cursor=_make_cursor(rows[-1], ordering, 'next') if has_after else None,
+        previous_cursor=_make_cursor(rows[0], ordering, 'prev') if has_before else None,
+    )
+
+
+def cached_count(queryset, timeout=None):
+    """
+    Count a queryset, caching the result per distinct query.
+
+    Totals on the admin lists are informational, so a count that is up to
+    ``SHELTER_COUNT_CACHE_TIMEOUT`` seconds stale is fine.
+    """
+    if timeout is None:
+        timeout = getattr(settings, 'SHELTER_COUNT_CACHE_TIMEOUT', 60)
+    digest = hashlib.md5(str(queryset.query).encode()).hexdigest()
+    key = f'shelter:count:{queryset.model._meta.label_lower}:{digest}'
+    return cache.get_or_set(key, queryset.count, timeout)
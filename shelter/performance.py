@@ -0,0 +1,212 @@
+"""
+Lightweight per-request performance instrumentation.
+
+``PerformanceMiddleware`` measures every request - total time, DB time and
+query count, template render time and response size - and keeps the most
+recent samples per view in memory. With ``SHELTER_SERVER_TIMING`` on (the
+default under DEBUG) the timings are also sent in a ``Server-Timing``
+header for the browser's developer tools. ``performance_report()`` turns them into
+p50/p95/p99 figures for the staff-only performance page.
+
+Samples live in the worker process, so each gunicorn worker reports on the
+requests it served itself. The worker's boot, template warm-up and
+time-to-first-response are kept alongside them.
+"""
+import logging
+import math
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.template.backends.django import Template as DjangoBackendTemplate
+
+
+METRICS = ('total_ms', 'db_ms', 'queries', 'template_ms', 'bytes')
+
+_current = ContextVar('shelter_request_metrics', default=None)
+_samples = defaultdict(lambda: deque(maxlen=getattr(settings, 'SHELTER_PERFORMANCE_SAMPLES', 1000)))
+_lock = threading.Lock()
+_worker = {}
+
+logger = logging.getLogger(__name__)
+
+
+class RequestMetrics:
+    """Counters collected while a single request is being handled"""
+
+    def __init__(self):
+        self.db_seconds = 0.0
+        self.queries = 0
+        self.template_seconds = 0.0
+        self.template_depth = 0
+
+
+def _time_query(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.db_seconds += time.perf_counter() - started
+        metrics.queries += 1
+
+
+def _install_query_timer(sender, connection, **kwargs):
+    # Wrappers are kept on the connection wrapper itself rather than set per
+    # request, so queries run in sync_to_async threads are timed too; the
+    # request's metrics reach them through the context variable
+    if _time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_time_query)
+
+
+_original_template_render = DjangoBackendTemplate.render
+
+
+def _timed_template_render(self, context=None, request=None):
+    metrics = _current.get()
+    if metrics is None:
+        return _original_template_render(self, context, request)
+    # Only the outermost render is timed so nested renders aren't counted twice
+    metrics.template_depth += 1
+    started = time.perf_counter()
+    try:
+        return _original_template_render(self, context, request)
+    finally:
+        metrics.template_depth -= 1
+        if metrics.template_depth == 0:
+            metrics.template_seconds += time.perf_counter() - started
+
+
+def record(view_name, total_ms, db_ms, queries, template_ms, size):
+    """Store one request sample for a view"""
+    with _lock:
+        _samples[view_name].append((total_ms, db_ms, queries, template_ms, size))
+
+
+def reset():
+    """Forget all collected samples"""
+    with _lock:
+        _samples.clear()
+
+
+def record_worker_boot(**values):
+    """Note facts about this worker's startup, e.g. boot or warm-up time"""
+    with _lock:
+        _worker.update(values)
+
+
+def worker_report():
+    """Startup figures for the current worker process"""
+    with _lock:
+        report = dict(_worker)
+    report.pop('started', None)
+    report['pid'] = os.getpid()
+    return report
+
+
+def _record_first_response(request_ms):
+    with _lock:
+        if 'started' not in _worker or 'first_response_ms' in _worker:
+            return
+        _worker['first_request_ms'] = request_ms
+        _worker['first_response_ms'] = round((time.perf_counter() - _worker['started']) * 1000, 2)
+    logger.info(
+        'Worker %d served its first response %.1f ms after starting (request took %.1f ms)',
+        os.getpid(), _worker['first_response_ms'], request_ms,
+    )
+
+
+def percentile(sorted_values, percent):
+    """Nearest-rank percentile of an already sorted list"""
+    rank = math.ceil(percent / 100 * len(sorted_values))
+    return sorted_values[max(rank, 1) - 1]
+
+
+def performance_report():
+    """Return per-view request counts and p50/p95/p99 of every metric, slowest first"""
+    with _lock:
+        snapshot = {view: list(samples) for view, samples in _samples.items()}
+
+    report = []
+    for view, samples in snapshot.items():
+        row = {'view': view, 'requests': len(samples)}
+        for position, metric in enumerate(METRICS):
+            values = sorted(sample[position] for sample in samples)
+            row[metric] = {
+                'p50': percentile(values, 50),
+                'p95': percentile(values, 95),
+                'p99': percentile(values, 99),
+            }
+        report.append(row)
+    report.sort(key=lambda row: row['total_ms']['p95'], reverse=True)
+    return report
+
+
+class PerformanceMiddleware:
+    """Record timing, query and size metrics for every request"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+        # Template time is measured by wrapping the Django backend's render
+        DjangoBackendTemplate.render = _timed_template_render
+        connection_created.connect(_install_query_timer, dispatch_uid='shelter.performance')
+        for connection in connections.all(initialized_only=True):
+            _install_query_timer(None, connection)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self._record(request, response, metrics, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        self._record(request, response, metrics, time.perf_counter() - started)
+        return response
+
+    def _record(self, request, response, metrics, total):
+        total_ms = round(total * 1000, 2)
+        _record_first_response(total_ms)
+        if getattr(settings, 'SHELTER_SERVER_TIMING', settings.DEBUG):
+            response['Server-Timing'] = (
+                f'total;dur={total_ms}, db;dur={metrics.db_seconds * 1000:.2f};desc="{metrics.queries} queries", '
+                f'tpl;dur={metrics.template_seconds * 1000:.2f}'
+            )
+        match = getattr(request, 'resolver_match', None)
+        if match is not None:
+            size = len(response.content) if not response.streaming else 0
+            record(
+                match._func_path,
+                total_ms,
+                round(metrics.db_seconds * 1000, 2),
+                metrics.queries,
+                round(metrics.template_seconds * 1000, 2),
+                size,
+            )
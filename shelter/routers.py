@@ -0,0 +1,69 @@
+"""
+Read replica routing.
+
+Views wrapped with ``use_replica`` read shelter models from the database
+named by ``SHELTER_REPLICA_DATABASE``; everything else, and every write,
+goes to ``default``. Auth and session tables always stay on the primary
+so a fresh login is never missed because of replication lag.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+
+
+_reading_from_replica = ContextVar('shelter_reading_from_replica', default=False)
+
+REPLICATED_APPS = {'shelter'}
+
+
+@contextmanager
+def replica_reads():
+    """Send shelter model reads inside the block to the replica"""
+    token = _reading_from_replica.set(True)
+    try:
+        yield
+    finally:
+        _reading_from_replica.reset(token)
+
+
+def use_replica(view):
+    """Decorator for read-only views whose queries may be served by the replica"""
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def wrapper(*args, **kwargs):
+            with replica_reads():
+                return await view(*args, **kwargs)
+    else:
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            with replica_reads():
+                response = view(*args, **kwargs)
+                # Class-based views return a lazy TemplateResponse; render it
+                # here so querysets evaluated by the template use the replica too
+                if hasattr(response, 'render') and not response.is_rendered:
+                    response.render()
+                return response
+    return wrapper
+
+
+class ReplicaRouter:
+    """Route catalogue reads to the replica and all writes to the primary"""
+
+    def db_for_read(self, model, **hints):
+        replica = getattr(settings, 'SHELTER_REPLICA_DATABASE', None)
+        if replica and _reading_from_replica.get() and model._meta.app_label in REPLICATED_APPS:
+            return replica
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return None
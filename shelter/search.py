@@ -0,0 +1,161 @@
+"""
+Full-text search for the public pet catalogue.
+
+``get_search_backend()`` returns the backend for the default database:
+
+* ``SQLiteFTSBackend`` - an FTS5 virtual table (``shelter_pet_fts``) kept in
+  sync with Pet by signals, ranked with bm25.
+* ``PostgresSearchBackend`` - a GIN expression index over a tsvector of the
+  same columns, ranked with ts_rank.
+* ``IcontainsBackend`` - the original ``icontains`` scan, used when neither
+  is available.
+
+Set ``SHELTER_SEARCH_BACKEND`` to a dotted path to force a backend.
+"""
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import BooleanField, FloatField, Q
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+
+FTS_TABLE = 'shelter_pet_fts'
+
+# Relative weight of the indexed columns: name, breed, description
+COLUMN_WEIGHTS = (10.0, 5.0, 1.0)
+
+
+def pg_document(table=''):
+    """
+    Postgres tsvector expression shared by the GIN index and the search
+    query so the planner can use the index. ``table`` qualifies the columns.
+    """
+    prefix = f'"{table}".' if table else ''
+    return (
+        f"to_tsvector('english', coalesce({prefix}\"name\", '') || ' ' || "
+        f"coalesce({prefix}\"breed\", '') || ' ' || "
+        f"coalesce({prefix}\"description\", ''))"
+    )
+
+
+class IcontainsBackend:
+    """Substring matching on name, breed and description (no index, no ranking)"""
+
+    def search(self, queryset, query):
+        return queryset.filter(
+            Q(name__icontains=query) |
+            Q(breed__icontains=query) |
+            Q(description__icontains=query)
+        )
+
+    def index_pet(self, pet):
+        pass
+
+    def index_pets(self, pets):
+        pass
+
+    def remove_pet(self, pet_id):
+        pass
+
+    def rebuild(self):
+        return 0
+
+
+class SQLiteFTSBackend:
+    """SQLite FTS5 index with prefix matching and bm25 ranking"""
+
+    @staticmethod
+    def build_match(query):
+        """Turn free text into a safe FTS5 expression: every word, prefix-matched"""
+        terms = re.findall(r'\w+', query)
+        return ' '.join(f'"{term}"*' for term in terms)
+
+    def search(self, queryset, query):
+        match = self.build_match(query)
+        if not match:
+            return queryset.none()
+
+        # The index is joined once and ranked in the same pass; the ORM has no
+        # other way to join a table it doesn't model
+        weights = ', '.join(str(weight) for weight in COLUMN_WEIGHTS)
+        return queryset.extra(
+            tables=[FTS_TABLE],
+            where=[f'{FTS_TABLE}.rowid = "shelter_pet"."id"', f'{FTS_TABLE} MATCH %s'],
+            params=[match],
+            select={'search_rank': f'bm25({FTS_TABLE}, {weights})'},
+        ).order_by('search_rank')
+
+    def index_pet(self, pet):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [pet.pk])
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, name, breed, description) VALUES (%s, %s, %s, %s)',
+                [pet.pk, pet.name, pet.breed, pet.description],
+            )
+
+    def index_pets(self, pets):
+        """index_pet() for many pets, e.g. after bulk_create()"""
+        with connection.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [[pet.pk] for pet in pets])
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} (rowid, name, breed, description) VALUES (%s, %s, %s, %s)',
+                [[pet.pk, pet.name, pet.breed, pet.description] for pet in pets],
+            )
+
+    def remove_pet(self, pet_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [pet_id])
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, name, breed, description) '
+                f'SELECT id, name, breed, description FROM shelter_pet'
+            )
+            cursor.execute(f'SELECT count(*) FROM {FTS_TABLE}')
+            return cursor.fetchone()[0]
+
+
+class PostgresSearchBackend:
+    """Postgres full-text search over an indexed tsvector expression"""
+
+    def search(self, queryset, query):
+        if not query.strip():
+            return queryset.none()
+        document = pg_document('shelter_pet')
+        return queryset.filter(
+            RawSQL(f"{document} @@ websearch_to_tsquery('english', %s)", [query], output_field=BooleanField())
+        ).annotate(
+            search_rank=RawSQL(f"ts_rank({document}, websearch_to_tsquery('english', %s))", [query], output_field=FloatField())
+        ).order_by('-search_rank')
+
+    # The index is an expression index, so Postgres maintains it on write
+    def index_pet(self, pet):
+        pass
+
+    def index_pets(self, pets):
+        pass
+
+    def remove_pet(self, pet_id):
+        pass
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute('REINDEX INDEX shelter_pet_search_idx')
+            cursor.execute('SELECT count(*) FROM shelter_pet')
+            return cursor.fetchone()[0]
+
+
+def get_search_backend():
+    """Return the configured search backend, or the best one for the database"""
+    path = getattr(settings, 'SHELTER_SEARCH_BACKEND', None)
+    if path:
+        return import_string(path)()
+    if connection.vendor == 'sqlite':
+        return SQLiteFTSBackend()
+    if connection.vendor == 'postgresql':
+        return PostgresSearchBackend()
+    return IcontainsBackend()
@@ -0,0 +1,196 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .images import IMAGE_FIELDS, delete_variants
+from .jobs import enqueue_image_job
+from .live import application_event, broker, message_event
+from .metrics import rollup_dates
+from .search import get_search_backend
+from .models import Pet, AdoptionApplication, ContactMessage, SuccessStory, normalize_email
+from .stats import invalidate_stats
+
+
+def _image_names(instance):
+    # Deferred image fields (e.g. under .only()) are left unloaded
+    deferred = instance.get_deferred_fields()
+    return tuple(
+        None if field_name in deferred else getattr(instance, field_name).name
+        for field_name in IMAGE_FIELDS[instance._meta.label_lower]
+    )
+
+
+@receiver(post_init, sender=Pet)
+@receiver(post_init, sender=SuccessStory)
+def remember_image_names(sender, instance, **kwargs):
+    """Keep the loaded image names so saves can tell whether an image changed"""
+    instance._original_image_names = _image_names(instance)
+
+
+@receiver(post_save, sender=Pet)
+@receiver(post_save, sender=SuccessStory)
+def queue_image_variants(sender, instance, created, raw=False, **kwargs):
+    """Queue variant generation when a pet or story gets a new image"""
+    if raw:
+        return
+    names = _image_names(instance)
+    if any(names) and (created or names != instance._original_image_names):
+        transaction.on_commit(lambda: enqueue_image_job(instance))
+    instance._original_image_names = names
+
+
+@receiver(post_delete, sender=Pet)
+@receiver(post_delete, sender=SuccessStory)
+def remove_image_variants(sender, instance, **kwargs):
+    """Clean up stored variants when a pet or story is deleted"""
+    for field_name in IMAGE_FIELDS[instance._meta.label_lower]:
+        delete_variants(getattr(instance, field_name))
+
+
+@receiver(post_save, sender=Pet)
+@receiver(post_save, sender=AdoptionApplication)
+@receiver(post_save, sender=ContactMessage)
+@receiver(post_delete, sender=Pet)
+@receiver(post_delete, sender=AdoptionApplication)
+@receiver(post_delete, sender=ContactMessage)
+def invalidate_cached_stats(sender, **kwargs):
+    """Counted rows changed, so the cached stats are stale and open dashboards need the new ones"""
+    # After commit: cleared any earlier, a concurrent read could cache the old counters again
+    transaction.on_commit(invalidate_stats)
+    transaction.on_commit(broker.stats_changed)
+
+
+@receiver(post_save, sender=AdoptionApplication)
+@receiver(post_save, sender=ContactMessage)
+def publish_live_event(sender, instance, created, raw=False, **kwargs):
+    """Show new applications and messages on open dashboards once they are committed"""
+    if raw or not created:
+        return
+    if isinstance(instance, AdoptionApplication):
+        name, data = 'application', application_event(instance)
+    else:
+        name, data = 'message', message_event(instance)
+    transaction.on_commit(lambda: broker.publish(name, data))
+
+
+@receiver(post_save, sender=Pet)
+def index_pet_for_search(sender, instance, **kwargs):
+    """Keep the full-text search index in step with the pet"""
+    get_search_backend().index_pet(instance)
+
+
+@receiver(post_delete, sender=Pet)
+def remove_pet_from_search(sender, instance, **kwargs):
+    """Drop a deleted pet from the full-text search index"""
+    get_search_backend().remove_pet(instance.pk)
+
+
+@receiver(post_save, sender=User)
+def link_applications_to_user(sender, instance, created, raw=False, **kwargs):
+    """
+    Give a new account the applications sent from its email before it existed.
+
+    Only on creation: later saves (every login updates last_login) and
+    email changes on the profile must never hand over someone else's
+    applications.
+    """
+    if raw or not created or not instance.email:
+        return
+    AdoptionApplication.objects.filter(
+        email_normalized=normalize_email(instance.email),
+    ).linkable().update(user=instance)
+
+
+# The fields each model's metrics are counted from, dates first
+METRIC_FIELDS = {
+    AdoptionApplication: ('submitted_at', 'approved_at', 'completed_at', 'status', 'pet_id'),
+    Pet: ('arrival_date', 'type'),
+    ContactMessage: ('created_at',),
+}
+
+METRIC_DATE_FIELDS = {
+    AdoptionApplication: ('submitted_at', 'approved_at', 'completed_at'),
+    Pet: ('arrival_date',),
+    ContactMessage: ('created_at',),
+}
+
+
+def _metric_state(instance):
+    """The loaded values the metrics of this application, pet or message are counted from"""
+    # Deferred fields are left unloaded; a save can't have changed them
+    deferred = instance.get_deferred_fields()
+    return {
+        field_name: None if field_name in deferred else getattr(instance, field_name)
+        for field_name in METRIC_FIELDS[type(instance)]
+    }
+
+
+def _metric_dates(state, model):
+    """The days whose DailyMetric rows depend on a row in this state"""
+    return {
+        timezone.localdate(value) if hasattr(value, 'hour') else value
+        for value in (state[field_name] for field_name in METRIC_DATE_FIELDS[model])
+        if value is not None
+    }
+
+
+@receiver(post_init, sender=AdoptionApplication)
+@receiver(post_init, sender=Pet)
+@receiver(post_init, sender=ContactMessage)
+def remember_metric_state(sender, instance, **kwargs):
+    """Keep the loaded values so a save can tell whether it changed the metrics"""
+    instance._original_metric_state = _metric_state(instance)
+
+
+@receiver(pre_save, sender=AdoptionApplication)
+def stamp_status_transition(sender, instance, raw=False, **kwargs):
+    """Record when an application saved with a new status was approved or completed (see triage.py)"""
+    if raw or 'status' in instance.get_deferred_fields():
+        return
+    if not instance._state.adding and instance.status == instance._original_metric_state['status']:
+        return
+    now = timezone.now()
+    if instance.status == 'approved':
+        instance.approved_at = instance.approved_at or now
+    if instance.status == 'completed':
+        instance.completed_at = instance.completed_at or now
+    else:
+        instance.completed_at = None
+
+
+def _application_dates(pet_id):
+    """The days the applications for a pet count towards"""
+    moments = AdoptionApplication.objects.filter(pet_id=pet_id).values_list(*METRIC_DATE_FIELDS[AdoptionApplication])
+    return {timezone.localdate(moment) for row in moments for moment in row if moment}
+
+
+@receiver(post_save, sender=AdoptionApplication)
+@receiver(post_save, sender=Pet)
+@receiver(post_save, sender=ContactMessage)
+@receiver(post_delete, sender=AdoptionApplication)
+@receiver(post_delete, sender=Pet)
+@receiver(post_delete, sender=ContactMessage)
+def rollup_metrics(sender, instance, raw=False, **kwargs):
+    """
+    Re-roll the daily metrics of the days this row counts towards.
+
+    Saves that change nothing counted (marking a message read, editing a
+    pet's description) skip the rollup. It runs after commit and is robust:
+    a failure is logged, never turned into an error response for a write
+    that already happened, and the next rollup_metrics run repairs the day.
+    """
+    if raw:
+        return
+    original = instance._original_metric_state
+    state = instance._original_metric_state = _metric_state(instance)
+    if kwargs.get('created') is False and state == original:
+        return
+    dates = _metric_dates(state, sender) | _metric_dates(original, sender)
+    if sender is Pet and kwargs.get('created') is False and state['type'] != original['type']:
+        # The pet's applications count under its type on days of their own
+        pet_id = instance.pk
+        transaction.on_commit(lambda: rollup_dates(dates | _application_dates(pet_id)), robust=True)
+        return
+    transaction.on_commit(lambda: rollup_dates(dates), robust=True)
@@ -0,0 +1,132 @@
+// Live admin dashboard - under ASGI the counters and recent lists follow the
+// server-sent events of admin_live; under WSGI (or without EventSource) the
+// counters are polled from the stats API instead
+
+// Seconds between stats API polls, the server's stats cache timeout
+const POLL_SECONDS = 30;
+
+document.addEventListener('DOMContentLoaded', function() {
+    const overview = document.querySelector('[data-stats-url]');
+    if (!overview) return;
+
+    const liveUrl = overview.getAttribute('data-live-url');
+    if (liveUrl && window.EventSource) {
+        followLiveFeed(liveUrl);
+    } else {
+        pollStats(overview.getAttribute('data-stats-url'));
+    }
+});
+
+function showStats(stats) {
+    Object.keys(stats).forEach(name => {
+        const element = document.querySelector(`[data-stat="${name}"]`);
+        if (element) element.textContent = stats[name];
+    });
+}
+
+function pollStats(url) {
+    setInterval(() => {
+        // Hidden tabs don't poll
+        if (document.hidden) return;
+        fetch(url, {credentials: 'same-origin'})
+            .then(response => response.ok ? response.json() : null)
+            .then(stats => stats && showStats(stats))
+            .catch(() => {});
+    }, POLL_SECONDS * 1000);
+}
+
+function followLiveFeed(url) {
+    const source = new EventSource(url);
+
+    // Only the counters that changed are sent
+    source.addEventListener('stats', event => showStats(JSON.parse(event.data)));
+
+    source.addEventListener('application', event => {
+        const application = JSON.parse(event.data);
+        prependRow('recent-applications', 'applications-table', application.id, [
+            element('div', 'application-info', [
+                element('div', 'applicant-details', [
+                    element('h3', '', application.name),
+                    element('p', 'application-email', application.email),
+                    element('p', 'application-date', formatDate(application.submitted_at)),
+                ]),
+                element('div', 'pet-details', [
+                    element('h4', '', application.pet_name),
+                    element('p', '', application.pet_summary),
+                ]),
+            ]),
+            element('div', 'application-status', [
+                element('span', `status-badge status-${application.status}`, application.status_display),
+            ]),
+            element('div', 'application-actions', [
+                link(application.url, 'btn btn-small btn-primary', 'Review'),
+            ]),
+        ], 'application-row');
+    });
+
+    source.addEventListener('message', event => {
+        const contact = JSON.parse(event.data);
+        prependRow('recent-contacts', 'contacts-table', contact.id, [
+            element('div', 'contact-info', [
+                element('h3', '', contact.name),
+                element('p', 'contact-subject', contact.subject),
+                element('p', 'contact-date', formatDate(contact.created_at)),
+            ]),
+            element('div', 'contact-status', [
+                element('span', 'status-badge status-new', 'New'),
+            ]),
+            element('div', 'contact-actions', [
+                link(contact.url, 'btn btn-small btn-secondary', 'View'),
+            ]),
+        ], 'contact-row');
+    });
+
+    // Too much happened while disconnected to replay
+    source.addEventListener('resync', () => {
+        source.close();
+        window.location.reload();
+    });
+}
+
+function element(tag, className, content) {
+    const node = document.createElement(tag);
+    if (className) node.className = className;
+    if (Array.isArray(content)) {
+        content.forEach(child => node.appendChild(child));
+    } else {
+        node.textContent = content;
+    }
+    return node;
+}
+
+function link(href, className, text) {
+    const node = element('a', className, text);
+    node.href = href;
+    return node;
+}
+
+function formatDate(value) {
+    return new Date(value).toLocaleString(undefined, {
+        month: 'short', day: '2-digit', year: 'numeric', hour: 'numeric', minute: '2-digit'
+    });
+}
+
+// Add a row to the top of a recent list, keeping it at five rows
+function prependRow(listId, listClass, id, children, rowClass) {
+    let list = document.getElementById(listId);
+    if (!list) {
+        // The list was empty when the page was rendered
+        list = element('div', listClass, []);
+        list.id = listId;
+        const placeholder = document.querySelector(`.${listId} .no-data`);
+        placeholder.replaceWith(list);
+    }
+    if (list.querySelector(`[data-id="${id}"]`)) return;
+
+    const row = element('div', rowClass, children);
+    row.setAttribute('data-id', id);
+    list.prepend(row);
+    while (list.children.length > 5) {
+        list.lastElementChild.remove();
+    }
+}
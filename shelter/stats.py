@@ -0,0 +1,84 @@
+"""
+Shelter-wide counters shared by the homepage and the admin dashboard.
+
+All counters are computed with one conditional aggregate per table and
+cached for a short time. Saves and deletes of the counted models
+invalidate the cache once their transaction commits (see ``signals.py``
+and ``triage.py``). That reaches every worker only when ``CACHES`` is
+shared (``DJANGO_REDIS_URL``); on the default per-process LocMemCache the
+other workers serve their own counters until they are
+``SHELTER_STATS_CACHE_TIMEOUT`` seconds old. They are always computed on the
+primary, even inside replica-routed views, so a lagging replica can't put
+stale counters back into the cache right after an invalidation.
+"""
+import asyncio
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .models import Pet, AdoptionApplication, ContactMessage
+
+
+CACHE_KEY = 'shelter:stats'
+
+
+def _stat_querysets():
+    """The per-table conditional aggregates, as (queryset, aggregate kwargs) pairs"""
+    week_ago = timezone.now() - timedelta(days=7)
+    return [
+        (Pet.objects.using(DEFAULT_DB_ALIAS).order_by(), {
+            'available_pets': Count('pk', filter=Q(status='available')),
+            'total_adopted': Count('pk', filter=Q(status='adopted')),
+        }),
+        (AdoptionApplication.objects.using(DEFAULT_DB_ALIAS).order_by(), {
+            'pending_applications': Count('pk', filter=Q(status='pending')),
+            'completed_applications': Count('pk', filter=Q(status='completed')),
+            'applications_this_week': Count('pk', filter=Q(submitted_at__gte=week_ago)),
+        }),
+        (ContactMessage.objects.using(DEFAULT_DB_ALIAS).order_by(), {
+            'unread_messages': Count('pk', filter=Q(is_read=False)),
+        }),
+    ]
+
+
+def compute_stats():
+    """Compute all shelter counters straight from the database"""
+    stats = {}
+    for queryset, aggregates in _stat_querysets():
+        stats.update(queryset.aggregate(**aggregates))
+    return stats
+
+
+async def acompute_stats():
+    """Async compute_stats(); the per-table aggregates are awaited together"""
+    results = await asyncio.gather(*(
+        queryset.aaggregate(**aggregates) for queryset, aggregates in _stat_querysets()
+    ))
+    stats = {}
+    for result in results:
+        stats.update(result)
+    return stats
+
+
+def get_stats():
+    """Return the shelter counters, served from cache when fresh"""
+    timeout = getattr(settings, 'SHELTER_STATS_CACHE_TIMEOUT', 30)
+    return cache.get_or_set(CACHE_KEY, compute_stats, timeout)
+
+
+async def aget_stats():
+    """Async get_stats()"""
+    stats = await cache.aget(CACHE_KEY)
+    if stats is None:
+        stats = await acompute_stats()
+        await cache.aset(CACHE_KEY, stats, getattr(settings, 'SHELTER_STATS_CACHE_TIMEOUT', 30))
+    return stats
+
+
+def invalidate_stats():
+    """Drop the cached counters so the next read recomputes them"""
+    cache.delete(CACHE_KEY)
@@ -0,0 +1,50 @@
+"""
+Static files storage used in production.
+
+On top of WhiteNoise's hashed, gzip/brotli precompressed storage, CSS and
+JavaScript are minified while ``collectstatic`` copies them, so the hash
+and the compressed variants are both taken from the minified file.
+Minification is skipped when ``rcssmin``/``rjsmin`` aren't installed.
+"""
+from django.core.files.base import ContentFile
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+try:
+    import rcssmin
+except ImportError:  # pragma: no cover
+    rcssmin = None
+
+try:
+    import rjsmin
+except ImportError:  # pragma: no cover
+    rjsmin = None
+
+
+def _minifier(name):
+    if name.endswith('.min.css') or name.endswith('.min.js'):
+        return None
+    if name.endswith('.css') and rcssmin is not None:
+        return rcssmin.cssmin
+    if name.endswith('.js') and rjsmin is not None:
+        return rjsmin.jsmin
+    return None
+
+
+class ShelterStaticFilesStorage(CompressedManifestStaticFilesStorage):
+    """Minified, fingerprinted and precompressed static files"""
+
+    def _save(self, name, content):
+        minify = _minifier(name)
+        if minify is not None:
+            content.seek(0)
+            content = ContentFile(minify(content.read().decode('utf-8')).encode('utf-8'))
+        return super()._save(name, content)
+
+    def stored_name(self, name):
+        # Before collectstatic has written a manifest (development, tests) the
+        # plain name is served. Once there is one, a reference to a file it
+        # doesn't know fails the render (see manifest_strict) instead of
+        # shipping a link that 404s
+        if not self.hashed_files:
+            return name
+        return super().stored_name(name)
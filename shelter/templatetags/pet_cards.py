@@ -0,0 +1,35 @@
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.safestring import mark_safe
+
+register = template.Library()
+
+
+def pet_card_key(pet, show_traits, day=None):
+    """
+    Cache key for a rendered pet card.
+
+    The key is versioned by ``updated_at`` so saving a pet never serves a
+    stale card, and by the current date so the "New Arrival" badge rolls
+    over at midnight.
+    """
+    day = day or timezone.now().date()
+    return f'pet_card:{pet.pk}:{pet.updated_at.timestamp()}:{day.isoformat()}:{int(bool(show_traits))}'
+
+
+@register.simple_tag
+def pet_card(pet, show_traits=False):
+    """
+    Render the shared pet card, served from the fragment cache when possible.
+
+    Usage: {% pet_card pet show_traits=True %}
+    """
+    key = pet_card_key(pet, show_traits)
+    html = cache.get(key)
+    if html is None:
+        html = render_to_string('shelter/pet_card.html', {'pet': pet, 'show_traits': show_traits})
+        cache.set(key, html, getattr(settings, 'SHELTER_PET_CARD_CACHE_TIMEOUT', 60 * 60 * 24))
+    return mark_safe(html)
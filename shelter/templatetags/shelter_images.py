@@ -0,0 +1,57 @@
+from django import template
+from django.utils.html import format_html, format_html_join
+
+from shelter.images import FORMATS, VARIANTS, variant_name
+
+register = template.Library()
+
+
+# Variant name -> "sizes" attribute hint for the browser
+SIZES = {
+    'admin_thumb': '160px',
+    'card': '(max-width: 600px) 100vw, 400px',
+    'detail': '(max-width: 900px) 100vw, 800px',
+}
+
+
+def _srcset(fieldfile, variant, fmt, widths):
+    storage = fieldfile.storage
+    return ', '.join(
+        f'{storage.url(variant_name(fieldfile.name, variant, width, fmt))} {width}w'
+        for width in widths
+    )
+
+
+@register.simple_tag
+def responsive_image(fieldfile, variant='card', **attrs):
+    """
+    Render an image field as a <picture> with WebP and JPEG srcsets.
+
+    Only the widths that were generated are listed (originals are never
+    upscaled). Falls back to a plain <img> of the original upload while the
+    variants have not been generated yet, or when the original is narrower
+    than every variant width.
+
+    Usage: {% responsive_image pet.main_image 'card' alt=pet.name loading='lazy' %}
+    """
+    if not fieldfile:
+        return ''
+
+    extra = format_html_join('', ' {}="{}"', sorted(attrs.items()))
+    storage = fieldfile.storage
+    widths = [
+        width for width in VARIANTS[variant]
+        if storage.exists(variant_name(fieldfile.name, variant, width, 'jpeg'))
+    ]
+    if not widths:
+        return format_html('<img src="{}"{}>', fieldfile.url, extra)
+
+    fallback = storage.url(variant_name(fieldfile.name, variant, widths[0], 'jpeg'))
+    return format_html(
+        '<picture>'
+        '<source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}"{}>'
+        '</picture>',
+        _srcset(fieldfile, variant, 'webp', widths), SIZES[variant],
+        fallback, _srcset(fieldfile, variant, 'jpeg', widths), SIZES[variant], extra,
+    )
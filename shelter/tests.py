@@ -1,3 +1,1523 @@
-from django.test import TestCase
+import csv
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from io import BytesIO, StringIO
+from datetime import date, timedelta
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser, User
+from django.core import signing
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.management import CommandError, call_command
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, connection, connections
+from django.template import Context, Template
+from django.test import AsyncRequestFactory, RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from . import async_views, performance, urls, views
+from .exports import aexport_lines, export_lines
+from .images import delete_variants, generate_variants, variant_name
+from .jobs import LEASE_SECONDS, MAX_ATTEMPTS, claim_jobs, finish_job, retry_failed_jobs, run_image_job
+from .live import broker, event_stream
+from .metrics import rollup_days
+from .management.commands import extract_inline_css
+from .models import Pet, AdoptionApplication, ContactMessage, DailyMetric, ImageJob, SuccessStory
+from .pagination import CURSOR_SALT, paginate_by_cursor
+from .routers import ReplicaRouter, replica_reads
+from .search import get_search_backend
+from .stats import get_stats
+from .storage import ShelterStaticFilesStorage, rcssmin
+from .triage import set_application_status
+from .warmup import template_names, warm_up_worker
+
+
+class ShelterTestCase(TestCase):
+    """
+    TestCase for everything that goes through the shelter views.
+
+    Under the replica database profiles the catalogue views read from
+    'replica', a test mirror of 'default'. The mirror is pointed at the
+    default connection so it sees the rows each test writes inside its
+    transaction.
+    """
+
+    databases = set(settings.DATABASES)
+
+    @classmethod
+    def setUpClass(cls):
+        mirrors = {
+            alias: connections[alias] for alias in cls.databases
+            if connections[alias].settings_dict['TEST'].get('MIRROR') == DEFAULT_DB_ALIAS
+        }
+        for alias in mirrors:
+            connections[alias] = connections[DEFAULT_DB_ALIAS]
+        for alias, mirror in mirrors.items():
+            cls.addClassCleanup(connections.__setitem__, alias, mirror)
+        super().setUpClass()
+
+
+def make_pet(**fields):
+    """Create a pet, filling every required field with a valid value; invalid fields fail loudly"""
+    defaults = dict(
+        name='Bella', type='dog', breed='Labrador', age='2 years', size='Large', gender='Female',
+        color='Black', description='Friendly', personality=['Calm'],
+        arrival_date=date.today(), adoption_fee=100,
+    )
+    pet = Pet(**{**defaults, **fields})
+    pet.full_clean(exclude=['slug'])
+    pet.save()
+    return pet
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN is SQLite specific')
+class QueryPlanTests(ShelterTestCase):
+    """The hot list queries must be served by the indexes declared in Meta.indexes"""
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertIn(f'USING INDEX {index_name}', plan, msg=f'\n{queryset.query}\n{plan}')
+        self.assertNotIn('USE TEMP B-TREE FOR ORDER BY', plan, msg=plan)
+
+    def test_available_pets_newest_first(self):
+        self.assertUsesIndex(
+            Pet.objects.filter(status='available').order_by('-arrival_date'),
+            'pet_status_arrival_idx',
+        )
+
+    def test_available_pets_by_type(self):
+        self.assertUsesIndex(
+            Pet.objects.filter(status='available', type='dog').order_by('-arrival_date'),
+            'pet_status_type_arrival_idx',
+        )
+
+    def test_available_pets_by_size(self):
+        self.assertUsesIndex(
+            Pet.objects.filter(status='available', size='Small').order_by('-arrival_date'),
+            'pet_status_size_arrival_idx',
+        )
+
+    def test_special_needs_pets(self):
+        self.assertUsesIndex(
+            Pet.objects.filter(status='available', special_needs=True).order_by('-arrival_date'),
+            'pet_special_needs_status_idx',
+        )
+
+    def test_featured_pets_on_homepage(self):
+        self.assertUsesIndex(
+            Pet.objects.filter(featured=True, status='available')[:3],
+            'pet_featured_status_idx',
+        )
+
+    def test_related_pets(self):
+        self.assertUsesIndex(
+            Pet.objects.filter(type='cat', status='available').exclude(pk=1)[:3],
+            'pet_status_type_arrival_idx',
+        )
+
+    def test_applications_by_status(self):
+        self.assertUsesIndex(
+            AdoptionApplication.objects.filter(status='pending').order_by('-submitted_at'),
+            'application_status_sub_idx',
+        )
+
+    def test_recent_applications(self):
+        self.assertUsesIndex(
+            AdoptionApplication.objects.order_by('-submitted_at')[:5],
+            'application_submitted_idx',
+        )
+
+    def test_user_applications(self):
+        self.assertUsesIndex(
+            AdoptionApplication.objects.filter(user_id=1).order_by('-submitted_at'),
+            'application_user_sub_idx',
+        )
+
+    def test_applications_by_email(self):
+        self.assertUsesIndex(
+            AdoptionApplication.objects.filter(email_normalized='adopter@example.com').order_by(),
+            'application_email_norm_idx',
+        )
+
+    def test_unread_contacts(self):
+        self.assertUsesIndex(
+            ContactMessage.objects.filter(is_read=False).order_by('-created_at'),
+            'contact_unread_created_idx',
+        )
+
+    def test_recent_contacts(self):
+        self.assertUsesIndex(
+            ContactMessage.objects.order_by('-created_at')[:5],
+            'contact_created_idx',
+        )
+
+
+# Per-route query budgets as (anonymous, regular user, staff), including the
+# two session/user queries of a logged-in request. A change that makes a page
+# issue one query per row it shows (an N+1) blows through these.
+ROUTE_QUERY_BUDGETS = {
+    'home': (4, 6, 6),
+    'pets': (3, 5, 5),
+    'pet_detail': (3, 5, 5),
+    'about': (0, 2, 2),
+    'contact': (0, 2, 2),
+    'success_stories': (2, 4, 4),
+    'adoption_process': (0, 2, 2),
+    'adoption_application': (0, 3, 3),
+    'adoption_application_pet': (0, 3, 3),
+    'site_login': (0, 2, 2),
+    'adoption_gate': (0, 2, 2),
+    'adoption_gate_pet': (0, 2, 2),
+    'register': (0, 2, 2),
+    'account': (0, 3, 2),
+    'user_applications': (0, 3, 3),
+    'edit_profile': (0, 2, 2),
+    'admin_dashboard': (0, 2, 7),
+    'admin_applications': (0, 2, 4),
+    'admin_application_detail': (0, 2, 4),
+    'admin_update_application_status': (0, 2, 2),
+    'admin_update_application_notes': (0, 2, 2),
+    'admin_bulk_update_application_status': (0, 2, 2),
+    'admin_pets': (0, 2, 4),
+    'admin_contacts': (0, 2, 4),
+    'admin_contact_detail': (0, 2, 4),
+    'admin_update_contact_status': (0, 2, 2),
+    'admin_export': (0, 2, 2),
+    'admin_stats_api': (0, 2, 5),
+    'admin_metrics_api': (0, 2, 3),
+    'admin_live': (0, 2, 2),
+    'admin_performance': (0, 2, 2),
+    'logout': (0, 4, 4),
+}
+
+ROLES = ('anonymous', 'user', 'staff')
+
+# Where timings are written; compare runs against a previous file
+BENCHMARK_FILE = os.environ.get('SHELTER_BENCHMARK_FILE', settings.BASE_DIR / 'bench_output.json')
+
+
+class RouteQueryBudgetTests(ShelterTestCase):
+    """
+    Walk every shelter route as an anonymous, regular and staff user over a
+    realistically sized dataset and hold each one to a query budget.
+    """
+
+    PETS = 2000
+    APPLICATIONS = 3000
+    CONTACTS = 2000
+
+    timings = {}
+
+    @classmethod
+    def setUpTestData(cls):
+        types = [choice for choice, _ in Pet.PET_TYPES]
+        sizes = [choice for choice, _ in Pet.SIZES]
+        statuses = ['available', 'available', 'available', 'pending', 'adopted']
+        today = date.today()
+        Pet.objects.bulk_create([
+            Pet(
+                name=f'Pet {i}',
+                slug=f'pet-{i}',
+                type=types[i % len(types)],
+                breed=f'Breed {i % 40}',
+                age=f'{i % 12} years',
+                gender='Male' if i % 2 else 'Female',
+                size=sizes[i % len(sizes)],
+                color='Brown',
+                description=f'Friendly companion number {i} who loves walks and naps.',
+                personality=['Friendly', 'Playful', 'Calm', 'Curious'],
+                special_needs=i % 25 == 0,
+                status=statuses[i % len(statuses)],
+                arrival_date=today - timedelta(days=i % 400),
+                adoption_fee=100,
+                featured=i % 50 == 0,
+            )
+            for i in range(cls.PETS)
+        ], batch_size=500)
+        get_search_backend().rebuild()
+        pet_ids = list(Pet.objects.values_list('pk', flat=True))
+
+        cls.user = User.objects.create_user('adopter', 'adopter@example.com', 'pass')
+        cls.staff = User.objects.create_user('staff', 'staff@example.com', 'pass', is_staff=True)
+
+        application_statuses = ['pending', 'approved', 'rejected', 'completed']
+        AdoptionApplication.objects.bulk_create([
+            AdoptionApplication(
+                user=cls.user if i % 300 == 0 else None,
+                first_name=f'First {i}',
+                last_name=f'Last {i}',
+                email='adopter@example.com' if i % 301 == 0 else f'applicant{i}@example.com',
+                phone='555-0100',
+                address='1 Main Street',
+                pet_id=pet_ids[i % len(pet_ids)],
+                housing_type='House',
+                own_or_rent='Own',
+                household_adults=2,
+                previous_pet_experience='Plenty',
+                reason_for_adoption='Companionship',
+                status=application_statuses[i % len(application_statuses)],
+            )
+            for i in range(cls.APPLICATIONS)
+        ], batch_size=500)
+        ContactMessage.objects.bulk_create([
+            ContactMessage(
+                name=f'Visitor {i}',
+                email=f'visitor{i}@example.com',
+                subject='Question',
+                message='Do you have any puppies?',
+                is_read=i % 3 == 0,
+            )
+            for i in range(cls.CONTACTS)
+        ], batch_size=500)
+        SuccessStory.objects.bulk_create([
+            SuccessStory(
+                pet_id=pet_ids[i],
+                adopter_name=f'Family {i}',
+                adoption_date=today - timedelta(days=i),
+                title=f'Happy ending {i}',
+                story='They lived happily ever after.',
+                featured=i < 3,
+            )
+            for i in range(20)
+        ])
+
+        cls.pet = Pet.objects.filter(status='available').first()
+        cls.application = AdoptionApplication.objects.first()
+        cls.contact = ContactMessage.objects.first()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        if cls.timings:
+            with open(BENCHMARK_FILE, 'w') as fh:
+                json.dump(cls.timings, fh, indent=2, sort_keys=True)
+
+    def route_url(self, name):
+        kwargs = {
+            'pet_detail': {'pk': self.pet.pk, 'slug': self.pet.slug},
+            'adoption_application_pet': {'pet_id': self.pet.pk},
+            'adoption_gate_pet': {'pet_id': self.pet.pk},
+            'admin_application_detail': {'application_id': self.application.pk},
+            'admin_update_application_status': {'application_id': self.application.pk},
+            'admin_update_application_notes': {'application_id': self.application.pk},
+            'admin_contact_detail': {'contact_id': self.contact.pk},
+            'admin_update_contact_status': {'contact_id': self.contact.pk},
+            'admin_export': {'dataset': 'applications'},
+        }.get(name, {})
+        return reverse(name, kwargs=kwargs)
+
+    def login_as(self, role):
+        if role == 'user':
+            self.client.force_login(self.user)
+        elif role == 'staff':
+            self.client.force_login(self.staff)
+
+    def test_every_route_has_a_budget(self):
+        names = {pattern.name for pattern in urls.urlpatterns}
+        self.assertEqual(names, set(ROUTE_QUERY_BUDGETS))
+
+    def test_route_query_budgets(self):
+        for name, budgets in ROUTE_QUERY_BUDGETS.items():
+            url = self.route_url(name)
+            for role, budget in zip(ROLES, budgets):
+                with self.subTest(route=name, role=role):
+                    # Every request starts cold: no cached stats or counts
+                    cache.clear()
+                    self.client.logout()
+                    self.login_as(role)
+                    with CaptureQueriesContext(connection) as ctx:
+                        started = time.perf_counter()
+                        response = self.client.get(url)
+                        elapsed = time.perf_counter() - started
+                    self.assertLess(response.status_code, 400)
+                    self.timings[f'{name}:{role}'] = {
+                        'seconds': round(elapsed, 5),
+                        'queries': len(ctx),
+                        'status': response.status_code,
+                    }
+                    self.assertLessEqual(
+                        len(ctx), budget,
+                        msg='\n'.join(query['sql'] for query in ctx.captured_queries),
+                    )
+
+
+class RecordingReplicaRouter(ReplicaRouter):
+    """
+    ReplicaRouter that notes which models it sent to the replica.
+
+    The test database has no replica, so those reads are served by 'default'.
+    """
+
+    routed_to_replica = []
+
+    def db_for_read(self, model, **hints):
+        alias = super().db_for_read(model, **hints)
+        if alias == 'replica':
+            self.routed_to_replica.append(model._meta.label)
+            return 'default'
+        return alias
+
+
+@override_settings(
+    SHELTER_REPLICA_DATABASE='replica',
+    DATABASE_ROUTERS=['shelter.tests.RecordingReplicaRouter'],
+)
+class ReplicaRoutingTests(ShelterTestCase):
+    """Catalogue views read from the replica, everything else from the primary"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.pet = make_pet()
+        cls.user = User.objects.create_user('reader', 'reader@example.com', 'pass')
+
+    def setUp(self):
+        RecordingReplicaRouter.routed_to_replica = []
+        cache.clear()
+
+    def test_writes_always_go_to_primary(self):
+        router = ReplicaRouter()
+        with replica_reads():
+            self.assertEqual(router.db_for_write(Pet), 'default')
+
+    def test_reads_outside_catalogue_views_use_primary(self):
+        list(Pet.objects.all())
+        self.assertEqual(RecordingReplicaRouter.routed_to_replica, [])
+
+    def test_catalogue_views_read_pets_from_replica(self):
+        self.client.force_login(self.user)
+        for url in (reverse('home'), reverse('pets'), self.pet.get_absolute_url()):
+            with self.subTest(url=url):
+                RecordingReplicaRouter.routed_to_replica = []
+                self.assertEqual(self.client.get(url).status_code, 200)
+                self.assertIn('shelter.Pet', RecordingReplicaRouter.routed_to_replica)
+                # Sessions and users stay on the primary
+                self.assertNotIn('auth.User', RecordingReplicaRouter.routed_to_replica)
+                self.assertNotIn('sessions.Session', RecordingReplicaRouter.routed_to_replica)
+
+    def test_stats_are_computed_on_primary(self):
+        self.client.get(reverse('home'))
+        self.assertIn('shelter.Pet', RecordingReplicaRouter.routed_to_replica)
+        self.assertNotIn('shelter.AdoptionApplication', RecordingReplicaRouter.routed_to_replica)
+        self.assertNotIn('shelter.ContactMessage', RecordingReplicaRouter.routed_to_replica)
+
+    def test_account_pages_read_from_primary(self):
+        self.client.force_login(self.user)
+        self.client.get(reverse('account'))
+        self.assertEqual(RecordingReplicaRouter.routed_to_replica, [])
+
+
+class ImageSignalTests(ShelterTestCase):
+    """Image change tracking must not load deferred image fields"""
+
+    def test_deferred_image_is_not_loaded(self):
+        make_pet(name='Milo', type='cat', breed='Tabby')
+        with self.assertNumQueries(1):
+            pet = Pet.objects.only('pk', 'name').get()
+        self.assertEqual(pet.name, 'Milo')
+
+
+class ImageVariantTests(ShelterTestCase):
+    """Every original gets resized variants of its own"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        media = override_settings(MEDIA_ROOT=self.directory)
+        media.enable()
+        self.addCleanup(media.disable)
+
+    def make_pet_with_image(self, filename, size=(1600, 1000), **fields):
+        buffer = BytesIO()
+        Image.new('RGB', size, 'orange').save(buffer, format=Image.registered_extensions()[os.path.splitext(filename)[1]])
+        pet = make_pet(**fields)
+        pet.main_image.save(filename, ContentFile(buffer.getvalue()))
+        return pet
+
+    def test_originals_with_the_same_stem_keep_separate_variants(self):
+        jpeg_pet = self.make_pet_with_image('bella.jpg')
+        png_pet = self.make_pet_with_image('bella.png', name='Bella Two')
+        self.assertNotEqual(
+            variant_name(jpeg_pet.main_image.name, 'card', 400, 'webp'),
+            variant_name(png_pet.main_image.name, 'card', 400, 'webp'),
+        )
+        self.assertTrue(generate_variants(jpeg_pet.main_image))
+        self.assertTrue(generate_variants(png_pet.main_image))
+
+        delete_variants(jpeg_pet.main_image)
+        storage = png_pet.main_image.storage
+        self.assertFalse(storage.exists(variant_name(jpeg_pet.main_image.name, 'card', 400, 'webp')))
+        self.assertTrue(storage.exists(variant_name(png_pet.main_image.name, 'card', 400, 'webp')))
+
+    def test_variants_are_never_wider_than_the_original(self):
+        pet = self.make_pet_with_image('bella.jpg', size=(600, 400))
+        # 160 and 320 wide thumbnails and a 400 wide card, as WebP and JPEG
+        self.assertEqual(len(generate_variants(pet.main_image)), 6)
+        storage = pet.main_image.storage
+        with storage.open(variant_name(pet.main_image.name, 'card', 400, 'jpeg')) as fh:
+            self.assertEqual(Image.open(fh).size, (400, 267))
+        self.assertFalse(storage.exists(variant_name(pet.main_image.name, 'card', 800, 'jpeg')))
+        # A rerun writes nothing more
+        self.assertEqual(generate_variants(pet.main_image), [])
+
+    def render(self, pet, variant):
+        return Template('{% load shelter_images %}{% responsive_image pet.main_image variant alt=pet.name %}').render(
+            Context({'pet': pet, 'variant': variant}),
+        )
+
+    def test_responsive_image_lists_the_generated_widths(self):
+        pet = self.make_pet_with_image('bella.jpg', size=(600, 400))
+        # Before the worker has run, the original upload is shown
+        self.assertHTMLEqual(self.render(pet, 'card'), f'<img src="{pet.main_image.url}" alt="Bella">')
+
+        generate_variants(pet.main_image)
+        url = lambda width, fmt: pet.main_image.storage.url(variant_name(pet.main_image.name, 'card', width, fmt))
+        self.assertHTMLEqual(self.render(pet, 'card'), (
+            '<picture>'
+            f'<source type="image/webp" srcset="{url(400, "webp")} 400w" sizes="(max-width: 600px) 100vw, 400px">'
+            f'<img src="{url(400, "jpeg")}" srcset="{url(400, "jpeg")} 400w" sizes="(max-width: 600px) 100vw, 400px" alt="Bella">'
+            '</picture>'
+        ))
+        self.assertIn('320w', self.render(pet, 'admin_thumb'))
+        # Narrower than every detail width: the original is the best there is
+        self.assertHTMLEqual(self.render(pet, 'detail'), f'<img src="{pet.main_image.url}" alt="Bella">')
+
+
+class SearchTests(ShelterTestCase):
+    """The search backends match and rank pets, and the index follows saves and deletes"""
+
+    def search(self, query):
+        return list(get_search_backend().search(Pet.objects.all(), query).values_list('name', flat=True))
+
+    @skipUnless(connection.vendor in ('sqlite', 'postgresql'), 'Full-text search needs SQLite or Postgres')
+    def test_matches_rank_name_above_description(self):
+        make_pet(name='Scout', breed='Collie', description='Loves chasing a ball and herding')
+        make_pet(name='Biscuit', breed='Beagle', description='A scout at heart who sniffs out treats')
+        make_pet(name='Luna', breed='Tabby', type='cat', description='Sleepy')
+
+        self.assertEqual(self.search('scout'), ['Scout', 'Biscuit'])
+        self.assertEqual(self.search('beagle treats'), ['Biscuit'])
+        self.assertEqual(self.search('hamster'), [])
+
+    @skipUnless(connection.vendor == 'sqlite', 'Prefix matching is specific to the FTS5 backend')
+    def test_words_match_by_prefix_and_punctuation_is_ignored(self):
+        make_pet(name='Scout', breed='Collie')
+        self.assertEqual(self.search('coll'), ['Scout'])
+        self.assertEqual(self.search('"coll* -'), ['Scout'])
+        self.assertEqual(self.search('***'), [])
+
+    def test_saves_and_deletes_keep_the_index_current(self):
+        pet = make_pet(name='Scout', breed='Collie')
+        pet.breed = 'Poodle'
+        pet.save()
+        self.assertEqual(self.search('collie'), [])
+        self.assertEqual(self.search('poodle'), ['Scout'])
+
+        pet.delete()
+        self.assertEqual(self.search('poodle'), [])
+
+    @override_settings(SHELTER_SEARCH_BACKEND='shelter.search.IcontainsBackend')
+    def test_icontains_fallback_matches_substrings(self):
+        make_pet(name='Scout', breed='Collie')
+        make_pet(name='Luna', breed='Tabby', type='cat')
+        self.assertEqual(self.search('olli'), ['Scout'])
+
+
+class CursorPaginationTests(ShelterTestCase):
+    """Cursors page forwards and back over ties and can't be forged"""
+
+    ORDERING = ['-created_at', '-id']
+
+    @classmethod
+    def setUpTestData(cls):
+        ContactMessage.objects.bulk_create([
+            ContactMessage(name=f'Visitor {i}', email=f'v{i}@example.com', subject='Hi', message='Hello')
+            for i in range(12)
+        ])
+        # Every row shares the first sort key, so only the id breaks the ties
+        ContactMessage.objects.update(created_at=timezone.now())
+        cls.expected = list(ContactMessage.objects.order_by(*cls.ORDERING).values_list('pk', flat=True))
+
+    def page(self, cursor=None):
+        return paginate_by_cursor(ContactMessage.objects.all(), cursor, 5, self.ORDERING)
+
+    def ids(self, page):
+        return [contact.pk for contact in page]
+
+    def test_next_and_previous_round_trip(self):
+        first = self.page()
+        second = self.page(first.next_cursor)
+        third = self.page(second.next_cursor)
+        self.assertEqual(self.ids(first) + self.ids(second) + self.ids(third), self.expected)
+        self.assertFalse(first.has_previous())
+        self.assertFalse(third.has_next())
+
+        back = self.page(third.previous_cursor)
+        self.assertEqual(self.ids(back), self.ids(second))
+        self.assertTrue(back.has_next())
+        start = self.page(back.previous_cursor)
+        self.assertEqual(self.ids(start), self.ids(first))
+        self.assertFalse(start.has_previous())
+
+    def test_tampered_or_invalid_cursors_start_from_the_first_page(self):
+        cursor = self.page().next_cursor
+        forged = signing.dumps({'k': ['2000-01-01T00:00:00', 0], 'd': 'next'}, salt='other', compress=True)
+        for bad in (cursor[:-2] + 'xx', forged, 'not-a-cursor', signing.dumps({'k': [1], 'd': 'next'}, salt=CURSOR_SALT)):
+            with self.subTest(cursor=bad):
+                self.assertEqual(self.ids(self.page(bad)), self.expected[:5])
+
+
+class PerformanceMiddlewareTests(ShelterTestCase):
+    """Every request is sampled, reported as percentiles and timed in a header"""
+
+    def setUp(self):
+        performance.reset()
+        self.addCleanup(performance.reset)
+        self.addCleanup(performance._worker.clear)
+
+    def test_requests_are_sampled_per_view(self):
+        for _ in range(3):
+            self.client.get(reverse('about'))
+        [row] = [row for row in performance.performance_report() if row['view'] == 'shelter.views.about']
+        self.assertEqual(row['requests'], 3)
+        self.assertGreater(row['total_ms']['p50'], 0)
+        self.assertGreater(row['bytes']['p99'], 0)
+
+    def test_report_uses_nearest_rank_percentiles(self):
+        for value in range(100, 0, -1):
+            performance.record('view', value, 0, 0, 0, 0)
+        [row] = performance.performance_report()
+        self.assertEqual(row['total_ms'], {'p50': 50, 'p95': 95, 'p99': 99})
+
+    def test_server_timing_header(self):
+        with override_settings(SHELTER_SERVER_TIMING=True):
+            response = self.client.get(reverse('about'))
+        self.assertRegex(response['Server-Timing'], r'^total;dur=[\d.]+, db;dur=[\d.]+;desc="\d+ queries", tpl;dur=[\d.]+$')
+        with override_settings(SHELTER_SERVER_TIMING=False):
+            self.assertNotIn('Server-Timing', self.client.get(reverse('about')))
+
+    def test_first_response_of_a_worker_is_logged_once(self):
+        performance.record_worker_boot(started=time.perf_counter())
+        with self.assertLogs('shelter.performance', 'INFO') as logs:
+            self.client.get(reverse('about'))
+            self.client.get(reverse('about'))
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn('served its first response', logs.output[0])
+        self.assertIn('first_response_ms', performance.worker_report())
+
+
+class PetCardCacheTests(ShelterTestCase):
+    """Pet cards are rendered once per version of the pet"""
+
+    template = Template('{% load pet_cards %}{% pet_card pet %}')
+
+    def setUp(self):
+        cache.clear()
+        self.pet = make_pet(name='Scout')
+
+    def render(self):
+        return self.template.render(Context({'pet': Pet.objects.get(pk=self.pet.pk)}))
+
+    def test_unchanged_pet_is_served_from_the_cache(self):
+        html = self.render()
+        with self.assertTemplateNotUsed('shelter/pet_card.html'):
+            self.assertEqual(self.render(), html)
+
+    def test_saving_a_pet_renders_a_fresh_card(self):
+        self.assertIn('Scout', self.render())
+        self.pet.name = 'Ranger'
+        self.pet.save()
+        with self.assertTemplateUsed('shelter/pet_card.html'):
+            html = self.render()
+        self.assertIn('Ranger', html)
+        self.assertNotIn('Scout', html)
+
+
+class AsyncViewTests(ShelterTestCase):
+    """The async catalogue views render exactly what their sync versions do"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.pet = make_pet(name='Scout', featured=True)
+        make_pet(name='Luna')
+        SuccessStory.objects.create(
+            pet=cls.pet, adopter_name='The Smiths', adoption_date=date.today(),
+            title='Scout found a home', story='Happily ever after.', featured=True,
+        )
+
+    def sync_response(self, view, path, **kwargs):
+        request = RequestFactory().get(path)
+        request.user = AnonymousUser()
+        return view(request, **kwargs)
+
+    async def async_response(self, view, path, **kwargs):
+        request = AsyncRequestFactory().get(path)
+
+        async def auser():
+            return AnonymousUser()
+        request.auser = auser
+        return await view(request, **kwargs)
+
+    async def test_pages_match_their_sync_versions(self):
+        pages = [
+            (views.home, async_views.home, '/', {}),
+            (views.PetListView.as_view(), async_views.pet_list, '/pets/?sort=name', {}),
+            (views.PetDetailView.as_view(), async_views.pet_detail, '/pet/', {'pk': self.pet.pk, 'slug': self.pet.slug}),
+            (views.success_stories, async_views.success_stories, '/success-stories/', {}),
+        ]
+        for sync_view, async_view, path, kwargs in pages:
+            with self.subTest(path=path):
+                await cache.aclear()
+                expected = await sync_to_async(self.sync_response)(sync_view, path, **kwargs)
+                response = await self.async_response(async_view, path, **kwargs)
+                self.assertEqual(response.status_code, 200)
+                self.assertIn('Scout', expected.content.decode())
+                self.assertEqual(response.content.decode(), expected.content.decode())
+
+    async def test_stats_api_matches_its_sync_version(self):
+        staff = await User.objects.acreate_user('staff', 'staff@example.com', 'pass', is_staff=True)
+        await self.async_client.aforce_login(staff)
+        response = await self.async_client.get(reverse('admin_stats_api'))
+        request = RequestFactory().get('/')
+        request.user = staff
+        expected = await sync_to_async(views.admin_stats_api)(request)
+        self.assertEqual(response.json(), json.loads(expected.content))
+
+
+class ProductionSettingsTests(SimpleTestCase):
+    """Production settings refuse to start with the development secret key"""
+
+    def load_settings(self, **environ):
+        env = {key: value for key, value in os.environ.items() if key != 'DJANGO_SECRET_KEY'}
+        return subprocess.run(
+            [sys.executable, '-c', 'import pawhaven_project.settings'],
+            cwd=settings.BASE_DIR, env={**env, **environ}, capture_output=True, text=True,
+        )
+
+    def test_secret_key_is_required_without_debug(self):
+        result = self.load_settings(DJANGO_DEBUG='0')
+        self.assertNotEqual(result.returncode, 0)
+        self.assertIn('DJANGO_SECRET_KEY must be set', result.stderr)
+        self.assertEqual(self.load_settings(DJANGO_DEBUG='0', DJANGO_SECRET_KEY='production-key').returncode, 0)
+
+
+class WorkerWarmUpTests(SimpleTestCase):
+    """Worker boot parses every shelter template and records how long it took"""
+
+    def setUp(self):
+        self.addCleanup(performance._worker.clear)
+
+    @override_settings(SHELTER_WARM_TEMPLATES=True)
+    def test_every_template_is_warmed_without_errors(self):
+        with self.assertLogs('shelter.warmup', 'INFO') as logs:
+            warm_up_worker(time.perf_counter())
+        self.assertNotIn('ERROR', ' '.join(logs.output))
+        report = performance.worker_report()
+        self.assertEqual(report['templates'], len(template_names()))
+        self.assertIn('shelter/admin/admin_dashboard.html', template_names())
+        self.assertIn('warmup_ms', report)
+
+    @override_settings(SHELTER_WARM_TEMPLATES=False)
+    def test_warm_up_can_be_switched_off(self):
+        warm_up_worker(time.perf_counter())
+        report = performance.worker_report()
+        self.assertIn('boot_ms', report)
+        self.assertNotIn('templates', report)
+
+
+class ImageJobQueueTests(ShelterTestCase):
+    """Jobs are claimed once, retried after failures and reclaimed from dead workers"""
+
+    def setUp(self):
+        self.job = ImageJob.objects.create(model_label='shelter.pet', object_id=1)
+
+    def test_a_claimed_job_is_not_claimed_again(self):
+        self.assertEqual(claim_jobs(5), [(self.job.pk, 'shelter.pet', 1)])
+        self.assertEqual(claim_jobs(5), [])
+
+    def test_failed_jobs_are_retried_until_out_of_attempts(self):
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            [job] = claim_jobs(5)
+            finish_job(*run_image_job(job[0], 'shelter.missing', 1))
+            self.job.refresh_from_db()
+            self.assertEqual((self.job.status, self.job.attempts), ('failed', attempt))
+            self.assertIn('LookupError', self.job.error)
+            self.assertEqual(retry_failed_jobs(), 0 if attempt == MAX_ATTEMPTS else 1)
+
+    def test_jobs_of_a_dead_worker_are_reclaimed_after_the_lease(self):
+        claim_jobs(5)
+        expired = timezone.now() - timedelta(seconds=LEASE_SECONDS + 1)
+        self.assertEqual(claim_jobs(5), [])
+
+        ImageJob.objects.update(claimed_at=expired)
+        self.assertEqual(claim_jobs(5), [(self.job.pk, 'shelter.pet', 1)])
+        self.job.refresh_from_db()
+        self.assertEqual((self.job.status, self.job.attempts), ('running', 2))
+
+        # The worker that lost the lease can no longer overwrite the outcome
+        ImageJob.objects.update(attempts=MAX_ATTEMPTS, claimed_at=expired)
+        self.assertEqual(claim_jobs(5), [])
+        finish_job(self.job.pk, 4, '')
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.status, 'failed')
+
+
+@skipUnless(rcssmin is not None, 'rcssmin is not installed')
+class StaticStorageTests(SimpleTestCase):
+    """collectstatic minifies CSS and still renders pages before it has run"""
+
+    def setUp(self):
+        self.location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.location)
+        self.storage = ShelterStaticFilesStorage(location=self.location)
+
+    def test_css_is_minified_when_saved(self):
+        self.storage.save('shelter/css/site.css', ContentFile(b'body {\n    color: red;\n}\n'))
+        with self.storage.open('shelter/css/site.css') as saved:
+            self.assertEqual(saved.read(), b'body{color:red}')
+
+    def test_plain_names_without_a_manifest(self):
+        self.assertEqual(self.storage.stored_name('shelter/css/style.css'), 'shelter/css/style.css')
+
+    def test_unknown_files_fail_once_there_is_a_manifest(self):
+        self.storage.hashed_files = {'shelter/css/style.css': 'shelter/css/style.0123456789ab.css'}
+        self.assertEqual(self.storage.stored_name('shelter/css/style.css'), 'shelter/css/style.0123456789ab.css')
+        with self.assertRaises(ValueError):
+            self.storage.stored_name('shelter/css/stlye.css')
+
+
+class InlineStyleTests(SimpleTestCase):
+    """Page CSS lives in cacheable bundles; only critical CSS stays inline"""
+
+    def test_templates_have_no_inline_page_styles(self):
+        for path in extract_inline_css.TEMPLATES:
+            with self.subTest(template=path.name):
+                self.assertIsNone(
+                    extract_inline_css.STYLE_BLOCK.search(path.read_text()),
+                    msg='Run `manage.py extract_inline_css` to move the new styles into a bundle',
+                )
+
+
+class ConditionalGetTests(ShelterTestCase):
+    """Unchanged catalogue pages are answered with 304 before any rendering"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.pet = make_pet()
+        cls.other = make_pet(name='Rex')
+        cls.user = User.objects.create_user('adopter', 'adopter@example.com', 'pass')
+
+    def revalidate(self, url, response):
+        headers = {'HTTP_IF_NONE_MATCH': response['ETag']}
+        if response.has_header('Last-Modified'):
+            headers['HTTP_IF_MODIFIED_SINCE'] = response['Last-Modified']
+        return self.client.get(url, **headers)
+
+    def test_unchanged_pages_are_not_modified(self):
+        for url in (reverse('pets'), reverse('pets') + '?type=dog&sort=name', self.pet.get_absolute_url()):
+            with self.subTest(url=url):
+                first = self.client.get(url)
+                self.assertEqual(first.status_code, 200)
+                self.assertTrue(first.has_header('ETag'))
+                self.assertTrue(first.has_header('Last-Modified'))
+                with self.assertTemplateNotUsed('shelter/base.html'), self.assertNumQueries(1):
+                    second = self.revalidate(url, first)
+                self.assertEqual(second.status_code, 304)
+                self.assertEqual(second.content, b'')
+
+    def test_pet_changes_refresh_list_and_detail(self):
+        urls = (reverse('pets'), self.pet.get_absolute_url())
+        first = {url: self.client.get(url) for url in urls}
+        # A related pet changing also changes the detail page
+        self.other.name = 'Max'
+        self.other.save()
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.revalidate(url, first[url]).status_code, 200)
+
+    def test_etag_differs_per_viewer(self):
+        url = reverse('pets')
+        anonymous = self.client.get(url)
+        self.client.force_login(self.user)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=anonymous['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('Last-Modified'))
+        self.assertEqual(self.revalidate(url, response).status_code, 304)
+
+
+class SessionCostTests(ShelterTestCase):
+    """Anonymous browsing never touches the session; logged-in requests read it once"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.pet = make_pet()
+        cls.user = User.objects.create_user('adopter', 'adopter@example.com', 'pass')
+
+    def test_anonymous_catalogue_pages_skip_the_session(self):
+        for url in (reverse('home'), reverse('pets'), self.pet.get_absolute_url(), reverse('success_stories')):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertFalse(response.wsgi_request.session.accessed)
+                self.assertNotIn(settings.SESSION_COOKIE_NAME, response.cookies)
+                # Shared caches must not hand the logged-out page to logged-in users
+                self.assertIn('Cookie', response['Vary'])
+
+    def test_logged_in_session_is_read_from_the_database(self):
+        self.client.force_login(self.user)
+        url = reverse('about')
+        self.client.get(url)
+        # The session row and the user row, warm cache or not, so a logout
+        # handled by any worker ends the session everywhere
+        with self.assertNumQueries(2):
+            self.client.get(url)
+        self.client.logout()
+        self.assertFalse(self.client.get(reverse('account')).wsgi_request.user.is_authenticated)
+
+
+class ApplicationLinkingTests(ShelterTestCase):
+    """Applications sent from an email end up on the account with that email"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.pet = make_pet()
+
+    def apply(self, email):
+        return AdoptionApplication.objects.create(
+            first_name='Ann', last_name='Adopter', email=email, phone='555-0100',
+            address='1 Main Street', pet=self.pet, housing_type='House', own_or_rent='Own',
+            household_adults=1, previous_pet_experience='Some', reason_for_adoption='Company',
+        )
+
+    def test_email_is_normalized(self):
+        application = self.apply('  Ann@Example.COM ')
+        application.refresh_from_db()
+        self.assertEqual(application.email_normalized, 'ann@example.com')
+
+    def test_registration_links_earlier_applications(self):
+        application = self.apply('Ann@Example.com')
+        user = User.objects.create_user('ann', 'ann@example.com', 'pass')
+        application.refresh_from_db()
+        self.assertEqual(application.user, user)
+
+    def test_linking_keeps_one_open_application_per_pet(self):
+        first = self.apply('ann@example.com')
+        second = self.apply('ann@example.com')
+        user = User.objects.create_user('ann', 'ann@example.com', 'pass')
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.user, user)
+        self.assertIsNone(second.user)
+
+    def test_registration_skips_shared_emails(self):
+        User.objects.create_user('bob', 'bob@example.com', 'pass')
+        application = self.apply('bob@example.com')
+        User.objects.create_user('bob2', 'BOB@example.com', 'pass')
+        application.refresh_from_db()
+        self.assertIsNone(application.user)
+
+    def test_later_saves_do_not_link(self):
+        user = User.objects.create_user('ann', 'ann@example.com', 'pass')
+        application = self.apply('ann@example.com')
+        self.client.login(username='ann', password='pass')
+        application.refresh_from_db()
+        self.assertIsNone(application.user)
+
+        # Changing the email on the profile doesn't hand over a stranger's applications
+        stranger = self.apply('stranger@example.com')
+        self.client.post(reverse('edit_profile'), {
+            'username': 'ann', 'first_name': '', 'last_name': '', 'email': 'stranger@example.com',
+        })
+        user.refresh_from_db()
+        stranger.refresh_from_db()
+        self.assertEqual(user.email, 'stranger@example.com')
+        self.assertIsNone(stranger.user)
+
+    def test_backfill_skips_shared_emails(self):
+        # Accounts created before linking existed
+        User.objects.bulk_create([
+            User(username='ann', email='ann@example.com'),
+            User(username='bob', email='bob@example.com'),
+            User(username='bob2', email='BOB@example.com'),
+        ])
+        ann_application = self.apply('ANN@example.com')
+        bob_application = self.apply('bob@example.com')
+
+        call_command('link_applications', stdout=StringIO())
+
+        ann_application.refresh_from_db()
+        bob_application.refresh_from_db()
+        self.assertEqual(ann_application.user.username, 'ann')
+        self.assertIsNone(bob_application.user)
+
+
+class AdoptionSubmissionTests(ShelterTestCase):
+    """Resubmitted or repeated applications don't create duplicate rows"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.pet = make_pet()
+        cls.user = User.objects.create_user('adopter', 'adopter@example.com', 'pass')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        self.url = reverse('adoption_application_pet', args=[self.pet.pk])
+
+    def submit(self, token, **data):
+        return self.client.post(self.url, {
+            'pet_id': self.pet.pk, 'first_name': 'Ann', 'last_name': 'Adopter',
+            'email': 'adopter@example.com', 'phone': '555-0100', 'address': '1 Main Street',
+            'housing_type': 'House', 'own_or_rent': 'Own', 'household_adults': '2',
+            'household_children': '0', 'has_other_pets': 'no',
+            'previous_pet_experience': 'Some', 'reason_for_adoption': 'Company',
+            'submission_token': token, **data,
+        })
+
+    def test_form_carries_a_submission_token(self):
+        response = self.client.get(self.url)
+        self.assertRegex(response.content.decode(), r'name="submission_token" value="[0-9a-f-]{36}"')
+
+    def test_resubmitted_form_creates_one_application(self):
+        token = str(uuid.uuid4())
+        first = self.submit(token)
+        second = self.submit(token)
+        self.assertRedirects(first, reverse('user_applications'), fetch_redirect_response=False)
+        self.assertRedirects(second, reverse('user_applications'), fetch_redirect_response=False)
+        application = AdoptionApplication.objects.get()
+        self.assertEqual(application.user, self.user)
+        self.assertEqual(str(application.submission_token), token)
+
+    def test_one_open_application_per_pet(self):
+        self.submit(str(uuid.uuid4()))
+        self.submit(str(uuid.uuid4()))
+        self.assertEqual(AdoptionApplication.objects.count(), 1)
+
+        # Once the first is closed the user may apply again
+        AdoptionApplication.objects.update(status='rejected')
+        self.submit(str(uuid.uuid4()))
+        self.assertEqual(AdoptionApplication.objects.count(), 2)
+
+    def test_invalid_application_is_not_saved(self):
+        response = self.submit(str(uuid.uuid4()), household_adults='0', email='not-an-email')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(AdoptionApplication.objects.exists())
+
+    def test_invalid_application_keeps_the_posted_answers(self):
+        response = self.submit(
+            str(uuid.uuid4()), email='not-an-email', housing_type='apartment', own_or_rent='rent',
+            landlord_approval='yes', household_children='3', reason_for_adoption='She & I <3 walks',
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertContains(response, 'Email: Enter a valid email address.', status_code=400)
+        for html in (
+            '<input type="text" id="first_name" name="first_name" value="Ann" required class="form-control">',
+            '<input type="email" id="email" name="email" value="not-an-email" required class="form-control">',
+            '<input type="number" id="household_children" name="household_children" min="0" value="3" class="form-control">',
+            '<option value="apartment" selected>Apartment</option>',
+            '<option value="rent" selected>Rent</option>',
+            '<option value="yes" selected>Yes</option>',
+            '<option value="no" selected>No</option>',
+        ):
+            self.assertContains(response, html, html=True, status_code=400)
+        self.assertContains(response, 'She &amp; I &lt;3 walks</textarea>', status_code=400)
+
+
+class ApplicationTriageTests(ShelterTestCase):
+    """Status changes are set-based and keep pets and competing applications consistent"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.pet = make_pet()
+        cls.staff = User.objects.create_user('staff', 'staff@example.com', 'pass', is_staff=True)
+        cls.applications = [
+            AdoptionApplication.objects.create(
+                first_name=f'Applicant {i}', last_name='Adopter', email=f'applicant{i}@example.com',
+                phone='555-0100', address='1 Main Street', pet=cls.pet, housing_type='House',
+                own_or_rent='Own', household_adults=1, previous_pet_experience='Some',
+                reason_for_adoption='Company',
+            )
+            for i in range(5)
+        ]
+
+    def statuses(self):
+        return list(AdoptionApplication.objects.order_by('pk').values_list('status', flat=True))
+
+    def test_completing_rejects_competing_applications(self):
+        winner = self.applications[0]
+        with self.assertNumQueries(8):
+            set_application_status(AdoptionApplication.objects.filter(pk=winner.pk), 'completed')
+
+        self.assertEqual(self.statuses(), ['completed', 'rejected', 'rejected', 'rejected', 'rejected'])
+        self.pet.refresh_from_db()
+        self.assertEqual(self.pet.status, 'adopted')
+
+        # Reopening the adoption makes the pet available again
+        set_application_status(AdoptionApplication.objects.filter(pk=winner.pk), 'approved')
+        self.pet.refresh_from_db()
+        self.assertEqual(self.pet.status, 'available')
+
+    def test_bulk_update_from_dashboard(self):
+        self.client.force_login(self.staff)
+        selected = [application.pk for application in self.applications[:3]]
+        response = self.client.post(reverse('admin_bulk_update_application_status'), {
+            'application_ids': selected, 'status': 'rejected',
+        })
+        self.assertRedirects(response, reverse('admin_applications'), fetch_redirect_response=False)
+        self.assertEqual(self.statuses(), ['rejected', 'rejected', 'rejected', 'pending', 'pending'])
+        self.pet.refresh_from_db()
+        self.assertEqual(self.pet.status, 'available')
+
+    def test_completing_rejects_approved_applications_too(self):
+        set_application_status(AdoptionApplication.objects.filter(pk=self.applications[1].pk), 'approved')
+        _, auto_rejected = set_application_status(
+            AdoptionApplication.objects.filter(pk=self.applications[0].pk), 'completed',
+        )
+        self.assertEqual(auto_rejected, 4)
+        self.assertEqual(self.statuses(), ['completed', 'rejected', 'rejected', 'rejected', 'rejected'])
+
+    def test_a_pet_is_adopted_through_one_application(self):
+        first, second = self.applications[:2]
+        set_application_status(AdoptionApplication.objects.filter(pk=first.pk), 'completed')
+        set_application_status(AdoptionApplication.objects.filter(pk=second.pk), 'pending')
+
+        with self.assertRaisesMessage(ValidationError, 'Only one application per pet can be completed (Bella)'):
+            set_application_status(AdoptionApplication.objects.filter(pk=second.pk), 'completed')
+        # Nor several at once
+        set_application_status(AdoptionApplication.objects.filter(pk=first.pk), 'rejected')
+        with self.assertRaises(ValidationError):
+            set_application_status(AdoptionApplication.objects.filter(pk__in=[first.pk, second.pk]), 'completed')
+        self.assertEqual(self.statuses(), ['rejected', 'pending', 'rejected', 'rejected', 'rejected'])
+
+        # The dashboard reports the refusal
+        self.client.force_login(self.staff)
+        set_application_status(AdoptionApplication.objects.filter(pk=first.pk), 'completed')
+        set_application_status(AdoptionApplication.objects.filter(pk=second.pk), 'pending')
+        response = self.client.post(
+            reverse('admin_update_application_status', args=[second.pk]), {'status': 'completed'}, follow=True,
+        )
+        self.assertContains(response, 'Only one application per pet can be completed (Bella)')
+        self.assertEqual(self.statuses(), ['completed', 'pending', 'rejected', 'rejected', 'rejected'])
+
+
+class ExportTests(ShelterTestCase):
+    """Exports stream every row without building model instances"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.pet = make_pet(name='Bella, "Belle"')
+        cls.staff = User.objects.create_user('staff', 'staff@example.com', 'pass', is_staff=True)
+        ContactMessage.objects.bulk_create([
+            ContactMessage(name=f'Visitor {i}', email=f'visitor{i}@example.com', subject='Hi', message='Line one\nline two')
+            for i in range(25)
+        ])
+
+    def test_csv_streams_in_chunks(self):
+        # One query, whose rows are fetched ten at a time
+        with self.assertNumQueries(1):
+            lines = list(export_lines('contacts', 'csv', chunk_size=10))
+        rows = list(csv.reader(StringIO(''.join(lines))))
+        self.assertEqual(rows[0][:3], ['id', 'created_at', 'name'])
+        self.assertEqual(len(rows), 26)
+        self.assertEqual(rows[1][6], 'Line one\nline two')
+
+    def test_csv_quotes_formula_cells(self):
+        ContactMessage.objects.create(
+            name='=HYPERLINK("http://example.com")', email='v@example.com', phone='+1 555 0100',
+            subject='@SUM(A1)', message='-2+3',
+        )
+        rows = list(csv.reader(StringIO(''.join(export_lines('contacts', 'csv')))))
+        self.assertEqual(rows[-1][2:7], ["'=HYPERLINK(\"http://example.com\")", 'v@example.com', "'+1 555 0100", "'@SUM(A1)", "'-2+3"])
+        # JSON Lines keep the values as they are
+        self.assertEqual(json.loads(list(export_lines('contacts', 'jsonl'))[-1])['subject'], '@SUM(A1)')
+
+    async def test_async_export_matches_the_sync_one(self):
+        expected = await sync_to_async(lambda: list(export_lines('contacts', 'csv', chunk_size=10)))()
+        self.assertEqual([line async for line in aexport_lines('contacts', 'csv', chunk_size=10)], expected)
+
+    def test_jsonl_export(self):
+        lines = list(export_lines('pets', 'jsonl'))
+        self.assertEqual(len(lines), 1)
+        pet = json.loads(lines[0])
+        self.assertEqual(pet['name'], 'Bella, "Belle"')
+        self.assertEqual(pet['adoption_fee'], '100.00')
+
+    def test_dashboard_download(self):
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('admin_export', args=['pets']), {'format': 'csv'})
+        self.assertTrue(response.streaming)
+        self.assertIn('attachment; filename="pawhaven-pets-', response['Content-Disposition'])
+        body = b''.join(response.streaming_content).decode()
+        self.assertIn('"Bella, ""Belle"""', body)
+
+        self.assertEqual(self.client.get(reverse('admin_export', args=['users'])).status_code, 404)
+
+    async def test_asgi_download_streams_asynchronously(self):
+        await self.async_client.aforce_login(self.staff)
+        response = await self.async_client.get(reverse('admin_export', args=['contacts']), {'format': 'jsonl'})
+        self.assertTrue(response.is_async)
+        lines = [line async for line in response.streaming_content]
+        self.assertEqual(len(lines), 25)
+
+    def test_command_writes_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'applications.jsonl')
+            stderr = StringIO()
+            call_command('export_shelter_data', 'contacts', '--format', 'jsonl', '-o', path, stderr=stderr)
+            with open(path) as fh:
+                self.assertEqual(len(fh.readlines()), 25)
+        self.assertIn('Exported 25 contacts', stderr.getvalue())
+
+
+class PetImportTests(ShelterTestCase):
+    """import_pets validates, dedupes slugs and can be rerun safely"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        media = override_settings(MEDIA_ROOT=os.path.join(self.directory, 'media'))
+        media.enable()
+        self.addCleanup(media.disable)
+        Image.new('RGB', (600, 400), 'orange').save(os.path.join(self.directory, 'max.jpg'))
+        make_pet(name='Max', breed='Beagle')
+
+    def write_manifest(self, rows):
+        path = os.path.join(self.directory, 'partner.csv')
+        with open(path, 'w', newline='') as fh:
+            writer = csv.DictWriter(fh, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+        return path
+
+    def row(self, reference, **values):
+        return {
+            'reference': reference, 'name': 'Max', 'type': 'Dog', 'breed': 'Mixed', 'age': '2 years',
+            'gender': 'male', 'size': 'large', 'color': 'Black', 'description': 'Friendly',
+            'personality': 'Calm; Playful', 'vaccinated': 'yes', 'adoption_fee': '75.00',
+            'arrival_date': '2026-09-01', 'main_image': '', **values,
+        }
+
+    def test_import_is_idempotent(self):
+        manifest = self.write_manifest([
+            self.row('A1', main_image='max.jpg'),
+            self.row('A2'),
+            self.row('A3', name='Luna', type='cat', gender='Female'),
+        ])
+        call_command('import_pets', manifest, '--processes', '1', stdout=StringIO())
+        call_command('import_pets', manifest, '--processes', '1', stdout=StringIO())
+
+        imported = Pet.objects.exclude(import_reference=None).order_by('import_reference')
+        self.assertEqual(
+            list(imported.values_list('import_reference', 'slug', 'type', 'size')),
+            [('partner:A1', 'max-2', 'dog', 'Large'), ('partner:A2', 'max-3', 'dog', 'Large'),
+             ('partner:A3', 'luna', 'cat', 'Large')],
+        )
+        pet = imported[0]
+        self.assertEqual(pet.personality, ['Calm', 'Playful'])
+        self.assertTrue(pet.vaccinated)
+        self.assertEqual(pet.main_image.name, 'pets/max-2-main_image.jpg')
+        self.assertTrue(pet.main_image.storage.exists(variant_name(pet.main_image.name, 'card', 400, 'webp')))
+        self.assertEqual(get_search_backend().search(Pet.objects.all(), 'Luna').count(), 1)
+
+    def test_invalid_manifest_imports_nothing(self):
+        manifest = self.write_manifest([self.row('A1'), self.row('A2', type='dragon')])
+        stderr = StringIO()
+        with self.assertRaises(CommandError):
+            call_command('import_pets', manifest, stdout=StringIO(), stderr=stderr)
+        self.assertIn('Row 2: type:', stderr.getvalue())
+        self.assertFalse(Pet.objects.exclude(import_reference=None).exists())
+
+    def test_saved_pets_get_unique_slugs(self):
+        pet = make_pet(name='Max', breed='Boxer')
+        self.assertEqual(pet.slug, 'max-2')
+
+
+class StatsTests(ShelterTestCase):
+    """Cached counters are recomputed once a counted change commits"""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_saves_invalidate_the_counters_after_commit(self):
+        self.assertEqual(get_stats()['available_pets'], 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            pet = make_pet()
+            # Until the transaction commits, readers keep the cached counters
+            self.assertEqual(get_stats()['available_pets'], 0)
+        self.assertEqual(get_stats()['available_pets'], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            pet.status = 'adopted'
+            pet.save()
+            ContactMessage.objects.create(name='Visitor', email='v@example.com', subject='Hi', message='Hello')
+        stats = get_stats()
+        self.assertEqual((stats['available_pets'], stats['total_adopted'], stats['unread_messages']), (0, 1, 1))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            pet.delete()
+        self.assertEqual(get_stats()['total_adopted'], 0)
+
+    def test_counters_are_served_from_the_cache(self):
+        get_stats()
+        with self.assertNumQueries(0):
+            get_stats()
+
+
+class DailyMetricTests(ShelterTestCase):
+    """Daily metrics follow the raw tables and are served without touching them"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.today = date.today()
+        cls.yesterday = cls.today - timedelta(days=1)
+        cls.staff = User.objects.create_user('staff', 'staff@example.com', 'pass', is_staff=True)
+        cls.dog, cls.cat = (
+            make_pet(name=name, type=pet_type, arrival_date=arrival_date)
+            for name, pet_type, arrival_date in (('Bella', 'dog', cls.yesterday), ('Luna', 'cat', cls.today))
+        )
+
+    def apply(self, pet):
+        return AdoptionApplication.objects.create(
+            first_name='Ann', last_name='Adopter', email='ann@example.com', phone='555-0100',
+            address='1 Main Street', pet=pet, housing_type='House', own_or_rent='Own',
+            household_adults=1, previous_pet_experience='Some', reason_for_adoption='Company',
+        )
+
+    def metric(self, day, pet_type, name):
+        return DailyMetric.objects.filter(date=day, pet_type=pet_type).values_list(name, flat=True).first() or 0
+
+    def test_rollup_command_backfills_history(self):
+        self.apply(self.dog)
+        ContactMessage.objects.create(name='Visitor', email='v@example.com', subject='Hi', message='Hello')
+        call_command('rollup_metrics', '--all', stdout=StringIO())
+
+        self.assertEqual(self.metric(self.yesterday, 'dog', 'arrivals'), 1)
+        self.assertEqual(self.metric(self.today, 'cat', 'arrivals'), 1)
+        self.assertEqual(self.metric(self.today, 'dog', 'applications_submitted'), 1)
+        self.assertEqual(self.metric(self.today, '', 'messages'), 1)
+
+    def test_saves_and_triage_keep_metrics_current(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            winner = self.apply(self.dog)
+            self.apply(self.dog)
+        self.assertEqual(self.metric(self.today, 'dog', 'applications_submitted'), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            set_application_status(AdoptionApplication.objects.filter(pk=winner.pk), 'completed')
+        self.assertEqual(self.metric(self.today, 'dog', 'applications_completed'), 1)
+        self.assertEqual(self.metric(self.today, 'dog', 'adoptions'), 1)
+
+    def test_transitions_stay_on_the_day_they_happened(self):
+        application = self.apply(self.dog)
+        set_application_status(AdoptionApplication.objects.filter(pk=application.pk), 'approved')
+        last_week = timezone.now() - timedelta(days=7)
+        AdoptionApplication.objects.filter(pk=application.pk).update(approved_at=last_week)
+        rollup_days(timezone.localdate(last_week), self.today)
+        self.assertEqual(self.metric(timezone.localdate(last_week), 'dog', 'applications_approved'), 1)
+
+        # Editing notes and completing the adoption don't move the approval
+        self.client.force_login(self.staff)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('admin_update_application_notes', args=[application.pk]), {'notes': 'Called'})
+        with self.captureOnCommitCallbacks(execute=True):
+            set_application_status(AdoptionApplication.objects.filter(pk=application.pk), 'completed')
+        self.assertEqual(self.metric(timezone.localdate(last_week), 'dog', 'applications_approved'), 1)
+        self.assertEqual(self.metric(self.today, 'dog', 'applications_approved'), 0)
+        self.assertEqual(self.metric(self.today, 'dog', 'applications_completed'), 1)
+
+        # Reopening the adoption takes the completion back
+        with self.captureOnCommitCallbacks(execute=True):
+            set_application_status(AdoptionApplication.objects.filter(pk=application.pk), 'approved')
+        self.assertEqual(self.metric(self.today, 'dog', 'adoptions'), 0)
+        self.assertEqual(self.metric(timezone.localdate(last_week), 'dog', 'applications_approved'), 1)
+
+    def test_saved_status_changes_are_stamped(self):
+        application = self.apply(self.dog)
+        application.status = 'approved'
+        application.save()
+        approved_at = application.approved_at
+        self.assertIsNotNone(approved_at)
+        application.status = 'completed'
+        application.save()
+        application.refresh_from_db()
+        self.assertEqual(application.approved_at, approved_at)
+        self.assertIsNotNone(application.completed_at)
+
+    def test_changing_a_pets_type_moves_its_applications(self):
+        application = self.apply(self.dog)
+        AdoptionApplication.objects.filter(pk=application.pk).update(
+            submitted_at=timezone.now() - timedelta(days=3),
+        )
+        three_days_ago = self.today - timedelta(days=3)
+        rollup_days(three_days_ago, self.today)
+        self.assertEqual(self.metric(three_days_ago, 'dog', 'applications_submitted'), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.dog.type = 'cat'
+            self.dog.save()
+        self.assertEqual(self.metric(three_days_ago, 'dog', 'applications_submitted'), 0)
+        self.assertEqual(self.metric(three_days_ago, 'cat', 'applications_submitted'), 1)
+
+    def test_rollup_updates_rows_in_place(self):
+        # Rows a concurrent rollup already stored for the day
+        stored = DailyMetric.objects.create(date=self.today, pet_type='dog', applications_submitted=5)
+        DailyMetric.objects.create(date=self.today, pet_type='bird', applications_submitted=1)
+        self.apply(self.dog)
+
+        rollup_days(self.today)
+
+        self.assertEqual(
+            set(DailyMetric.objects.filter(date=self.today).values_list('pk', 'pet_type', 'applications_submitted')),
+            {(stored.pk, 'dog', 1), (DailyMetric.objects.get(date=self.today, pet_type='cat').pk, 'cat', 0)},
+        )
+
+    def test_saves_that_change_no_metric_skip_the_rollup(self):
+        application = self.apply(self.dog)
+        contact = ContactMessage.objects.create(name='Visitor', email='v@example.com', subject='Hi', message='Hello')
+
+        with mock.patch('shelter.signals.rollup_dates') as rollup_dates:
+            with self.captureOnCommitCallbacks(execute=True):
+                contact.is_read = True
+                contact.save()
+                self.dog.description = 'Loves long walks'
+                self.dog.save()
+                application.admin_notes = 'Called references'
+                application.save()
+            rollup_dates.assert_not_called()
+
+            with self.captureOnCommitCallbacks(execute=True):
+                application.status = 'approved'
+                application.save()
+            rollup_dates.assert_called_once()
+
+    def test_failed_rollup_does_not_fail_the_save(self):
+        with mock.patch('shelter.signals.rollup_dates', side_effect=IntegrityError):
+            with self.assertLogs('django', 'ERROR'):
+                with self.captureOnCommitCallbacks(execute=True):
+                    application = self.apply(self.dog)
+        self.assertTrue(AdoptionApplication.objects.filter(pk=application.pk).exists())
+
+    def test_api_reads_only_the_rollup_table(self):
+        self.apply(self.dog)
+        call_command('rollup_metrics', stdout=StringIO())
+        self.client.force_login(self.staff)
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('admin_metrics_api'), {'days': 7, 'type': 'dog'})
+        series = response.json()
+        self.assertEqual(len(series['dates']), 7)
+        self.assertEqual(series['dates'][-1], self.today.isoformat())
+        self.assertEqual(series['arrivals'][-2:], [1, 0])
+        self.assertEqual(series['applications_submitted'][-1], 1)
+        self.assertFalse([query for query in ctx.captured_queries if 'shelter_adoptionapplication' in query['sql']])
+
+        self.assertEqual(self.client.get(reverse('admin_metrics_api'), {'type': 'dragon'}).status_code, 400)
+
+
+@override_settings(SHELTER_LIVE_STATS_DELAY=0, SHELTER_LIVE_MAX_SECONDS=0)
+class LiveFeedTests(ShelterTestCase):
+    """The dashboard feed pushes committed changes and costs the same for any number of tabs"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user('staff', 'staff@example.com', 'pass', is_staff=True)
+
+    async def open_streams(self, count):
+        """Dashboard streams read past their opening counters"""
+        streams = [event_stream() for _ in range(count)]
+        for stream in streams:
+            while not (await anext(stream)).startswith('event: stats'):
+                pass
+        return streams
+
+    async def next_event(self, stream):
+        """The name and data of the next event on ``stream``"""
+        fields = dict(line.split(': ', 1) for line in (await anext(stream)).strip().split('\n'))
+        return fields['event'], json.loads(fields['data'])
+
+    def send_message(self):
+        """A contact message committed while checking nothing is sent before the commit"""
+        last_id = broker.publish('ping', {}).id
+        with self.captureOnCommitCallbacks(execute=True):
+            contact = ContactMessage.objects.create(name='Visitor', email='v@example.com', subject='Hi', message='Hello')
+            self.assertEqual(broker.missed(last_id), [])
+        return contact
+
+    @override_settings(SHELTER_LIVE_MAX_SECONDS=60)
+    async def test_committed_messages_reach_every_open_stream_for_one_recompute(self):
+        streams = await self.open_streams(20)
+        try:
+            contact = await sync_to_async(self.send_message)()
+            for stream in streams:
+                events = dict([await self.next_event(stream) for _ in range(3)])
+                self.assertEqual(events['message']['id'], contact.pk)
+                self.assertEqual(events['stats'], {'unread_messages': 1})
+        finally:
+            for stream in streams:
+                await stream.aclose()
+
+    @override_settings(SHELTER_LIVE_MAX_SECONDS=60)
+    async def test_stats_are_recomputed_once_per_change_not_per_stream(self):
+        def send_message():
+            with CaptureQueriesContext(connection) as ctx:
+                self.send_message()
+            # Read here: ``connection`` is another connection on the event loop's thread
+            return ctx.captured_queries
+
+        streams = await self.open_streams(20)
+        try:
+            queries = await sync_to_async(send_message)()
+        finally:
+            for stream in streams:
+                await stream.aclose()
+        # The per-table stats aggregates; the daily metrics rollup groups by day
+        aggregates = [
+            query for query in queries
+            if 'COUNT(' in query['sql'] and 'GROUP BY' not in query['sql']
+        ]
+        self.assertEqual(len(aggregates), 3)
+
+    async def test_reconnecting_stream_replays_missed_events(self):
+        await self.async_client.aforce_login(self.staff)
+        first = broker.publish('message', {'id': 1})
+        second = broker.publish('message', {'id': 2})
+
+        response = await self.async_client.get(reverse('admin_live'), headers={'Last-Event-ID': str(first.id)})
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        body = b''.join([chunk async for chunk in response.streaming_content]).decode()
+        self.assertNotIn(f'id: {first.id}\n', body)
+        self.assertIn(f'id: {second.id}\nevent: message\n', body)
+        self.assertIn('event: stats\ndata: {', body)
+
+        response = await self.async_client.get(reverse('admin_live'), headers={'Last-Event-ID': str(second.id + 1000)})
+        self.assertIn(b'event: resync', b''.join([chunk async for chunk in response.streaming_content]))
+
+    def test_wsgi_dashboard_polls_instead_of_streaming(self):
+        # A stream would hold a sync worker for as long as the tab is open
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('admin_dashboard'))
+        self.assertContains(response, f'data-stats-url="{reverse("admin_stats_api")}"')
+        self.assertNotContains(response, 'data-live-url')
+        self.assertEqual(self.client.get(reverse('admin_live')).status_code, 204)
+
+    async def test_asgi_stream_is_asynchronous(self):
+        await self.async_client.aforce_login(self.staff)
+        response = await self.async_client.get(reverse('admin_live'))
+        self.assertTrue(response.is_async)
+        chunks = [chunk async for chunk in response.streaming_content]
+        self.assertTrue(chunks[0].startswith(b'retry: '))
+        self.assertIn(b'event: stats', chunks[-1])
+
+        response = await self.async_client.get(reverse('admin_dashboard'))
+        self.assertContains(response, f'data-live-url="{reverse("admin_live")}"')
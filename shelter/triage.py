@@ -0,0 +1,96 @@
+"""
+Application triage.
+
+``set_application_status()`` moves any number of applications to a new
+status with a handful of set-based ``UPDATE`` statements in one
+transaction, whether it's called for a single application from the
+dashboard, for a selection from the bulk form or from the Django admin.
+
+Completing an application adopts its pet, so the other pending and
+approved applications for that pet are rejected in the same
+statement-level sweep. A pet is adopted through one application only:
+completing a second one for it raises ``ValidationError`` and changes
+nothing. Moving a completed application back makes the pet available
+again.
+
+``approved_at`` (first approval) and ``completed_at`` (cleared when the
+adoption is reopened) are stamped here, as ``reviewed_at`` is; the daily
+metrics count from them.
+"""
+from collections import Counter
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .live import broker
+from .metrics import rollup_dates
+from .models import AdoptionApplication, Pet
+from .stats import invalidate_stats
+
+
+def set_application_status(applications, status):
+    """Set ``status`` on every application in the queryset; returns (updated, auto_rejected)"""
+    if status not in dict(AdoptionApplication.STATUS_CHOICES):
+        raise ValueError(f'Unknown application status {status!r}')
+
+    now = timezone.now()
+    with transaction.atomic():
+        rows = list(
+            applications.order_by().select_for_update()
+            .values_list('pk', 'pet_id', 'status', 'approved_at', 'completed_at')
+        )
+        application_ids = [pk for pk, pet_id, *_ in rows]
+        pet_ids = {pet_id for pk, pet_id, *_ in rows}
+
+        if status == 'completed':
+            # Locking the pets serializes competing completions of the same pet
+            pet_names = dict(Pet.objects.select_for_update().filter(pk__in=pet_ids).values_list('pk', 'name'))
+            selected_per_pet = Counter(pet_id for pk, pet_id, *_ in rows)
+            conflicts = {pet_id for pet_id, selected in selected_per_pet.items() if selected > 1}
+            conflicts.update(
+                AdoptionApplication.objects.filter(pet_id__in=pet_ids, status='completed')
+                .exclude(pk__in=application_ids).values_list('pet_id', flat=True)
+            )
+            if conflicts:
+                names = ', '.join(sorted(pet_names[pet_id] for pet_id in conflicts))
+                raise ValidationError(f'Only one application per pet can be completed ({names})')
+
+        transitions = {'completed_at': None}
+        if status == 'approved':
+            transitions['approved_at'] = Coalesce('approved_at', Value(now))
+        elif status == 'completed':
+            transitions['completed_at'] = Coalesce('completed_at', Value(now))
+        updated = AdoptionApplication.objects.filter(pk__in=application_ids).update(
+            status=status, reviewed_at=now, **transitions,
+        )
+
+        auto_rejected = 0
+        if status == 'completed':
+            auto_rejected = AdoptionApplication.objects.filter(
+                pet_id__in=pet_ids, status__in=['pending', 'approved'],
+            ).update(status='rejected', reviewed_at=now)
+            Pet.objects.filter(pk__in=pet_ids).exclude(status='adopted').update(
+                status='adopted', updated_at=now,
+            )
+        else:
+            released_pet_ids = {pet_id for pk, pet_id, old_status, *_ in rows if old_status == 'completed'}
+            Pet.objects.filter(pk__in=released_pet_ids, status='adopted').exclude(
+                applications__status='completed',
+            ).update(status='available', updated_at=now)
+
+        # update() sends no post_save, so the cached counters are cleared, open
+        # dashboards told and the days the applications were (and are now)
+        # approved or completed re-rolled here
+        transaction.on_commit(invalidate_stats)
+        transaction.on_commit(broker.stats_changed)
+        transition_days = {timezone.localdate(now)}
+        transition_days.update(
+            timezone.localdate(moment)
+            for pk, pet_id, old_status, approved_at, completed_at in rows
+            for moment in (approved_at, completed_at) if moment
+        )
+        transaction.on_commit(lambda: rollup_dates(transition_days))
+    return updated, auto_rejected
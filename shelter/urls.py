@@ -1,19 +1,34 @@
+from django.conf import settings
 from django.urls import path
 from django.contrib.auth import views as auth_views
-from . import views
+from . import async_views, views
+
+# Under ASGI the public catalogue and the stats API are served by async views
+if settings.SHELTER_ASYNC_VIEWS:
+    home_view = async_views.home
+    pet_list_view = async_views.pet_list
+    pet_detail_view = async_views.pet_detail
+    success_stories_view = async_views.success_stories
+    admin_stats_api_view = async_views.admin_stats_api
+else:
+    home_view = views.home
+    pet_list_view = views.PetListView.as_view()
+    pet_detail_view = views.PetDetailView.as_view()
+    success_stories_view = views.success_stories
+    admin_stats_api_view = views.admin_stats_api
 
 urlpatterns = [
     # Homepage
-    path('', views.home, name='home'),
+    path('', home_view, name='home'),
 
     # Pet pages
-    path('pets/', views.PetListView.as_view(), name='pets'),
-    path('pet/<int:pk>/<slug:slug>/', views.PetDetailView.as_view(), name='pet_detail'),
+    path('pets/', pet_list_view, name='pets'),
+    path('pet/<int:pk>/<slug:slug>/', pet_detail_view, name='pet_detail'),
 
     # Information pages
     path('about/', views.about, name='about'),
     path('contact/', views.contact, name='contact'),
-    path('success-stories/', views.success_stories, name='success_stories'),
+    path('success-stories/', success_stories_view, name='success_stories'),
 
     # Adoption
     path('adoption/process/', views.adoption_process, name='adoption_process'),
@@ -40,6 +55,7 @@ urlpatterns = [
     # Admin Dashboard URLs
     path('admin-dashboard/', views.admin_dashboard, name='admin_dashboard'),
     path('admin-dashboard/applications/', views.admin_applications, name='admin_applications'),
+    path('admin-dashboard/applications/bulk-update-status/', views.admin_bulk_update_application_status, name='admin_bulk_update_application_status'),
     path('admin-dashboard/applications/<int:application_id>/', views.admin_application_detail, name='admin_application_detail'),
     path('admin-dashboard/applications/<int:application_id>/update-status/', views.admin_update_application_status, name='admin_update_application_status'),
     path('admin-dashboard/applications/<int:application_id>/update-notes/', views.admin_update_application_notes, name='admin_update_application_notes'),
@@ -47,5 +63,9 @@ urlpatterns = [
     path('admin-dashboard/contacts/', views.admin_contacts, name='admin_contacts'),
     path('admin-dashboard/contacts/<int:contact_id>/', views.admin_contact_detail, name='admin_contact_detail'),
     path('admin-dashboard/contacts/<int:contact_id>/update-status/', views.admin_update_contact_status, name='admin_update_contact_status'),
-    path('admin-dashboard/api/stats/', views.admin_stats_api, name='admin_stats_api'),
+    path('admin-dashboard/export/<slug:dataset>/', views.admin_export, name='admin_export'),
+    path('admin-dashboard/api/stats/', admin_stats_api_view, name='admin_stats_api'),
+    path('admin-dashboard/live/', views.admin_live, name='admin_live'),
+    path('admin-dashboard/api/metrics/', views.admin_metrics_api, name='admin_metrics_api'),
+    path('admin-dashboard/performance/', views.admin_performance, name='admin_performance'),
 ]
\ No newline at end of file
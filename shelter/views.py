@@ -1,39 +1,124 @@
+import uuid
+from datetime import timedelta
+
 from django.shortcuts import render, get_object_or_404, redirect
 from django.views.generic import ListView, DetailView, CreateView
 from django.contrib import messages
 from django.contrib.auth import login, logout
 from django.contrib.auth.decorators import login_required, user_passes_test
-from django.db.models import Q
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Max, OuterRef, Q, Subquery
 from django.urls import reverse
 from django.utils import timezone
-from django.core.paginator import Paginator
-from django.http import JsonResponse
+from django.utils.http import url_has_allowed_host_and_scheme
+from django.utils.decorators import method_decorator
+from django.core.handlers.asgi import ASGIRequest
+from django.core.exceptions import ValidationError
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from .conditional import conditional_view
+from .exports import DATASETS, FORMATS, aexport_lines, export_lines
+from .metrics import time_series
 from .models import Pet, AdoptionApplication, ContactMessage, SuccessStory
-from .forms import CustomUserCreationForm, UserUpdateForm
+from .live import event_stream
+from .forms import AdoptionApplicationForm, CustomUserCreationForm, UserUpdateForm
+from .pagination import cached_count, paginate_by_cursor
+from .performance import performance_report, worker_report
+from .routers import use_replica
+from .search import get_search_backend
+from .stats import get_stats
+from .triage import set_application_status
+
+
+# Longest history the metrics API serves in one response
+MAX_METRIC_DAYS = 730
 
 
 # Existing views (unchanged)
+@use_replica
 def home(request):
     """Homepage view with featured pets and stats"""
     featured_pets = Pet.objects.filter(featured=True, status='available')[:3]
     
     # Calculate stats
-    total_adopted = Pet.objects.filter(status='adopted').count()
-    available_now = Pet.objects.filter(status='available').count()
-    happy_families = AdoptionApplication.objects.filter(status='completed').count()
+    stats = get_stats()
     
     context = {
         'featured_pets': featured_pets,
         'stats': {
-            'total_adopted': total_adopted or 1247,  # Use actual or fallback
-            'available_now': available_now or 15,
-            'happy_families': happy_families or 156,
+            'total_adopted': stats['total_adopted'] or 1247,  # Use actual or fallback
+            'available_now': stats['available_pets'] or 15,
+            'happy_families': stats['completed_applications'] or 156,
             'years_of_service': 8,
         }
     }
     return render(request, 'shelter/index.html', context)
 
 
+def filter_available_pets(params):
+    """Available pets filtered and sorted by the pet listing query parameters"""
+    queryset = Pet.objects.filter(status='available')
+    
+    # Search
+    search_query = params.get('search')
+    if search_query:
+        queryset = get_search_backend().search(queryset, search_query)
+    
+    # Filter by type
+    pet_type = params.get('type')
+    if pet_type and pet_type != 'all':
+        queryset = queryset.filter(type=pet_type)
+    
+    # Filter by size
+    sizes = params.getlist('size')
+    if sizes:
+        queryset = queryset.filter(size__in=sizes)
+    
+    # Filter by special needs
+    if params.get('specialNeeds'):
+        queryset = queryset.filter(special_needs=True)
+    
+    # Sort (search results keep their relevance order by default)
+    sort_by = params.get('sort', 'relevance' if search_query else 'newest')
+    if sort_by == 'newest':
+        queryset = queryset.order_by('-arrival_date')
+    elif sort_by == 'oldest':
+        queryset = queryset.order_by('arrival_date')
+    elif sort_by == 'name':
+        queryset = queryset.order_by('name')
+    
+    return queryset
+
+
+def pet_list_version(request):
+    """What the pet listing depends on: its matching pets' count and latest update"""
+    latest = filter_available_pets(request.GET).order_by().aggregate(
+        count=Count('pk'),
+        updated_at=Max('updated_at'),
+    )
+    return (latest['count'], latest['updated_at']), latest['updated_at']
+
+
+def pet_detail_version(request, pk, slug=None):
+    """What a pet page depends on: the pet itself and its related pets, in one query"""
+    related = (
+        Pet.objects.filter(type=OuterRef('type'), status='available')
+        .exclude(pk=OuterRef('pk'))
+        .order_by()
+        .values('type')
+    )
+    rows = Pet.objects.filter(pk=pk).order_by().annotate(
+        related_count=Subquery(related.annotate(count=Count('pk')).values('count')),
+        related_updated_at=Subquery(related.annotate(latest=Max('updated_at')).values('latest')),
+    ).values_list('updated_at', 'related_count', 'related_updated_at')
+    row = next(iter(rows), None)
+    if row is None:
+        return None
+    updated_at, related_count, related_updated_at = row
+    return row, max(updated_at, related_updated_at or updated_at)
+
+
+@method_decorator(use_replica, name='dispatch')
+@method_decorator(conditional_view(pet_list_version), name='dispatch')
 class PetListView(ListView):
     """View for browsing all pets with filters"""
     model = Pet
@@ -42,48 +127,16 @@ class PetListView(ListView):
     paginate_by = 9
     
     def get_queryset(self):
-        queryset = Pet.objects.filter(status='available')
-        
-        # Search
-        search_query = self.request.GET.get('search')
-        if search_query:
-            queryset = queryset.filter(
-                Q(name__icontains=search_query) |
-                Q(breed__icontains=search_query) |
-                Q(description__icontains=search_query)
-            )
-        
-        # Filter by type
-        pet_type = self.request.GET.get('type')
-        if pet_type and pet_type != 'all':
-            queryset = queryset.filter(type=pet_type)
-        
-        # Filter by size
-        sizes = self.request.GET.getlist('size')
-        if sizes:
-            queryset = queryset.filter(size__in=sizes)
-        
-        # Filter by special needs
-        if self.request.GET.get('specialNeeds'):
-            queryset = queryset.filter(special_needs=True)
-        
-        # Sort
-        sort_by = self.request.GET.get('sort', 'newest')
-        if sort_by == 'newest':
-            queryset = queryset.order_by('-arrival_date')
-        elif sort_by == 'oldest':
-            queryset = queryset.order_by('arrival_date')
-        elif sort_by == 'name':
-            queryset = queryset.order_by('name')
-        
-        return queryset
+        return filter_available_pets(self.request.GET)
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['total_pets'] = self.get_queryset().count()
+        context['total_pets'] = context['paginator'].count
         return context
 
 
+@method_decorator(use_replica, name='dispatch')
+@method_decorator(conditional_view(pet_detail_version), name='dispatch')
 class PetDetailView(DetailView):
     """View for individual pet detail page"""
     model = Pet
@@ -153,47 +206,43 @@ def adoption_application(request, pet_id=None):
         pet = get_object_or_404(Pet, pk=pet_id, status='available')
     
     if request.method == 'POST':
-        # Get the user if authenticated, otherwise None
-        user = request.user if request.user.is_authenticated else None
-        
-        # Get form data
-        application = AdoptionApplication.objects.create(
-            user=user,  # Link to user if logged in
-            first_name=request.POST.get('first_name'),
-            last_name=request.POST.get('last_name'),
-            email=request.POST.get('email'),
-            phone=request.POST.get('phone'),
-            address=request.POST.get('address'),
-            pet=pet if pet else get_object_or_404(Pet, pk=request.POST.get('pet_id')),
-            housing_type=request.POST.get('housing_type'),
-            own_or_rent=request.POST.get('own_or_rent'),
-            landlord_approval=request.POST.get('landlord_approval') == 'yes',
-            household_adults=request.POST.get('household_adults', 1),
-            household_children=request.POST.get('household_children', 0),
-            has_other_pets=request.POST.get('has_other_pets') == 'yes',
-            other_pets_description=request.POST.get('other_pets_description', ''),
-            previous_pet_experience=request.POST.get('previous_pet_experience'),
-            reason_for_adoption=request.POST.get('reason_for_adoption'),
-        )
-        
-        messages.success(request, 'Your application has been submitted successfully! We will review it and contact you soon.')
-        
-        # If user is logged in, redirect to their applications page
-        if request.user.is_authenticated:
+        form = AdoptionApplicationForm(request.POST)
+        if form.is_valid():
+            application = form.save(commit=False)
+            application.user = request.user
+            try:
+                with transaction.atomic():
+                    application.save()
+            except IntegrityError:
+                # Either this exact form was already submitted (double click,
+                # retry) or the user already has an open application for the pet
+                token = application.submission_token
+                if not (token and AdoptionApplication.objects.filter(submission_token=token).exists()):
+                    messages.info(request, f'You already have an open application for {application.pet.name}.')
+                    return redirect('user_applications')
+            
+            messages.success(request, 'Your application has been submitted successfully! We will review it and contact you soon.')
             return redirect('user_applications')
-        else:
-            return redirect('pet_detail', pk=application.pet.pk, slug=application.pet.slug)
+        submission_token = request.POST.get('submission_token')
+        status = 400
+    else:
+        form = None
+        submission_token = uuid.uuid4()
+        status = 200
     
     context = {
         'pet': pet,
-        'available_pets': Pet.objects.filter(status='available') if not pet else None
+        'available_pets': Pet.objects.filter(status='available') if not pet else None,
+        'form': form,
+        'submission_token': submission_token,
     }
-    return render(request, 'shelter/adoption_application.html', context)
+    return render(request, 'shelter/adoption_application.html', context, status=status)
 
 
+@use_replica
 def success_stories(request):
     """Success stories page"""
-    stories = SuccessStory.objects.all()
+    stories = SuccessStory.objects.select_related('pet')
     featured_stories = stories.filter(featured=True)[:3]
     
     context = {
@@ -233,8 +282,8 @@ def account(request):
     
     # Regular user logic
     recent_applications = AdoptionApplication.objects.filter(
-        Q(user=request.user) | Q(email=request.user.email)
-    ).order_by('-submitted_at')[:3]
+        user=request.user
+    ).select_related('pet').order_by('-submitted_at')[:3]
     
     context = {
         'recent_applications': recent_applications,
@@ -245,10 +294,11 @@ def account(request):
 @login_required
 def user_applications(request):
     """View all user's adoption applications"""
-    # Get applications linked to this user OR matching their email
+    # Applications sent from the user's email are linked to them on
+    # registration (and by `manage.py link_applications`)
     applications = AdoptionApplication.objects.filter(
-        Q(user=request.user) | Q(email=request.user.email)
-    ).order_by('-submitted_at')
+        user=request.user
+    ).select_related('pet').order_by('-submitted_at')
     
     context = {
         'applications': applications,
@@ -289,12 +339,7 @@ def is_admin_user(user):
 def admin_dashboard(request):
     """Admin dashboard with overview statistics"""
     # Calculate statistics
-    stats = {
-        'pending_applications': AdoptionApplication.objects.filter(status='pending').count(),
-        'available_pets': Pet.objects.filter(status='available').count(),
-        'total_adopted': Pet.objects.filter(status='adopted').count(),
-        'unread_messages': ContactMessage.objects.filter(is_read=False).count(),
-    }
+    stats = get_stats()
     
     # Get recent applications (last 5)
     recent_applications = AdoptionApplication.objects.select_related('pet').order_by('-submitted_at')[:5]
@@ -306,6 +351,8 @@ def admin_dashboard(request):
         'stats': stats,
         'recent_applications': recent_applications,
         'recent_contacts': recent_contacts,
+        # The live feed is only served under ASGI; under WSGI the dashboard polls
+        'live_feed': isinstance(request, ASGIRequest),
     }
     return render(request, 'shelter/admin/admin_dashboard.html', context)
 
@@ -332,14 +379,12 @@ def admin_applications(request):
             Q(pet__breed__icontains=search_query)
         )
     
-    # Pagination
-    paginator = Paginator(applications, 10)  # Show 10 applications per page
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Keyset pagination, 10 applications per page
+    page_obj = paginate_by_cursor(applications, request.GET.get('cursor'), 10, ('-submitted_at', '-id'))
     
     context = {
         'applications': page_obj,
-        'total_applications': applications.count(),
+        'total_applications': cached_count(applications),
         'is_paginated': page_obj.has_other_pages(),
         'page_obj': page_obj,
     }
@@ -358,6 +403,25 @@ def admin_application_detail(request, application_id):
     return render(request, 'shelter/admin/admin_application_detail.html', context)
 
 
+def _apply_status_change(request, applications, new_status):
+    """Run a triage status change and report the outcome as flash messages"""
+    try:
+        updated, auto_rejected = set_application_status(applications, new_status)
+    except IntegrityError:
+        messages.error(request, 'An applicant can only have one open application per pet')
+        return
+    except ValidationError as error:
+        messages.error(request, error.messages[0])
+        return
+    status_display = dict(AdoptionApplication.STATUS_CHOICES)[new_status]
+    if updated == 1:
+        messages.success(request, f'Application status updated to {status_display}')
+    else:
+        messages.success(request, f'{updated} applications updated to {status_display}')
+    if auto_rejected:
+        messages.info(request, f'{auto_rejected} competing open application{"s" if auto_rejected != 1 else ""} rejected')
+
+
 @login_required
 @user_passes_test(is_admin_user)
 def admin_update_application_status(request, application_id):
@@ -367,21 +431,8 @@ def admin_update_application_status(request, application_id):
         new_status = request.POST.get('status')
         
         if new_status in ['pending', 'approved', 'rejected', 'completed']:
-            old_status = application.status
-            application.status = new_status
-            application.reviewed_at = timezone.now()
-            application.save()
-            
-            # Update pet status if application is completed
-            if new_status == 'completed':
-                application.pet.status = 'adopted'
-                application.pet.save()
-            elif old_status == 'completed' and new_status != 'completed':
-                # If changing from completed to something else, make pet available again
-                application.pet.status = 'available'
-                application.pet.save()
-            
-            messages.success(request, f'Application status updated to {application.get_status_display()}')
+            # Pet status and competing applications are kept in step by the triage
+            _apply_status_change(request, AdoptionApplication.objects.filter(pk=application.pk), new_status)
         else:
             messages.error(request, 'Invalid status')
     
@@ -393,6 +444,28 @@ def admin_update_application_status(request, application_id):
         return redirect('admin_applications')
 
 
+@login_required
+@user_passes_test(is_admin_user)
+def admin_bulk_update_application_status(request):
+    """Update the status of all selected applications at once"""
+    if request.method == 'POST':
+        application_ids = [pk for pk in request.POST.getlist('application_ids') if pk.isdigit()]
+        new_status = request.POST.get('status')
+        
+        if not application_ids:
+            messages.error(request, 'No applications selected')
+        elif new_status in ['pending', 'approved', 'rejected', 'completed']:
+            _apply_status_change(request, AdoptionApplication.objects.filter(pk__in=application_ids), new_status)
+        else:
+            messages.error(request, 'Invalid status')
+    
+    # Back to the same filtered list page
+    next_url = request.POST.get('next')
+    if next_url and url_has_allowed_host_and_scheme(next_url, allowed_hosts={request.get_host()}):
+        return redirect(next_url)
+    return redirect('admin_applications')
+
+
 @login_required
 @user_passes_test(is_admin_user)
 def admin_update_application_notes(request, application_id):
@@ -414,7 +487,7 @@ def admin_update_application_notes(request, application_id):
 @user_passes_test(is_admin_user)
 def admin_pets(request):
     """Admin view for managing pets"""
-    pets = Pet.objects.all().prefetch_related('applications').order_by('-arrival_date')
+    pets = Pet.objects.all().order_by('-arrival_date')
     
     # Filter by status
     status_filter = request.GET.get('status')
@@ -434,14 +507,12 @@ def admin_pets(request):
             Q(breed__icontains=search_query)
         )
     
-    # Pagination
-    paginator = Paginator(pets, 12)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Keyset pagination; application counts come from the same query
+    page_obj = paginate_by_cursor(pets.with_application_stats(), request.GET.get('cursor'), 12, ('-arrival_date', '-id'))
     
     context = {
         'pets': page_obj,
-        'total_pets': pets.count(),
+        'total_pets': cached_count(pets),
         'is_paginated': page_obj.has_other_pages(),
         'page_obj': page_obj,
     }
@@ -470,14 +541,12 @@ def admin_contacts(request):
             Q(subject__icontains=search_query)
         )
     
-    # Pagination
-    paginator = Paginator(contacts, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Keyset pagination
+    page_obj = paginate_by_cursor(contacts, request.GET.get('cursor'), 10, ('-created_at', '-id'))
     
     context = {
         'contacts': page_obj,
-        'total_contacts': contacts.count(),
+        'total_contacts': cached_count(contacts),
         'is_paginated': page_obj.has_other_pages(),
         'page_obj': page_obj,
     }
@@ -526,13 +595,79 @@ def admin_update_contact_status(request, contact_id):
 @user_passes_test(is_admin_user)
 def admin_stats_api(request):
     """API endpoint for dashboard stats"""
-    stats = {
-        'pending_applications': AdoptionApplication.objects.filter(status='pending').count(),
-        'available_pets': Pet.objects.filter(status='available').count(),
-        'total_adopted': Pet.objects.filter(status='adopted').count(),
-        'unread_messages': ContactMessage.objects.filter(is_read=False).count(),
-        'applications_this_week': AdoptionApplication.objects.filter(
-            submitted_at__gte=timezone.now() - timezone.timedelta(days=7)
-        ).count(),
+    stats = get_stats()
+    return JsonResponse({
+        'pending_applications': stats['pending_applications'],
+        'available_pets': stats['available_pets'],
+        'total_adopted': stats['total_adopted'],
+        'unread_messages': stats['unread_messages'],
+        'applications_this_week': stats['applications_this_week'],
+    })
+
+
+@login_required
+@user_passes_test(is_admin_user)
+def admin_live(request):
+    """Server-sent events for the dashboard: changed counters, new applications and messages"""
+    # Under WSGI an open stream would hold a sync worker for as long as the tab
+    # is open; 204 tells EventSource not to reconnect and the dashboard polls
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+    
+    try:
+        last_event_id = int(request.headers['Last-Event-ID'])
+    except (KeyError, ValueError):
+        last_event_id = None
+    
+    response = StreamingHttpResponse(event_stream(last_event_id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@login_required
+@user_passes_test(is_admin_user)
+def admin_metrics_api(request):
+    """Daily metrics time series, e.g. ?days=180&type=dog"""
+    try:
+        days = min(max(int(request.GET.get('days', 90)), 1), MAX_METRIC_DAYS)
+    except ValueError:
+        return JsonResponse({'error': 'days must be a number'}, status=400)
+    pet_type = request.GET.get('type') or None
+    if pet_type and pet_type not in dict(Pet.PET_TYPES):
+        return JsonResponse({'error': f'Unknown pet type {pet_type}'}, status=400)
+    
+    # Served from the rollup table, so the cost depends on the days asked for, not the data
+    last = timezone.localdate()
+    first = last - timedelta(days=days - 1)
+    return JsonResponse({'pet_type': pet_type, **time_series(first, last, pet_type)})
+
+
+@login_required
+@user_passes_test(is_admin_user)
+def admin_performance(request):
+    """Per-view latency, DB and template timings collected by PerformanceMiddleware"""
+    context = {
+        'report': performance_report(),
+        'worker': worker_report(),
     }
-    return JsonResponse(stats)
\ No newline at end of file
+    return render(request, 'shelter/admin/admin_performance.html', context)
+
+
+@login_required
+@user_passes_test(is_admin_user)
+def admin_export(request, dataset):
+    """Stream a whole dataset as CSV or JSON Lines"""
+    export_format = request.GET.get('format', 'csv')
+    if dataset not in DATASETS or export_format not in FORMATS:
+        raise Http404('Unknown export')
+    
+    # Under ASGI the rows are streamed with the async ORM iterator
+    if isinstance(request, ASGIRequest):
+        lines = aexport_lines(dataset, export_format)
+    else:
+        lines = export_lines(dataset, export_format)
+    response = StreamingHttpResponse(lines, content_type=FORMATS[export_format])
+    filename = f'pawhaven-{dataset}-{timezone.localdate():%Y-%m-%d}.{export_format}'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
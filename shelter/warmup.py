@@ -0,0 +1,56 @@
+"""
+Worker warm-up.
+
+With the cached template loader each worker parses a template the first
+time it renders it, which makes the first hit to every page after a
+deploy slow. ``warm_up_worker()`` is called from ``wsgi.py``/``asgi.py``
+when ``SHELTER_WARM_TEMPLATES`` is on and parses all shelter templates
+before the worker accepts requests.
+"""
+import logging
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.template import TemplateSyntaxError, engines
+
+from .performance import record_worker_boot
+
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_ROOT = Path(__file__).resolve().parent / 'templates'
+
+
+def template_names():
+    """Names of every template under shelter/templates, as passed to get_template()"""
+    return sorted(path.relative_to(TEMPLATE_ROOT).as_posix() for path in TEMPLATE_ROOT.rglob('*.html'))
+
+
+def warm_templates():
+    """Load (and so parse and cache) every shelter template; returns (count, failures, seconds)"""
+    engine = engines['django']
+    started = time.perf_counter()
+    loaded, failures = 0, []
+    for name in template_names():
+        try:
+            engine.get_template(name)
+        except TemplateSyntaxError as error:
+            failures.append((name, error))
+        else:
+            loaded += 1
+    return loaded, failures, time.perf_counter() - started
+
+
+def warm_up_worker(started):
+    """Warm this worker's caches; ``started`` is perf_counter() from when the worker began loading"""
+    booted = time.perf_counter()
+    record_worker_boot(started=started, boot_ms=round((booted - started) * 1000, 2))
+    if not settings.SHELTER_WARM_TEMPLATES:
+        return
+
+    loaded, failures, seconds = warm_templates()
+    for name, error in failures:
+        logger.error('Could not parse template %s: %s', name, error)
+    record_worker_boot(templates=loaded, warmup_ms=round(seconds * 1000, 2))
+    logger.info('Worker warmed %d templates in %.1f ms', loaded, seconds * 1000)